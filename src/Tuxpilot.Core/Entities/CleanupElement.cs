@@ -39,4 +39,14 @@ public class CleanupElement
     /// Description de l'élément
     /// </summary>
     public string Description { get; set; } = string.Empty;
+    
+    /// <summary>
+    /// Indique une estimation extrapolée (budget de temps dépassé)
+    /// </summary>
+    public bool Partiel { get; set; }
+    
+    /// <summary>
+    /// Élément affiché pour information, non supprimé par le nettoyage
+    /// </summary>
+    public bool Informatif { get; set; }
 }
\ No newline at end of file
@@ -26,6 +26,11 @@ public class CleanupInfo
     /// </summary>
     public int NombreElements { get; set; }
     
+    /// <summary>
+    /// Indique qu'au moins un élément est une estimation partielle
+    /// </summary>
+    public bool Partiel { get; set; }
+    
     /// <summary>
     /// Message d'erreur si l'analyse a échoué
     /// </summary>
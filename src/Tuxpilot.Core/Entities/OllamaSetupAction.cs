@@ -7,5 +7,7 @@ public class OllamaSetupAction
     public bool NeedsSudo { get; set; }
     public bool Safe { get; set; }
     public string Command { get; set; } = "";
+    // Modèle à télécharger (actions pull_model / pull_recommended_model)
+    public string Model { get; set; } = "";
     public string Notes { get; set; } = "";
 }
\ No newline at end of file
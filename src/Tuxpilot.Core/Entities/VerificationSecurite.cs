@@ -58,6 +58,11 @@ public class VerificationSecurite
     public string Impact { get; set; } = string.Empty;
     public string Preuve { get; set; } = string.Empty;
     public bool AutoFixSafe { get; set; }
+
+    /// <summary>
+    /// Durée d'exécution de la vérification (ms)
+    /// </summary>
+    public int DureeMs { get; set; }
     
     /// <summary>
     /// Icône selon le niveau de risque
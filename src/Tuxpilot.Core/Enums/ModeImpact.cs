@@ -0,0 +1,23 @@
+namespace Tuxpilot.Core.Enums;
+
+
+/// <summary>
+/// Priorité CPU / E/S des analyses et maintenances (lue par les scripts Python)
+/// </summary>
+public enum ModeImpact
+{
+    /// <summary>
+    /// Aucune modification de priorité (par défaut)
+    /// </summary>
+    Normal,
+    
+    /// <summary>
+    /// nice 10, E/S best-effort priorité 7
+    /// </summary>
+    Reduit,
+    
+    /// <summary>
+    /// nice 19, SCHED_IDLE, classe d'E/S idle
+    /// </summary>
+    Inactif
+}
@@ -6,4 +6,5 @@ public interface IServiceAssistantIASetup
 {
     Task<OllamaSetupStatus> GetStatusAsync(string model, bool forceRefresh = false);
     Task<(bool Success, string Output)> ExecuterActionAsync(OllamaSetupAction action);
+    Task TelechargerModeleAsync(string model, Action<string> onEvenement);
 }
\ No newline at end of file
@@ -0,0 +1,30 @@
+using Tuxpilot.Core.Enums;
+
+namespace Tuxpilot.Core.Interfaces.Services;
+
+
+/// <summary>
+/// Service de gestion du mode d'impact des analyses et maintenances
+/// </summary>
+public interface IServiceModeImpact
+{
+    /// <summary>
+    /// Obtient le mode actuel
+    /// </summary>
+    ModeImpact ModeActuel { get; }
+    
+    /// <summary>
+    /// Change le mode (appliqué aux prochains scripts lancés)
+    /// </summary>
+    void ChangerMode(ModeImpact mode);
+    
+    /// <summary>
+    /// Charge le mode sauvegardé
+    /// </summary>
+    ModeImpact ChargerMode();
+    
+    /// <summary>
+    /// Sauvegarde le mode
+    /// </summary>
+    void SauvegarderMode(ModeImpact mode);
+}
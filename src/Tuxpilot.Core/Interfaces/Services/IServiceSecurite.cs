@@ -10,7 +10,8 @@ public interface IServiceSecurite
     /// <summary>
     /// Exécuter un audit complet de sécurité
     /// </summary>
-    Task<RapportSecurite> ExecuterAuditAsync();
+    /// <param name="incremental">Réutiliser les résultats des vérifications dont les entrées n'ont pas changé</param>
+    Task<RapportSecurite> ExecuterAuditAsync(bool incremental = false);
     
     /// <summary>
     /// Vérifier l'état du firewall
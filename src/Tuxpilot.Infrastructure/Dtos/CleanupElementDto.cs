@@ -13,4 +13,6 @@ public class CleanupElementDto
     public int NombreFichiers { get; set; }
     public int NombrePaquets { get; set; }
     public string Description { get; set; } = string.Empty;
+    public bool Partiel { get; set; }
+    public bool Informatif { get; set; }
 }
\ No newline at end of file
@@ -9,5 +9,6 @@ public class CleanupInfoDto
     public List<CleanupElementDto> Elements { get; set; } = new();
     public long TailleTotaleMB { get; set; }
     public int NombreElements { get; set; }
+    public bool Partiel { get; set; }
     public string? Erreur { get; set; }
 }
\ No newline at end of file
@@ -19,6 +19,7 @@ public static class CleanupInfoExtensions
             Elements = dto.Elements.Select(e => e.ToEntity()).ToList(),
             TailleTotaleMB = dto.TailleTotaleMB,
             NombreElements = dto.NombreElements,
+            Partiel = dto.Partiel,
             Erreur = dto.Erreur
         };
     }
@@ -36,7 +37,9 @@ public static class CleanupInfoExtensions
             TailleMB = dto.TailleMB,
             NombreFichiers = dto.NombreFichiers,
             NombrePaquets = dto.NombrePaquets,
-            Description = dto.Description
+            Description = dto.Description,
+            Partiel = dto.Partiel,
+            Informatif = dto.Informatif
         };
     }
 }
\ No newline at end of file
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Tuxpilot - Tâches en arrière-plan abandonnables
+Les workers de ThreadPoolExecutor sont joints à la sortie de l'interpréteur,
+même après shutdown(wait=False) : une tâche bloquée retarde alors la fin du
+script. Ici chaque tâche tourne dans un thread démon, qui n'est pas attendu.
+"""
+
+import threading
+from concurrent.futures import Future
+
+
+def soumettre(fonction, *args, nom=None):
+    """
+    Lance fonction(*args) dans un thread démon
+
+    Returns:
+        Future: Résultat (ou exception) de la tâche, utilisable avec wait()
+    """
+    future = Future()
+
+    def executer():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fonction(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=executer, name=nom, daemon=True).start()
+    return future
@@ -1,16 +1,128 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import http.client
 import json
+import os
+import shutil
+import sqlite3
 import subprocess
 import sys
-from typing import List, Dict, Any
+import time
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlsplit
+
+from evenements import emettre_evenement
 
 DEFAULT_ENDPOINT = "http://127.0.0.1:11434"
 
-def run(cmd: str, timeout=20) -> Dict[str, Any]:
+# Délais courts : un serveur local répond en quelques millisecondes
+CONNECT_TIMEOUT = 0.5
+REQUEST_TIMEOUT = 2.0
+
+
+def endpoint_from_env() -> str:
+    """Adresse de l'API : OLLAMA_HOST (comme le client ollama), sinon l'adresse par défaut"""
+    host = os.environ.get("OLLAMA_HOST", "").strip()
+    if not host:
+        return DEFAULT_ENDPOINT
+    if "://" not in host:
+        host = "http://" + host
+    parts = urlsplit(host)
+    hostname = parts.hostname or "127.0.0.1"
+    if hostname == "0.0.0.0":
+        hostname = "127.0.0.1"
+    return f"{parts.scheme}://{hostname}:{parts.port or 11434}"
+
+
+class OllamaHttpError(http.client.HTTPException):
+    """Réponse HTTP en erreur de l'API (code conservé)"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class OllamaApi:
+    """Client HTTP minimal de l'API Ollama sur une seule connexion keep-alive"""
+
+    def __init__(self, endpoint: str = DEFAULT_ENDPOINT, timeout: float = REQUEST_TIMEOUT):
+        parts = urlsplit(endpoint)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.https = parts.scheme == "https"
+        self.timeout = timeout
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connect(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self._conn = cls(self.host, self.port, timeout=CONNECT_TIMEOUT)
+            self._conn.connect()
+            self._conn.sock.settimeout(self.timeout)
+        return self._conn
+
+    def _open(self, method: str, path: str, body: Optional[dict], timeout: Optional[float]):
+        """Envoie la requête ; une connexion fermée par le serveur est rouverte une fois"""
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in (1, 2):
+            try:
+                conn = self._connect()
+                conn.sock.settimeout(timeout or self.timeout)
+                conn.request(method, path, body=payload, headers=headers)
+                resp = conn.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                self.close()
+                if attempt == 2:
+                    raise
+                continue
+            except (OSError, http.client.HTTPException):
+                self.close()
+                raise
+            if resp.status >= 400:
+                detail = resp.read()[:200].decode(errors="replace")
+                raise OllamaHttpError(resp.status, f"{method} {path} : HTTP {resp.status} {detail}".strip())
+            return resp
+
+    def request(self, method: str, path: str, body: Optional[dict] = None, timeout: Optional[float] = None) -> Any:
+        """Requête JSON (réponse lue en entier)"""
+        resp = self._open(method, path, body, timeout)
+        try:
+            data = resp.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        return json.loads(data) if data else {}
+
+    def stream(self, path: str, body: dict, timeout: Optional[float] = None):
+        """Requête POST en streaming : un objet NDJSON par itération"""
+        resp = self._open("POST", path, body, timeout)
+        try:
+            for line in resp:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            # Réponse abandonnée en cours de route : la connexion n'est plus réutilisable
+            if not resp.isclosed():
+                self.close()
+
+    def get(self, path: str) -> Any:
+        return self.request("GET", path)
+
+    def post(self, path: str, body: dict, timeout: Optional[float] = None) -> Any:
+        return self.request("POST", path, body, timeout)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def run(argv: List[str], timeout=20) -> Dict[str, Any]:
+    """Exécute une commande directement (sans shell de connexion)"""
     try:
-        p = subprocess.run(["/bin/bash", "-lc", cmd], capture_output=True, text=True, timeout=timeout)
+        p = subprocess.run(argv, capture_output=True, text=True, timeout=timeout)
         return {
             "ok": p.returncode == 0,
             "code": p.returncode,
@@ -21,26 +133,273 @@ def run(cmd: str, timeout=20) -> Dict[str, Any]:
         return {"ok": False, "code": -1, "out": "", "err": str(e)}
 
 def exists(bin_name: str) -> bool:
-    return run(f"command -v {bin_name} >/dev/null 2>&1")["ok"]
+    return shutil.which(bin_name) is not None
 
 def get_models() -> List[str]:
+    """Modèles installés via la CLI (repli quand l'API ne répond pas)"""
     if not exists("ollama"):
         return []
-    r = run("ollama list 2>/dev/null | awk 'NR>1 {print $1}'")
+    r = run(["ollama", "list"])
     if not r["ok"] or not r["out"]:
         return []
-    return [x.strip() for x in r["out"].splitlines() if x.strip()]
+    return [line.split()[0] for line in r["out"].splitlines()[1:] if line.strip()]
+
+def probe_api(api: OllamaApi) -> Optional[Dict[str, Any]]:
+    """
+    Interroge /api/version, /api/tags et /api/ps sur la même connexion
+
+    Returns:
+        dict | None: version, modèles installés et chargés (None si l'API ne répond pas)
+    """
+    try:
+        version = api.get("/api/version").get("version", "")
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+    try:
+        tags = api.get("/api/tags").get("models") or []
+    except (OSError, ValueError, http.client.HTTPException):
+        tags = []
+    try:
+        ps = api.get("/api/ps").get("models") or []
+    except (OSError, ValueError, http.client.HTTPException):
+        ps = []
+    return {
+        "version": version,
+        "models": [m.get("name") or m.get("model", "") for m in tags],
+        "modelSizes": {(m.get("name") or m.get("model", "")): m.get("size", 0) for m in tags},
+        "tags": tags,
+        "loaded": [{
+            "name": m.get("name") or m.get("model", ""),
+            "sizeVram": m.get("size_vram", 0),
+            "expiresAt": m.get("expires_at", "")
+        } for m in ps]
+    }
+
+def service_state() -> Dict[str, str]:
+    """État du service utilisateur ollama (un seul appel systemctl)"""
+    if not exists("systemctl"):
+        return {"active": "", "enabled": ""}
+    r = run(["systemctl", "--user", "show", "ollama", "-p", "ActiveState", "-p", "UnitFileState"], timeout=5)
+    props = dict(line.split("=", 1) for line in r["out"].splitlines() if "=" in line)
+    return {"active": props.get("ActiveState", ""), "enabled": props.get("UnitFileState", "")}
+
+def has_model_named(model: str, models: List[str]) -> bool:
+    """Un nom sans étiquette désigne :latest, comme pour ollama pull"""
+    return model in models or (":" not in model and f"{model}:latest" in models)
+
+# ---------------- RECOMMANDATION SELON LE MATÉRIEL ----------------
+
+DEFAULT_MODEL = "llama3.1:8b"
+
+# Modèles proposés : (nom de base, milliards de paramètres, {quantification: étiquette ollama})
+MODEL_CATALOG = [
+    ("llama3.2:1b", 1.2, {"Q4_K_M": "llama3.2:1b", "Q8_0": "llama3.2:1b-instruct-q8_0"}),
+    ("qwen2.5:1.5b", 1.5, {"Q4_K_M": "qwen2.5:1.5b", "Q8_0": "qwen2.5:1.5b-instruct-q8_0"}),
+    ("qwen2.5:3b", 3.1, {"Q4_K_M": "qwen2.5:3b", "Q8_0": "qwen2.5:3b-instruct-q8_0"}),
+    ("llama3.2:3b", 3.2, {"Q4_K_M": "llama3.2:3b", "Q8_0": "llama3.2:3b-instruct-q8_0"}),
+    ("mistral:7b", 7.2, {"Q4_K_M": "mistral:7b", "Q8_0": "mistral:7b-instruct-q8_0"}),
+    ("qwen2.5:7b", 7.6, {"Q4_K_M": "qwen2.5:7b", "Q8_0": "qwen2.5:7b-instruct-q8_0"}),
+    ("llama3.1:8b", 8.0, {"Q4_K_M": "llama3.1:8b", "Q8_0": "llama3.1:8b-instruct-q8_0"}),
+    ("gemma2:9b", 9.2, {"Q4_K_M": "gemma2:9b", "Q8_0": "gemma2:9b-instruct-q8_0"}),
+    ("qwen2.5:14b", 14.8, {"Q4_K_M": "qwen2.5:14b"})
+]
+
+# Bits par poids effectifs (échelles comprises) et qualité relative
+QUANT_BITS = {"Q4_0": 4.5, "Q4_K_M": 4.85, "Q5_K_M": 5.7, "Q6_K": 6.6, "Q8_0": 8.5, "F16": 16.0}
+QUANT_QUALITY = {"Q4_0": 0.93, "Q4_K_M": 0.96, "Q5_K_M": 0.98, "Q6_K": 0.99, "Q8_0": 1.0, "F16": 1.0}
 
-def status(model: str) -> Dict[str, Any]:
-    installed = exists("ollama")
-    version = run("ollama --version 2>/dev/null")["out"] if installed else ""
-    # service user
-    svc_active = run("systemctl --user is-active ollama 2>/dev/null")["out"] if exists("systemctl") else ""
-    svc_enabled = run("systemctl --user is-enabled ollama 2>/dev/null")["out"] if exists("systemctl") else ""
-    listening = run("ss -H -ltn 2>/dev/null | grep -q ':11434' && echo yes || echo no")["out"] == "yes"
+# Empreinte hors poids : runtime + cache KV (contexte 2048) proportionnel à la taille
+RUNTIME_OVERHEAD_GB = 0.4
+KV_GB_PER_BILLION = 0.04
 
-    models = get_models()
-    has_model = model in models
+# Mémoire laissée au système et aux applications
+HEADROOM_MIN_GB = 1.5
+HEADROOM_RATIO = 0.15
+
+# En dessous, la conversation devient pénible
+MIN_TOKENS_PER_SECOND = 5.0
+
+# Avantage d'un modèle déjà installé (évite un téléchargement pour un gain marginal)
+INSTALLED_BONUS = 1.2
+
+# Inférence CPU : bande passante mémoire typique (GB/s) et débit de calcul par
+# cœur (tokens/s pour 1 milliard de paramètres) selon les extensions SIMD
+MEMORY_BANDWIDTH_GBS = 35.0
+COMPUTE_PER_CORE = {"avx512": 14.0, "avx2": 12.0, "avx": 5.0, "none": 2.0}
+
+
+def read_hardware(meminfo_path: str = "/proc/meminfo", cpuinfo_path: str = "/proc/cpuinfo") -> Dict[str, Any]:
+    """RAM totale et disponible, cœurs physiques, extensions AVX"""
+    mem = {}
+    try:
+        with open(meminfo_path, encoding="utf-8") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                fields = rest.split()
+                if fields and fields[0].isdigit():
+                    mem[key] = int(fields[0]) * 1024
+    except OSError:
+        pass
+
+    flags, cores, threads = set(), set(), 0
+    try:
+        with open(cpuinfo_path, encoding="utf-8") as f:
+            physical = core = None
+            for line in f:
+                key, _, value = line.partition(":")
+                key = key.strip()
+                if key == "processor":
+                    threads += 1
+                elif key == "physical id":
+                    physical = value.strip()
+                elif key == "core id":
+                    core = value.strip()
+                    cores.add((physical, core))
+                elif key == "flags" and not flags:
+                    flags = set(value.split())
+    except OSError:
+        pass
+
+    if "avx512f" in flags:
+        simd = "avx512"
+    elif "avx2" in flags:
+        simd = "avx2"
+    elif "avx" in flags:
+        simd = "avx"
+    else:
+        simd = "none"
+    return {
+        "ramTotalGb": round(mem.get("MemTotal", 0) / 1e9, 1),
+        "ramAvailableGb": round(mem.get("MemAvailable", 0) / 1e9, 1),
+        "cores": len(cores) or threads or (os.cpu_count() or 1),
+        "threads": threads or (os.cpu_count() or 1),
+        "simd": simd,
+        "avx": {"avx": "avx" in flags, "avx2": "avx2" in flags, "avx512": "avx512f" in flags}
+    }
+
+def estimate_footprint_gb(params_b: float, quant: str) -> float:
+    """Mémoire occupée par le modèle chargé (poids + cache KV + runtime)"""
+    weights = params_b * QUANT_BITS.get(quant, 4.85) / 8
+    return round(weights + params_b * KV_GB_PER_BILLION + RUNTIME_OVERHEAD_GB, 2)
+
+def estimate_tokens_per_second(params_b: float, quant: str, hardware: Dict[str, Any]) -> float:
+    """
+    Débit de génération estimé sur CPU : borné par la bande passante mémoire
+    (tous les poids lus à chaque token) et par le calcul disponible
+    """
+    weights_gb = params_b * QUANT_BITS.get(quant, 4.85) / 8
+    bandwidth_bound = MEMORY_BANDWIDTH_GBS / weights_gb if weights_gb else 0
+    compute_bound = hardware["cores"] * COMPUTE_PER_CORE[hardware["simd"]] / params_b if params_b else 0
+    return round(min(bandwidth_bound, compute_bound), 1)
+
+def _parse_params(value: str) -> float:
+    """'8.0B' / '770M' -> milliards de paramètres"""
+    value = (value or "").strip().upper()
+    try:
+        if value.endswith("B"):
+            return float(value[:-1])
+        if value.endswith("M"):
+            return float(value[:-1]) / 1000
+    except ValueError:
+        pass
+    return 0.0
+
+def recommend(hardware: Optional[Dict[str, Any]] = None, installed: Optional[List[Dict[str, Any]]] = None,
+              loaded_gb: float = 0.0) -> Dict[str, Any]:
+    """
+    Classe les modèles (catalogue + installés) selon la mémoire et le débit estimés
+
+    Un modèle convient s'il tient dans la mémoire disponible moins la marge
+    réservée au système ; parmi ceux-là, le plus gros dont le débit estimé
+    reste confortable est recommandé, sinon le plus rapide.
+
+    Args:
+        installed: Modèles de /api/tags (taille réelle utilisée quand connue)
+        loaded_gb: Mémoire déjà occupée par des modèles résidents (récupérable)
+    """
+    hardware = hardware or read_hardware()
+    headroom = max(HEADROOM_MIN_GB, hardware["ramTotalGb"] * HEADROOM_RATIO)
+    budget = round(hardware["ramAvailableGb"] + loaded_gb - headroom, 1)
+
+    installed_by_name = {(m.get("name") or m.get("model", "")): m for m in installed or []}
+    candidates = {}
+    for base, params, variants in MODEL_CATALOG:
+        for quant, tag in variants.items():
+            candidates[tag] = {"name": tag, "family": base, "paramsB": params, "quantization": quant}
+    for name, m in installed_by_name.items():
+        details = m.get("details") or {}
+        params = _parse_params(details.get("parameter_size", ""))
+        entry = candidates.setdefault(name, {"name": name, "family": name, "paramsB": params,
+                                             "quantization": details.get("quantization_level") or "Q4_K_M"})
+        if params:
+            entry["paramsB"] = params
+
+    ranked = []
+    for c in candidates.values():
+        if not c["paramsB"]:
+            continue
+        size = installed_by_name.get(c["name"], {}).get("size")
+        footprint = (round(size / 1e9 + c["paramsB"] * KV_GB_PER_BILLION + RUNTIME_OVERHEAD_GB, 2)
+                     if size else estimate_footprint_gb(c["paramsB"], c["quantization"]))
+        tps = estimate_tokens_per_second(c["paramsB"], c["quantization"], hardware)
+        ranked.append(dict(c,
+                           installed=c["name"] in installed_by_name,
+                           footprintGb=footprint,
+                           tokensPerSecond=tps,
+                           fits=footprint <= budget,
+                           comfortable=footprint <= budget and tps >= MIN_TOKENS_PER_SECOND,
+                           quality=round(c["paramsB"] * QUANT_QUALITY.get(c["quantization"], 0.95), 2)))
+
+    # Confortables (les meilleurs d'abord, un modèle déjà téléchargé est avantagé),
+    # puis ceux qui tiennent (les plus rapides), puis le reste
+    ranked.sort(key=lambda c: (
+        0 if c["comfortable"] else 1 if c["fits"] else 2,
+        -c["quality"] * (INSTALLED_BONUS if c["installed"] else 1) if c["comfortable"]
+        else -c["tokensPerSecond"] if c["fits"] else c["footprintGb"],
+        not c["installed"]
+    ))
+    best = ranked[0] if ranked and ranked[0]["fits"] else None
+    return {
+        "hardware": hardware,
+        "headroomGb": round(headroom, 1),
+        "memoryBudgetGb": budget,
+        "recommended": best["name"] if best else None,
+        "candidates": ranked
+    }
+
+
+def status(model: Optional[str] = None, endpoint: Optional[str] = None) -> Dict[str, Any]:
+    endpoint = endpoint or endpoint_from_env()
+    started = time.monotonic()
+    api = OllamaApi(endpoint)
+    try:
+        probe = probe_api(api)
+    finally:
+        api.close()
+
+    svc = service_state()
+    svc_active, svc_enabled = svc["active"], svc["enabled"]
+
+    if probe is not None:
+        # Le serveur répond : installé et à l'écoute, pas besoin de la CLI
+        source = "http"
+        installed = True
+        listening = True
+        version = probe["version"]
+        models = probe["models"]
+    else:
+        source = "cli"
+        installed = exists("ollama")
+        listening = False
+        version = run(["ollama", "--version"], timeout=5)["out"] if installed else ""
+        models = get_models() if installed else []
+    loaded_gb = sum(m["sizeVram"] for m in probe["loaded"]) / 1e9 if probe else 0.0
+    recommendation = recommend(installed=probe["tags"] if probe else [{"name": m} for m in models],
+                               loaded_gb=loaded_gb)
+    # Sans modèle demandé : celui qui tient en mémoire avec de la marge
+    model = model or recommendation["recommended"] or DEFAULT_MODEL
+    requested = next((c for c in recommendation["candidates"] if c["name"] == model), None)
+    has_model = has_model_named(model, models)
 
     actions = []
 
@@ -56,7 +415,7 @@ def status(model: str) -> Dict[str, Any]:
         })
 
     # 2) start service
-    if installed and svc_active != "active":
+    if installed and not listening and svc_active != "active":
         actions.append({
             "id": "start_ollama_user_service",
             "label": "Démarrer Ollama (service utilisateur)",
@@ -85,9 +444,25 @@ def status(model: str) -> Dict[str, Any]:
             "needsSudo": False,
             "safe": True,
             "command": f"ollama pull {model}",
+            # L'interface télécharge via "pull <model>" (reprise et progression), la commande reste en repli
+            "model": model,
             "notes": "Téléchargement selon la taille du modèle."
         })
 
+    # 5) modèle demandé trop gros pour cette machine
+    best = recommendation["recommended"]
+    too_big = requested is not None and not requested["fits"]
+    if installed and too_big and best and not has_model_named(best, models):
+        actions.append({
+            "id": "pull_recommended_model",
+            "label": f"Télécharger le modèle recommandé {best}",
+            "needsSudo": False,
+            "safe": True,
+            "command": f"ollama pull {best}",
+            "model": best,
+            "notes": f"Adapté à {recommendation['hardware']['ramTotalGb']} Go de RAM."
+        })
+
     ok_ready = installed and listening and (has_model or len(models) > 0)
 
     # message "humain"
@@ -102,11 +477,15 @@ def status(model: str) -> Dict[str, Any]:
         msg = f"Ollama fonctionne mais le modèle '{model}' n'est pas présent."
     else:
         msg = "Ollama est prêt."
+    if too_big:
+        msg += (f" Le modèle '{model}' (~{requested['footprintGb']} Go) dépasse la mémoire disponible"
+                f" ({recommendation['memoryBudgetGb']} Go avec marge)"
+                + (f" : '{best}' est recommandé." if best else "."))
 
     return {
         "ok": True,
         "ready": ok_ready,
-        "endpoint": DEFAULT_ENDPOINT,
+        "endpoint": endpoint,
         "modelRequested": model,
         "ollama": {
             "installed": installed,
@@ -114,16 +493,411 @@ def status(model: str) -> Dict[str, Any]:
             "serviceActive": svc_active,
             "serviceEnabled": svc_enabled,
             "listening11434": listening,
-            "models": models
+            "models": models,
+            "modelSizes": probe["modelSizes"] if probe else {},
+            "loaded": probe["loaded"] if probe else []
         },
+        "recommendation": {
+            "recommended": best,
+            "requestedFits": requested["fits"] if requested else None,
+            "memoryBudgetGb": recommendation["memoryBudgetGb"],
+            "hardware": recommendation["hardware"],
+            "candidates": recommendation["candidates"][:5]
+        },
+        "probe": source,
+        "probeMs": int((time.monotonic() - started) * 1000),
         "actions": actions,
         "message": msg
     }
 
+# ---------------- RÉSIDENCE DU MODÈLE ----------------
+
+# Durée de résidence après préchargement (défaut d'Ollama : 5m)
+DEFAULT_KEEP_ALIVE = "30m"
+
+# Chargement d'un modèle depuis le disque : jusqu'à plusieurs dizaines de secondes
+LOAD_TIMEOUT = 300
+
+def warmup(api: OllamaApi, model: str, keep_alive: str = DEFAULT_KEEP_ALIVE) -> Dict[str, Any]:
+    """
+    Précharge le modèle en mémoire (generate sans prompt) et fixe sa durée de résidence
+
+    Pour un prompt vide, Ollama répond done_reason "load" sans load_duration :
+    la durée de chargement est celle de l'appel, mesurée ici (quasi nulle si
+    le modèle était déjà résident).
+
+    Returns:
+        dict: durée de chargement mesurée, motif de fin rapporté par Ollama, expiration
+    """
+    started = time.monotonic()
+    r = api.post("/api/generate", {"model": model, "prompt": "", "keep_alive": keep_alive}, timeout=LOAD_TIMEOUT)
+    load_ms = int((time.monotonic() - started) * 1000)
+    return {
+        "model": model,
+        "keepAlive": keep_alive,
+        "loadMs": load_ms,
+        "doneReason": r.get("done_reason", ""),
+        "loaded": keep_alive_status(api, model)
+    }
+
+def unload(api: OllamaApi, model: str) -> None:
+    """Décharge le modèle (keep_alive à 0)"""
+    api.post("/api/generate", {"model": model, "prompt": "", "keep_alive": 0}, timeout=LOAD_TIMEOUT)
+
+def keep_alive_status(api: OllamaApi, model: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Modèles résidents (/api/ps) et leur expiration"""
+    loaded = api.get("/api/ps").get("models") or []
+    return [{
+        "name": m.get("name") or m.get("model", ""),
+        "sizeVram": m.get("size_vram", 0),
+        "expiresAt": m.get("expires_at", "")
+    } for m in loaded if model is None or (m.get("name") or m.get("model")) == model]
+
+
+# ---------------- BENCHMARK ----------------
+
+BENCH_DB = os.path.join(os.path.expanduser("~"), ".tuxpilot", "benchmarks_ia.db")
+
+# Questions représentatives de l'assistant (réponse courte et déterministe)
+BENCH_PROMPTS = [
+    "Explique en trois phrases ce que fait la commande 'systemctl --failed'.",
+    "Mon disque / est plein à 95 %. Quelles vérifications faire en priorité ?",
+    "Le service sshd écoute sur 0.0.0.0:22 sans pare-feu actif. Quel est le risque ?"
+]
+BENCH_OPTIONS = {"temperature": 0, "seed": 42, "num_predict": 128}
+
+def measure_prompt(api: OllamaApi, model: str, prompt: str) -> Dict[str, Any]:
+    """Une génération en streaming : temps jusqu'au premier token, débit, chargement"""
+    started = time.monotonic()
+    first = None
+    final: Dict[str, Any] = {}
+    body = {"model": model, "prompt": prompt, "stream": True, "options": BENCH_OPTIONS}
+    for chunk in api.stream("/api/generate", body, timeout=LOAD_TIMEOUT):
+        if first is None and chunk.get("response"):
+            first = time.monotonic()
+        if chunk.get("done"):
+            final = chunk
+    eval_s = final.get("eval_duration", 0) / 1e9
+    return {
+        "totalMs": int((time.monotonic() - started) * 1000),
+        "ttftMs": int(((first or time.monotonic()) - started) * 1000),
+        "loadMs": int(final.get("load_duration", 0) / 1e6),
+        "promptTokens": final.get("prompt_eval_count", 0),
+        "tokens": final.get("eval_count", 0),
+        "tokensPerSecond": round(final.get("eval_count", 0) / eval_s, 1) if eval_s else 0.0
+    }
+
+def _median(values: List[float]) -> float:
+    values = sorted(values)
+    if not values:
+        return 0
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+def benchmark(api: OllamaApi, model: str, runs: int = 1) -> Dict[str, Any]:
+    """
+    Mesure chargement à froid, TTFT et tokens/s sur le jeu de prompts standard
+
+    Le modèle est d'abord déchargé : la première génération mesure le
+    chargement depuis le disque, les suivantes le modèle résident.
+    """
+    version = api.get("/api/version").get("version", "")
+    unload(api, model)
+    measures = []
+    for _ in range(max(1, runs)):
+        for prompt in BENCH_PROMPTS:
+            measures.append(measure_prompt(api, model, prompt))
+    warm = measures[1:] or measures
+    return {
+        "model": model,
+        "ollamaVersion": version,
+        "prompts": len(BENCH_PROMPTS),
+        "runs": max(1, runs),
+        "coldLoadMs": measures[0]["loadMs"],
+        "coldTtftMs": measures[0]["ttftMs"],
+        "ttftMs": int(_median([m["ttftMs"] for m in warm])),
+        "tokensPerSecond": round(_median([m["tokensPerSecond"] for m in warm]), 1),
+        "measures": measures
+    }
+
+def open_bench_db(path: Optional[str] = None):
+    path = path or BENCH_DB
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS benchmarks (
+            id INTEGER PRIMARY KEY,
+            timestamp REAL NOT NULL,
+            model TEXT NOT NULL,
+            ollama_version TEXT,
+            cold_load_ms INTEGER,
+            cold_ttft_ms INTEGER,
+            ttft_ms INTEGER,
+            tokens_per_second REAL,
+            details TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_benchmarks_model ON benchmarks (model, id)")
+    return conn
+
+def save_benchmark(result: Dict[str, Any], path: Optional[str] = None) -> int:
+    conn = open_bench_db(path)
+    try:
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO benchmarks (timestamp, model, ollama_version, cold_load_ms, cold_ttft_ms, ttft_ms, "
+                "tokens_per_second, details) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), result["model"], result["ollamaVersion"], result["coldLoadMs"], result["coldTtftMs"],
+                 result["ttftMs"], result["tokensPerSecond"], json.dumps(result["measures"]))
+            )
+        return cur.lastrowid
+    finally:
+        conn.close()
+
+def benchmark_history(model: Optional[str] = None, limit: int = 20, path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Derniers benchmarks, par modèle : meilleure mesure et écart de la dernière
+    par rapport à la précédente (régression si le débit baisse ou le TTFT monte)
+    """
+    conn = open_bench_db(path)
+    try:
+        rows = conn.execute(
+            "SELECT model, timestamp, ollama_version, cold_load_ms, cold_ttft_ms, ttft_ms, tokens_per_second "
+            "FROM benchmarks WHERE (? IS NULL OR model = ?) ORDER BY id DESC LIMIT ?",
+            (model, model, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    models: Dict[str, Dict[str, Any]] = {}
+    for name, ts, version, cold_load, cold_ttft, ttft, tps in rows:
+        runs = models.setdefault(name, {"model": name, "runs": []})["runs"]
+        runs.append({
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts)),
+            "ollamaVersion": version,
+            "coldLoadMs": cold_load,
+            "coldTtftMs": cold_ttft,
+            "ttftMs": ttft,
+            "tokensPerSecond": tps
+        })
+    for entry in models.values():
+        runs = entry["runs"]
+        entry["bestTokensPerSecond"] = max(r["tokensPerSecond"] for r in runs)
+        if len(runs) >= 2:
+            last, previous = runs[0], runs[1]
+            entry["deltaTokensPerSecond"] = round(last["tokensPerSecond"] - previous["tokensPerSecond"], 1)
+            entry["deltaTtftMs"] = last["ttftMs"] - previous["ttftMs"]
+            # Au-delà de 10 % : pas du bruit de mesure
+            entry["regression"] = (last["tokensPerSecond"] < 0.9 * previous["tokensPerSecond"]
+                                   or last["ttftMs"] > 1.1 * previous["ttftMs"])
+    return {"models": sorted(models.values(), key=lambda e: -e["bestTokensPerSecond"])}
+
+# ---------------- TÉLÉCHARGEMENT D'UN MODÈLE ----------------
+
+# Au plus un événement de progression par intervalle (hors changements d'étape)
+PROGRESS_INTERVAL = 0.5
+
+# Reprise après coupure : délai doublé à chaque tentative sans progrès
+PULL_MAX_ATTEMPTS = 6
+PULL_BACKOFF_BASE = 1.0
+PULL_BACKOFF_MAX = 30.0
+
+# Aucun octet reçu pendant ce délai : connexion considérée comme perdue
+PULL_STALL_TIMEOUT = 60
+
+# Erreurs d'Ollama qu'une nouvelle tentative ne corrigera pas
+PULL_FATAL_ERRORS = ("file does not exist", "not found", "invalid model name", "unauthorized")
+
+
+class PullProgress:
+    """Cumul des couches téléchargées, débit lissé et temps restant"""
+
+    def __init__(self):
+        self.layers: Dict[str, Dict[str, int]] = {}
+        self.speed = 0.0
+        self._last_bytes = 0
+        self._last_time = time.monotonic()
+        self._last_emit = 0.0
+
+    def update(self, digest: str, completed: int, total: int) -> None:
+        self.layers[digest] = {"completed": completed, "total": total}
+        now = time.monotonic()
+        done = self.completed
+        elapsed = now - self._last_time
+        if elapsed >= 0.2:
+            instant = max(0, done - self._last_bytes) / elapsed
+            # Moyenne mobile exponentielle : la vitesse affichée ne saute pas
+            self.speed = instant if not self.speed else 0.3 * instant + 0.7 * self.speed
+            self._last_bytes, self._last_time = done, now
+
+    @property
+    def completed(self) -> int:
+        return sum(layer["completed"] for layer in self.layers.values())
+
+    @property
+    def total(self) -> int:
+        return sum(layer["total"] for layer in self.layers.values())
+
+    def due(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_emit >= PROGRESS_INTERVAL:
+            self._last_emit = now
+            return True
+        return False
+
+    def snapshot(self, digest: str) -> Dict[str, Any]:
+        layer = self.layers.get(digest, {"completed": 0, "total": 0})
+        remaining = self.total - self.completed
+        return {
+            "layer": digest.replace("sha256:", "")[:12],
+            "layerCompleted": layer["completed"],
+            "layerTotal": layer["total"],
+            "completed": self.completed,
+            "total": self.total,
+            "percent": round(100 * self.completed / self.total, 1) if self.total else 0.0,
+            "bytesPerSecond": int(self.speed),
+            "etaS": int(remaining / self.speed) if self.speed > 0 else None
+        }
+
+
+def pull_model(api: OllamaApi, model: str, emit=emettre_evenement,
+               max_attempts: int = PULL_MAX_ATTEMPTS, sleep=time.sleep) -> Dict[str, Any]:
+    """
+    Télécharge un modèle via /api/pull en streaming
+
+    Après une coupure, la requête est relancée : Ollama reprend les couches
+    partiellement téléchargées. Le délai entre tentatives double (plafonné)
+    et le compteur repart de zéro dès qu'une tentative a fait progresser le
+    téléchargement.
+
+    Returns:
+        dict: succès, octets, durée, nombre de reprises
+    """
+    started = time.monotonic()
+    progress = PullProgress()
+    attempts = 0
+    retries = 0
+    last_status = None
+    while True:
+        attempts += 1
+        before = progress.completed
+        try:
+            for chunk in api.stream("/api/pull", {"model": model, "stream": True}, timeout=PULL_STALL_TIMEOUT):
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"])
+                status_text = chunk.get("status", "")
+                digest = chunk.get("digest")
+                if digest and "total" in chunk:
+                    progress.update(digest, chunk.get("completed", 0), chunk["total"])
+                    if progress.due() or chunk.get("completed", 0) >= chunk["total"]:
+                        emit("progress", model=model, **progress.snapshot(digest))
+                if status_text != last_status and not (digest and status_text.startswith("pulling")):
+                    emit("status", model=model, status=status_text)
+                last_status = status_text
+                if status_text == "success":
+                    result = {
+                        "ok": True,
+                        "model": model,
+                        "bytes": progress.total,
+                        "durationS": round(time.monotonic() - started, 1),
+                        "retries": retries
+                    }
+                    emit("result", **result)
+                    return result
+            raise ConnectionError("flux interrompu avant la fin du téléchargement")
+        except (RuntimeError, OllamaHttpError) as e:
+            error = str(e)
+            # Requête refusée (4xx) ou modèle inconnu : inutile de réessayer
+            if (getattr(e, "status", 500) < 500
+                    or any(fatal in error.lower() for fatal in PULL_FATAL_ERRORS)):
+                return _pull_failed(emit, model, error, retries, started)
+        except (OSError, ValueError, http.client.HTTPException) as e:
+            error = str(e) or type(e).__name__
+            api.close()
+
+        if progress.completed > before:
+            attempts = 1
+        if attempts >= max_attempts:
+            return _pull_failed(emit, model, error, retries, started)
+        retries += 1
+        delay = min(PULL_BACKOFF_MAX, PULL_BACKOFF_BASE * 2 ** (attempts - 1))
+        emit("retry", model=model, attempt=retries, delayS=delay, error=error, completed=progress.completed)
+        sleep(delay)
+
+def _pull_failed(emit, model: str, error: str, retries: int, started: float) -> Dict[str, Any]:
+    result = {
+        "ok": False,
+        "model": model,
+        "error": error,
+        "durationS": round(time.monotonic() - started, 1),
+        "retries": retries
+    }
+    emit("result", **result)
+    return result
+
+
 def main():
-    model = "llama3.1:8b"
-    if len(sys.argv) >= 2 and sys.argv[1].strip():
-        model = sys.argv[1].strip()
+    args = sys.argv[1:]
+    command = args[0] if args else ""
+
+    if command == "recommend":
+        try:
+            api = OllamaApi(endpoint_from_env())
+            try:
+                probe = probe_api(api)
+            finally:
+                api.close()
+            out = recommend(installed=probe["tags"] if probe else [],
+                            loaded_gb=sum(m["sizeVram"] for m in probe["loaded"]) / 1e9 if probe else 0.0)
+        except Exception as e:
+            print(json.dumps({"erreur": str(e)}, ensure_ascii=False), file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(out, ensure_ascii=False, indent=2))
+        return
+
+    if command == "pull":
+        if len(args) < 2:
+            print(json.dumps({"erreur": "Usage : pull <modèle>"}, ensure_ascii=False), file=sys.stderr)
+            sys.exit(1)
+        api = OllamaApi(endpoint_from_env())
+        try:
+            result = pull_model(api, args[1])
+        finally:
+            api.close()
+        if not result["ok"]:
+            print(json.dumps({"erreur": result["error"]}, ensure_ascii=False), file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+
+    if command in ("warmup", "keep-alive", "bench", "bench-history"):
+        try:
+            model = args[1] if len(args) >= 2 else DEFAULT_MODEL
+            api = OllamaApi(endpoint_from_env())
+            try:
+                if command == "warmup":
+                    out = warmup(api, model, args[2] if len(args) >= 3 else DEFAULT_KEEP_ALIVE)
+                elif command == "keep-alive":
+                    # keep-alive <model> : état ; keep-alive <model> <durée> : nouvelle durée
+                    if len(args) >= 3:
+                        out = warmup(api, model, args[2])
+                    else:
+                        out = {"model": model, "loaded": keep_alive_status(api, model)}
+                elif command == "bench":
+                    out = benchmark(api, model, int(args[2]) if len(args) >= 3 else 1)
+                    out["id"] = save_benchmark(out)
+                else:
+                    out = benchmark_history(args[1] if len(args) >= 2 else None)
+            finally:
+                api.close()
+        except Exception as e:
+            print(json.dumps({"erreur": str(e)}, ensure_ascii=False), file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(out, ensure_ascii=False, indent=2))
+        return
+
+    # Sans argument : modèle recommandé pour cette machine
+    model = command.strip() or None
 
     out = status(model)
     print(json.dumps(out, ensure_ascii=False, indent=2))
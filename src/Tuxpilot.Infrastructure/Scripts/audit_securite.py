@@ -1,24 +1,243 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import hashlib
+import ipaddress
 import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import sqlite3
 import subprocess
 import sys
 import re
+import shutil
+import threading
+import time
+from concurrent.futures import (FIRST_COMPLETED, Future,
+                                TimeoutError as FuturesTimeout, wait)
 from pathlib import Path
 
-def executer_commande(cmd, timeout=10):
+import arriere_plan
+import historique_audit
+import index_permissions
+import integrite_paquets
+from evenements import emettre_evenement
+import mode_impact
+import pare_feu_nft
+import sondes
+import sshd_config
+
+# Délais (secondes) : par vérification et pour l'audit complet
+DELAI_VERIFICATION = 15
+DELAI_AUDIT = 30
+
+# Délai des vérifications profondes (mode deep uniquement)
+DELAI_PROFOND = 120
+
+# Contexte du thread de la vérification en cours (échéance, vérification créée)
+_contexte = threading.local()
+
+def _lancer_commande(cmd, timeout):
+    # Le timeout ne dépasse jamais l'échéance de la vérification en cours
+    echeance = getattr(_contexte, "echeance", None)
+    if echeance is not None:
+        timeout = min(timeout, echeance - time.monotonic())
+        if timeout <= 0:
+            return {"success": False, "output": "", "error": "délai dépassé", "code": -1}
+    with _verrou_cache:
+        _statistiques_cache["processus"] += 1
     try:
-        r = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=timeout)
-        return {"success": r.returncode == 0, "output": (r.stdout or "").strip(), "error": (r.stderr or "").strip(), "code": r.returncode}
+        # Session dédiée : au timeout, tout le pipeline shell est tué (pas seulement sh)
+        p = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             text=True, start_new_session=True)
+        try:
+            out, err = p.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(p.pid, signal.SIGKILL)
+            except OSError:
+                pass
+            p.communicate()
+            raise
+        return {"success": p.returncode == 0, "output": (out or "").strip(), "error": (err or "").strip(), "code": p.returncode}
     except Exception as e:
         return {"success": False, "output": "", "error": str(e), "code": -1}
 
+# ---------------- CACHE DES COMMANDES ----------------
+
+# Résultats mémorisés pendant un audit : {commande: Future}. Une commande
+# identique demandée par plusieurs vérifications (même en parallèle) n'est
+# exécutée qu'une fois. None = pas d'audit en cours, pas de mémoïsation.
+_cache_commandes = None
+_verrou_cache = threading.Lock()
+_statistiques_cache = {"executees": 0, "reutilisees": 0, "processus": 0}
+
+# Lecture directe de /etc, /proc, /sys (sondes.py) plutôt que des commandes
+SONDES_NATIVES = True
+
+# Unités dont l'état est lu en une seule requête systemctl avant les vérifications
+UNITES_AUDIT = [
+    "ufw.service",
+    "firewalld.service",
+    "fail2ban.service",
+    "dnf-automatic.timer",
+    "unattended-upgrades.service"
+]
+
+_etats_unites = {}
+
+def demarrer_cache_audit():
+    """Ouvre un cache de commandes neuf pour un audit"""
+    global _cache_commandes
+    with _verrou_cache:
+        _cache_commandes = {}
+        _statistiques_cache.update(executees=0, reutilisees=0, processus=0)
+        _etats_unites.clear()
+
+def terminer_cache_audit():
+    """Ferme le cache (les résultats ne survivent pas à l'audit)"""
+    global _cache_commandes
+    with _verrou_cache:
+        _cache_commandes = None
+    return dict(_statistiques_cache)
+
+def memoiser(cle, calcul, timeout=10, conserver=None):
+    """
+    Calcule une valeur une seule fois par audit, même si plusieurs
+    vérifications la demandent en parallèle (les suivantes attendent le
+    premier calcul, dans la limite de leur propre échéance)
+
+    Args:
+        cle: Clé du cache (ex. ("commande", cmd))
+        calcul: Fonction sans argument produisant la valeur
+        conserver: Fonction(valeur) -> bool ; False = ne pas mémoriser
+    """
+    with _verrou_cache:
+        if _cache_commandes is None:
+            future = None
+        elif cle in _cache_commandes:
+            if cle[0] == "commande":
+                _statistiques_cache["reutilisees"] += 1
+            future, proprietaire = _cache_commandes[cle], False
+        else:
+            future, proprietaire = Future(), True
+            _cache_commandes[cle] = future
+            if cle[0] == "commande":
+                _statistiques_cache["executees"] += 1
+
+    if future is None:
+        return calcul()
+
+    if proprietaire:
+        try:
+            valeur = calcul()
+        except Exception as e:
+            future.set_exception(e)
+            with _verrou_cache:
+                if _cache_commandes is not None:
+                    _cache_commandes.pop(cle, None)
+            raise
+        if conserver is not None and not conserver(valeur):
+            # Échec (délai, etc.) : une autre vérification pourra réessayer
+            with _verrou_cache:
+                if _cache_commandes is not None:
+                    _cache_commandes.pop(cle, None)
+        future.set_result(valeur)
+        return valeur
+
+    # Valeur déjà en cours de calcul par une autre vérification : attendre
+    echeance = getattr(_contexte, "echeance", None)
+    attente = timeout if echeance is None else min(timeout, echeance - time.monotonic())
+    return future.result(timeout=max(0, attente))
+
+def hors_ligne():
+    """Audit d'une arborescence montée (--root) plutôt que du système en cours"""
+    return sondes.RACINE != "/"
+
+def executer_commande(cmd, timeout=10):
+    if hors_ligne():
+        # Les commandes interrogeraient l'hôte, pas l'arborescence auditée
+        return {"success": False, "output": "", "error": "non disponible hors ligne (--root)", "code": -1}
+    try:
+        return memoiser(("commande", cmd), lambda: _lancer_commande(cmd, timeout), timeout,
+                        conserver=lambda r: r["code"] != -1)
+    except FuturesTimeout:
+        return {"success": False, "output": "", "error": "délai dépassé", "code": -1}
+
+def sonde(nom, *args):
+    """
+    Résultat d'une sonde native (module sondes), mémorisé pour l'audit
+
+    Returns:
+        Valeur de la sonde, ou None si elle ne peut pas répondre ou si les
+        sondes sont désactivées : la vérification utilise alors la commande
+    """
+    if not SONDES_NATIVES and not hors_ligne():
+        return None
+    fonction = getattr(sondes, nom)
+    try:
+        return memoiser(("sonde", nom) + args, lambda: fonction(*args, racine=sondes.RACINE))
+    except Exception:
+        return None
+
 def cmd_exists(name: str) -> bool:
-    return executer_commande(f"command -v {name} >/dev/null 2>&1")["success"]
+    return not hors_ligne() and shutil.which(name) is not None
+
+def charger_etats_unites(unites=None, echeance=None):
+    """
+    Lit ActiveState/UnitFileState de toutes les unités en un seul appel
+    (au lieu d'un "systemctl is-active/is-enabled" par unité et par vérification)
+
+    Args:
+        echeance: Échéance (time.monotonic) de l'appel à systemctl, au plus 5 s
+
+    Returns:
+        bool: False si la lecture a été interrompue par l'échéance (états vides)
+    """
+    unites = UNITES_AUDIT if unites is None else unites
+    if hors_ligne():
+        # Pas de systemd à interroger : activation d'après les liens *.wants
+        for unite in unites:
+            _etats_unites[unite] = {"actif": "", "active_au_demarrage": sondes.etat_unite_fichiers(unite, sondes.RACINE)}
+        return True
+    delai = 5 if echeance is None else min(5, echeance - time.monotonic())
+    if delai > 0:
+        r = _lancer_commande("systemctl show -p ActiveState,UnitFileState " + " ".join(unites) + " 2>/dev/null",
+                             delai)
+    else:
+        r = {"success": False, "output": "", "error": "délai dépassé", "code": -1}
+    # Un bloc par unité, séparés par une ligne vide, dans l'ordre des arguments
+    blocs = r["output"].split("\n\n") if r["output"] else []
+    # Sans systemd (ou en cas d'échec) : états vides, pas de nouvel appel par unité
+    blocs += [""] * (len(unites) - len(blocs))
+    for unite, bloc in zip(unites, blocs):
+        proprietes = dict(l.split("=", 1) for l in bloc.splitlines() if "=" in l)
+        _etats_unites[unite] = {
+            "actif": proprietes.get("ActiveState", ""),
+            # Unité inconnue : UnitFileState vide, comme la sortie de is-enabled
+            "active_au_demarrage": proprietes.get("UnitFileState", "")
+        }
+    # code -1 : délai épuisé ou systemctl tué au timeout
+    return delai > 0 and r["code"] != -1
+
+def etat_unite(unite):
+    """État d'une unité : {"actif": "active"|..., "active_au_demarrage": "enabled"|...}"""
+    if "." not in unite:
+        unite += ".service"
+    if unite not in _etats_unites:
+        charger_etats_unites([unite])
+    return _etats_unites.get(unite, {"actif": "", "active_au_demarrage": ""})
+
+def en_service(etat):
+    """Unité en service : active, ou activée au démarrage pour un audit hors ligne"""
+    if hors_ligne():
+        return etat["active_au_demarrage"] == "enabled"
+    return etat["actif"] == "active"
 
 def make_verif(id_, nom, description, categorie, impact, points_max=20):
-    return {
+    verif = {
         "id": id_,
         "nom": nom,
         "description": description,
@@ -34,6 +253,11 @@ def make_verif(id_, nom, description, categorie, impact, points_max=20):
         "commande_correction": None,
         "auto_fix_safe": False
     }
+    # Mémorisée pour que le runner puisse la rendre en "info" si le délai expire
+    etat = getattr(_contexte, "etat", None)
+    if etat is not None:
+        etat["verif"] = verif
+    return verif
 
 def fail(verif, niveau, points, details, recommandation, preuve="", commande=None, auto_fix_safe=False):
     verif["reussie"] = False
@@ -65,6 +289,74 @@ def info(verif, details, recommandation, preuve=""):
     verif["preuve"] = preuve
     return verif
 
+# ---------------- DONNÉES PARTAGÉES ----------------
+
+def mode_fichier(chemin):
+    """Permissions octales (sonde, sinon stat -c '%a')"""
+    mode = sonde("mode_fichier", chemin)
+    if mode is None:
+        mode = executer_commande(f"stat -c '%a' {chemin} 2>/dev/null")["output"]
+    return mode
+
+def ligne_groupe(nom):
+    """Ligne de groupe (sonde /etc/group, sinon getent)"""
+    ligne = sonde("ligne_groupe", nom)
+    if ligne is None:
+        ligne = executer_commande(f"getent group {nom} 2>/dev/null")["output"]
+    return ligne
+
+def lister_ecoutes():
+    """
+    Sockets en écoute : /proc/net (sonde) ou, à défaut, "ss -H -tulnp"
+
+    Returns:
+        list | None: [{"proto", "adresse", "port", "locale", "users"}]
+    """
+    ecoutes = sonde("sockets_en_ecoute")
+    if ecoutes is not None:
+        return ecoutes
+
+    r = executer_commande("ss -H -tulnp 2>/dev/null || true", timeout=12)
+    if not r["output"]:
+        return None
+    ecoutes = []
+    for l in r["output"].splitlines():
+        # proto state recv-q send-q local:port peer users...
+        parts = l.split()
+        if len(parts) < 5 or ":" not in parts[4]:
+            continue
+        addr, port = parts[4].rsplit(":", 1)  # ex: 0.0.0.0:631 ou [::]:22
+        addr = addr.strip("[]").split("%", 1)[0]
+        ecoutes.append({
+            "proto": parts[0],
+            "adresse": addr,
+            "port": int(port) if port.isdigit() else 0,
+            "locale": addr in ("localhost", "::1") or addr.startswith("127."),
+            "users": " ".join(parts[6:]) if len(parts) >= 7 else ""
+        })
+    return ecoutes
+
+def lire_ruleset_nft():
+    """
+    Jeu de règles nftables, None sans droits suffisants
+
+    "nft list ruleset" exige CAP_NET_ADMIN. L'application lance l'audit sans
+    privilèges : les vérifications s'y rabattent alors sur les écoutes seules
+    (toute écoute non locale comptée comme exposée). Le verdict du pare-feu
+    n'est disponible que pour un audit du système courant lancé en root.
+    """
+    r = executer_commande("nft -j list ruleset 2>/dev/null", timeout=5)
+    return pare_feu_nft.decoder_ruleset(r["output"]) if r["success"] else None
+
+def _adresse_locale(adresse):
+    try:
+        return ipaddress.ip_address(adresse).is_loopback
+    except ValueError:
+        return adresse == "localhost"
+
+def formater_ecoute(e):
+    return f"{e['proto']} {e['adresse']}:{e['port']} {e['users']}".strip()
+
 # ---------------- CHECKS ----------------
 
 def verifier_firewall():
@@ -76,17 +368,26 @@ def verifier_firewall():
         "Limite les connexions entrantes non désirées."
     )
 
-    ufw = executer_commande("systemctl is-active ufw 2>/dev/null")
-    firewalld = executer_commande("systemctl is-active firewalld 2>/dev/null")
+    ufw = etat_unite("ufw")
+    firewalld = etat_unite("firewalld")
+
+    # Le jeu de règles (aussi lu par verifier_exposition) remplace ufw status / firewall-cmd
+    ruleset = lire_ruleset_nft() if not hors_ligne() else None
+    chaines = pare_feu_nft.resume_ruleset(ruleset) if ruleset is not None else []
 
-    if ufw["output"] == "active":
-        st = executer_commande("ufw status 2>/dev/null | head -n 30")
-        return ok(v, "UFW est actif", "✅ Pare-feu activé", preuve=st["output"])
-    if firewalld["output"] == "active":
-        zones = executer_commande("firewall-cmd --get-active-zones 2>/dev/null")
-        ports = executer_commande("firewall-cmd --list-ports 2>/dev/null")
-        preuve = f"{zones['output']}\nports: {ports['output']}".strip()
+    if en_service(ufw):
+        preuve = "\n".join(chaines) if chaines else executer_commande("ufw status 2>/dev/null | head -n 30")["output"]
+        return ok(v, "UFW est actif", "✅ Pare-feu activé", preuve=preuve or "ufw.service enabled")
+    if en_service(firewalld):
+        if chaines:
+            preuve = "\n".join(chaines)
+        else:
+            zones = executer_commande("firewall-cmd --get-active-zones 2>/dev/null")
+            ports = executer_commande("firewall-cmd --list-ports 2>/dev/null")
+            preuve = f"{zones['output']}\nports: {ports['output']}".strip() if zones["success"] else "firewalld.service enabled"
         return ok(v, "Firewalld est actif", "✅ Pare-feu activé", preuve=preuve)
+    if any("policy drop" in c for c in chaines):
+        return ok(v, "Règles nftables actives", "✅ Pare-feu activé (nftables)", preuve="\n".join(chaines))
 
     return fail(
         v, "Eleve", 5,
@@ -106,18 +407,19 @@ def verifier_selinux():
         "Réduit fortement l'impact d'un service compromis."
     )
 
-    if cmd_exists("getenforce"):
-        r = executer_commande("getenforce 2>/dev/null")
-        mode = r["output"]
-        if mode == "Enforcing":
-            return ok(v, "SELinux actif (Enforcing)", "✅ Très bon niveau de durcissement", preuve=mode)
-        if mode == "Permissive":
-            return fail(v, "Moyen", 12, "SELinux en Permissive", "Passez SELinux en Enforcing si possible.", preuve=mode)
-        if mode == "Disabled":
-            return fail(v, "Eleve", 8, "SELinux désactivé", "Activez SELinux si votre distribution le supporte.", preuve=mode)
-        return info(v, "SELinux : état inconnu", "Vérifiez manuellement SELinux.", preuve=mode)
+    mode = sonde("mode_selinux")
+    if mode is None:
+        if not cmd_exists("getenforce"):
+            return info(v, "SELinux non disponible", "Non applicable (distribution sans SELinux).", preuve="getenforce absent")
+        mode = executer_commande("getenforce 2>/dev/null")["output"]
 
-    return info(v, "SELinux non disponible", "Non applicable (distribution sans SELinux).", preuve="getenforce absent")
+    if mode == "Enforcing":
+        return ok(v, "SELinux actif (Enforcing)", "✅ Très bon niveau de durcissement", preuve=mode)
+    if mode == "Permissive":
+        return fail(v, "Moyen", 12, "SELinux en Permissive", "Passez SELinux en Enforcing si possible.", preuve=mode)
+    if mode == "Disabled":
+        return fail(v, "Eleve", 8, "SELinux désactivé", "Activez SELinux si votre distribution le supporte.", preuve=mode)
+    return info(v, "SELinux : état inconnu", "Vérifiez manuellement SELinux.", preuve=mode)
 
 def verifier_fail2ban():
     v = make_verif(
@@ -129,14 +431,18 @@ def verifier_fail2ban():
     )
 
     # installed?
-    installed = executer_commande("rpm -q fail2ban 2>/dev/null || dpkg -l fail2ban 2>/dev/null")
-    active = executer_commande("systemctl is-active fail2ban 2>/dev/null")
-    enabled = executer_commande("systemctl is-enabled fail2ban 2>/dev/null")
-
-    if "fail2ban" in installed["output"] and active["output"] == "active":
-        return ok(v, "Fail2Ban actif", "✅ Protection brute-force en place", preuve=f"{enabled['output']} / {active['output']}")
-    if "fail2ban" in installed["output"]:
-        return fail(v, "Faible", 15, "Fail2Ban installé mais inactif", "Activez Fail2Ban si vous exposez SSH.", preuve=f"{enabled['output']} / {active['output']}",
+    installe = sonde("paquet_installe", "fail2ban")
+    if installe is None:
+        installe = executer_commande(
+            "rpm -q fail2ban >/dev/null 2>&1 || dpkg-query -W -f='${Status}' fail2ban 2>/dev/null | grep -q ' installed$'"
+        )["success"]
+    unite = etat_unite("fail2ban")
+    active, enabled = unite["actif"], unite["active_au_demarrage"]
+
+    if installe and en_service(unite):
+        return ok(v, "Fail2Ban actif", "✅ Protection brute-force en place", preuve=f"{enabled} / {active}")
+    if installe:
+        return fail(v, "Faible", 15, "Fail2Ban installé mais inactif", "Activez Fail2Ban si vous exposez SSH.", preuve=f"{enabled} / {active}",
                    commande="pkexec systemctl enable --now fail2ban", auto_fix_safe=True)
 
     return info(v, "Fail2Ban non installé", "Optionnel (recommandé si SSH exposé).", preuve="package absent")
@@ -150,44 +456,83 @@ def verifier_ssh():
         "SSH exposé mal configuré = risque d'accès non autorisé."
     )
 
-    # écoute ?
-    ss = executer_commande("ss -H -tulnp 2>/dev/null | grep -E ':(22)\\s' || true")
-    ssh_listen = ss["output"].strip() != ""
-
-    # config lisible ?
-    conf = executer_commande("cat /etc/ssh/sshd_config 2>/dev/null")
-    if not conf["success"] or conf["output"] == "":
-        if ssh_listen:
-            return fail(v, "Moyen", 10, "SSH écoute mais sshd_config inaccessible", "Vérifiez le service SSH.", preuve=ss["output"])
+    # Configuration effective : Include, première valeur gagnante, blocs Match
+    config = sshd_config.configuration_effective(sondes.RACINE)
+
+    # Mêmes données que verifier_ports_exposes : lues une seule fois par audit
+    ecoutes = lister_ecoutes() or []
+    if config is None:
+        # sshd_config illisible : seul le port par défaut est connu
+        ecoute_ssh = [e for e in ecoutes if e["port"] == 22 or '"sshd"' in e["users"]]
+        if ecoute_ssh:
+            return fail(v, "Moyen", 10, "SSH écoute mais sshd_config inaccessible", "Vérifiez le service SSH.",
+                        preuve="\n".join(formater_ecoute(e) for e in ecoute_ssh))
         return ok(v, "SSH non installé / non exposé", "✅ Aucun risque SSH (non utilisé)", preuve="pas d'écoute sur le port 22")
 
-    config = conf["output"]
+    valeurs = config["valeurs"]
+    ports = sorted({p for _, p in config["ecoutes"]})
+
+    if hors_ligne():
+        # Pas de sockets à lire : écoutes configurées si sshd démarre au boot
+        demarre = en_service(etat_unite("sshd")) or en_service(etat_unite("ssh"))
+        ecoutes = [{"proto": "tcp", "adresse": hote, "port": port, "locale": _adresse_locale(hote),
+                    "users": '"sshd" (configuré)'} for hote, port in config["ecoutes"]] if demarre else []
+
+    def ecoute_sshd(e):
+        if '"sshd"' in e["users"]:
+            return True
+        for hote, port in config["ecoutes"]:
+            if e["port"] == port and hote in ("0.0.0.0", "::", "*", e["adresse"]):
+                return True
+        return False
+
+    ecoute_ssh = [e for e in ecoutes if ecoute_sshd(e)]
+    exposees = [e for e in ecoute_ssh if not e["locale"]]
+
     problemes = []
     points_perdus = 0
 
-    if re.search(r"^\s*PermitRootLogin\s+yes\s*$", config, flags=re.M):
+    if valeurs["permitrootlogin"] == "yes":
         problemes.append("PermitRootLogin yes")
         points_perdus += 8
 
-    if re.search(r"^\s*PasswordAuthentication\s+yes\s*$", config, flags=re.M):
+    if valeurs["passwordauthentication"] == "yes":
         problemes.append("PasswordAuthentication yes")
         points_perdus += 6
 
-    if re.search(r"^\s*Port\s+22\s*$", config, flags=re.M) or not re.search(r"^\s*Port\s+\d+\s*$", config, flags=re.M):
+    if valeurs["permitemptypasswords"] == "yes":
+        problemes.append("PermitEmptyPasswords yes")
+        points_perdus += 8
+
+    if 22 in ports:
         problemes.append("Port 22 (défaut)")
         points_perdus += 3
 
-    if not ssh_listen:
+    # Blocs Match qui rouvrent un accès fermé globalement (pour certaines connexions)
+    for surcharge in config["surcharges"]:
+        if surcharge["valeur"] == "yes" and valeurs.get(surcharge["cle"]) != "yes":
+            problemes.append(f"{surcharge['cle']} yes (Match {surcharge['match']})")
+            points_perdus += 3
+
+    preuve = "\n".join([
+        "écoute: " + (", ".join(formater_ecoute(e) for e in ecoute_ssh) or "aucune"),
+        f"Port={','.join(map(str, ports))} PermitRootLogin={valeurs['permitrootlogin']} "
+        f"PasswordAuthentication={valeurs['passwordauthentication']}",
+        "fichiers: " + ", ".join(config["fichiers"])
+    ])
+
+    if not exposees:
         # SSH configuré mais pas exposé : info, pas pénalité forte
-        return info(v, "SSH présent mais non exposé", "OK si vous ne l'utilisez pas.", preuve="pas d'écoute sur :22")
+        detail = "SSH n'écoute qu'en local" if ecoute_ssh else "SSH présent mais non exposé"
+        return info(v, detail, "OK si vous ne l'utilisez pas.", preuve=preuve)
 
     if problemes:
         niveau = "Eleve" if points_perdus >= 10 else "Moyen"
         return fail(v, niveau, v["points_max"] - points_perdus, " / ".join(problemes),
                     "Désactivez root login, privilégiez clés SSH, désactivez mot de passe.",
-                    preuve="ss écoute sur 22 + sshd_config",
+                    preuve=preuve,
                     commande=None)
-    return ok(v, "SSH exposé et correctement configuré", "✅ SSH durci", preuve="ss écoute sur 22 + config OK")
+    return ok(v, "SSH exposé et correctement configuré", "✅ SSH durci", preuve=preuve)
 
 def verifier_updates():
     v = make_verif(
@@ -243,40 +588,40 @@ def verifier_ports_exposes():
         "Plus de services exposés = surface d'attaque plus grande."
     )
 
-    r = executer_commande("ss -H -tulnp 2>/dev/null || true", timeout=12)
-    if not r["output"]:
-        return info(v, "Vérification impossible", "Vérifiez manuellement avec ss.", preuve=r["error"])
+    ecoutes = lister_ecoutes()
+    if ecoutes is None:
+        return info(v, "Vérification impossible", "Vérifiez manuellement avec ss.", preuve="ss et /proc/net indisponibles")
+
+    # Verdict du pare-feu (même lecture que verifier_exposition) : un port
+    # bloqué par les règles input n'est pas exposé, même s'il écoute sur 0.0.0.0.
+    # Seule cette vérification pénalise les écoutes ; "exposure" détaille sans noter
+    verdicts = {}
+    ruleset = lire_ruleset_nft()
+    if ruleset is not None:
+        for e in pare_feu_nft.analyser_exposition(ruleset, ecoutes)["ecoutes"]:
+            verdicts[(e["proto"], e["adresse"], e["port"])] = e["acces"]
 
-    lignes = [l.strip() for l in r["output"].splitlines() if l.strip()]
     exposed = []
     local = []
-
-    for l in lignes:
-        # proto state recv-q send-q local:port peer users...
-        parts = l.split()
-        if len(parts) < 5:
-            continue
-        local_addr = parts[4]  # ex: 0.0.0.0:631 ou [::]:22
-        users = " ".join(parts[6:]) if len(parts) >= 7 else ""
-        if ":" not in local_addr:
-            continue
-        addr = local_addr.rsplit(":", 1)[0]
-        port = local_addr.rsplit(":", 1)[1]
-        item = f"{port} ({users})"
-        if addr in ("127.0.0.1", "::1", "localhost"):
-            local.append(item)
-        elif addr.startswith("127.") or addr.startswith("[::1]"):
+    bloques = []
+    for e in ecoutes:
+        item = f"{e['port']} ({e['users']})"
+        if e["locale"]:
             local.append(item)
+        elif verdicts.get((e["proto"], e["adresse"], e["port"])) == pare_feu_nft.BLOQUE:
+            bloques.append(item)
         else:
             exposed.append(item)
 
     preuve = ""
-    if exposed:
-        preuve += "Exposés:\n" + "\n".join(exposed[:12])
-    if local:
-        preuve += ("\n\nLocaux:\n" if preuve else "Locaux:\n") + "\n".join(local[:12])
+    for titre, items in (("Exposés", exposed), ("Bloqués par le pare-feu", bloques), ("Locaux", local)):
+        if items:
+            preuve += ("\n\n" if preuve else "") + f"{titre}:\n" + "\n".join(items[:12])
 
     if not exposed:
+        if bloques:
+            return ok(v, f"{len(bloques)} service(s) en écoute bloqué(s) par le pare-feu, {len(local)} local(aux)",
+                      "✅ Rien d'exposé sur le réseau", preuve=preuve)
         return ok(v, f"{len(local)} service(s) en écoute locale uniquement", "✅ Rien d'exposé sur le réseau", preuve=preuve)
 
     # pénalité selon volume exposé
@@ -287,6 +632,39 @@ def verifier_ports_exposes():
         return fail(v, "Moyen", 12, f"{n} ports exposés", "Désactivez les services non indispensables.", preuve=preuve)
     return fail(v, "Eleve", 8, f"{n} ports exposés (beaucoup)", "Réduisez la surface d'attaque (services inutiles).", preuve=preuve)
 
+def verifier_exposition():
+    v = make_verif(
+        "exposure",
+        "Exposition réelle",
+        "Croise les ports en écoute avec les règles nftables (input)",
+        "Réseau",
+        "Un service en écoute n'est un risque que si le pare-feu laisse passer les connexions."
+    )
+
+    # Détail règle par règle, sans pénalité : les écoutes accessibles sont déjà
+    # comptées par verifier_ports_exposes, avec le même verdict nftables
+
+    ruleset = lire_ruleset_nft()
+    if ruleset is None:
+        return info(v, "Règles nftables illisibles",
+                    "Lecture du pare-feu réservée à un audit administrateur (sudo) : les écoutes non locales sont comptées comme exposées.",
+                    preuve="nft -j list ruleset indisponible (nft absent ou audit sans CAP_NET_ADMIN)")
+    ecoutes = lister_ecoutes()
+    if ecoutes is None:
+        return info(v, "Vérification impossible", "Vérifiez manuellement avec ss.", preuve="ss et /proc/net indisponibles")
+
+    r = pare_feu_nft.analyser_exposition(ruleset, ecoutes)
+    lignes = [f"{formater_ecoute(e)} -> {e['acces']} ({e['regle']})" for e in r["ecoutes"]]
+    preuve = "\n".join((r["chainesInput"] or ["aucune chaîne input"]) + lignes[:20])
+
+    n = r["accessibles"]
+    if n == 0:
+        detail = f"Aucun service accessible depuis l'extérieur ({r['restreintes']} restreint(s), {r['bloquees']} bloqué(s))"
+        return ok(v, detail, "✅ Le pare-feu filtre les services en écoute", preuve=preuve)
+    return info(v, f"{n} service(s) accessible(s) depuis l'extérieur",
+                "Filtrez dans le pare-feu les ports qui ne doivent pas être joignables (voir \"Ports & services\").",
+                preuve=preuve)
+
 def verifier_permissions():
     v = make_verif(
         "perms",
@@ -297,13 +675,14 @@ def verifier_permissions():
     )
 
     problemes = []
-    passwd = executer_commande("stat -c '%a' /etc/passwd 2>/dev/null")
-    if passwd["output"] and passwd["output"] != "644":
-        problemes.append(f"/etc/passwd={passwd['output']}")
+    passwd = mode_fichier("/etc/passwd")
+    if passwd and passwd != "644":
+        problemes.append(f"/etc/passwd={passwd}")
 
-    shadow = executer_commande("stat -c '%a' /etc/shadow 2>/dev/null")
-    if shadow["output"] and shadow["output"] not in ["000", "640", "400"]:
-        problemes.append(f"/etc/shadow={shadow['output']}")
+    # stat -c '%a' affiche "0" pour un mode 000
+    shadow = mode_fichier("/etc/shadow")
+    if shadow and shadow not in ["0", "000", "640", "400"]:
+        problemes.append(f"/etc/shadow={shadow}")
 
     if problemes:
         return fail(v, "Moyen", 12, "Permissions incorrectes", "Corrigez les permissions des fichiers système.", preuve=", ".join(problemes))
@@ -318,8 +697,8 @@ def verifier_sudo_users():
         "Trop d'admins = risque accru en cas de compromission."
     )
 
-    wheel = executer_commande("getent group wheel 2>/dev/null")
-    sudo = executer_commande("getent group sudo 2>/dev/null")
+    wheel = ligne_groupe("wheel")
+    sudo = ligne_groupe("sudo")
     users = []
 
     def extract(line):
@@ -331,11 +710,11 @@ def verifier_sudo_users():
             return [u.strip() for u in parts[3].split(",") if u.strip()]
         return []
 
-    users += extract(wheel["output"])
-    users += extract(sudo["output"])
+    users += extract(wheel)
+    users += extract(sudo)
     users = sorted(set(users))
 
-    preuve = f"wheel: {wheel['output']}\nsudo: {sudo['output']}".strip()
+    preuve = f"wheel: {wheel}\nsudo: {sudo}".strip()
 
     if len(users) <= 1:
         return ok(v, "Un seul admin détecté", "✅ Bonne pratique", preuve=preuve)
@@ -352,7 +731,11 @@ def verifier_root_locked():
         "Un root avec mot de passe augmente le risque d'accès direct."
     )
 
-    r = executer_commande("passwd -S root 2>/dev/null || true")
+    statut = sonde("etat_compte", "root")
+    if statut is not None:
+        r = {"output": f"root {statut} (/etc/shadow)", "error": ""}
+    else:
+        r = executer_commande("passwd -S root 2>/dev/null || true")
     if not r["output"]:
         return info(v, "Vérification impossible", "Vérifiez manuellement l'état du compte root.", preuve=r["error"])
 
@@ -374,10 +757,12 @@ def verifier_logs_persistants():
         "Des logs persistants aident à détecter/diagnostiquer une intrusion."
     )
 
-    exists = Path("/var/log/journal").is_dir()
+    exists = os.path.isdir(sondes.chemin("/var/log/journal", sondes.RACINE))
     if exists:
-        st = executer_commande("stat -c '%a %U:%G' /var/log/journal 2>/dev/null")
-        return ok(v, "Logs persistants activés", "✅ Bon pour l'audit/forensic", preuve=f"/var/log/journal présent\n{st['output']}")
+        st = sonde("proprietaire_fichier", "/var/log/journal")
+        if st is None:
+            st = executer_commande("stat -c '%a %U:%G' /var/log/journal 2>/dev/null")["output"]
+        return ok(v, "Logs persistants activés", "✅ Bon pour l'audit/forensic", preuve=f"/var/log/journal présent\n{st}")
     return fail(
         v, "Faible", 15,
         "Logs journald non persistants",
@@ -428,14 +813,16 @@ def verifier_chiffrement_disque():
         "Protège les données en cas de vol/perte de la machine."
     )
 
-    r = executer_commande("lsblk -o NAME,TYPE,FSTYPE,MOUNTPOINT -r 2>/dev/null || true")
-    if not r["output"]:
-        return info(v, "Vérification impossible", "Vérifiez manuellement lsblk.", preuve=r["error"])
+    crypt = sonde("volumes_chiffres")
+    if crypt is None:
+        r = executer_commande("lsblk -o NAME,TYPE,FSTYPE,MOUNTPOINT -r 2>/dev/null || true")
+        if not r["output"]:
+            return info(v, "Vérification impossible", "Vérifiez manuellement lsblk.", preuve=r["error"])
 
-    crypt = []
-    for line in r["output"].splitlines():
-        if " crypt " in f" {line} " or " luks " in f" {line.lower()} ":
-            crypt.append(line)
+        crypt = []
+        for line in r["output"].splitlines():
+            if " crypt " in f" {line} " or "luks" in line.lower():
+                crypt.append(line)
 
     if crypt:
         return ok(v, "Chiffrement détecté", "✅ Données mieux protégées", preuve="\n".join(crypt[:10]))
@@ -473,13 +860,11 @@ def verifier_services_auto_updates():
     )
 
     # Fedora
-    dnf_timer = executer_commande("systemctl is-enabled dnf-automatic.timer 2>/dev/null || true")
-    if dnf_timer["output"] == "enabled":
+    if etat_unite("dnf-automatic.timer")["active_au_demarrage"] == "enabled":
         return ok(v, "dnf-automatic activé", "✅ Auto-updates en place", preuve="dnf-automatic.timer enabled")
 
     # Debian/Ubuntu
-    ua = executer_commande("systemctl is-enabled unattended-upgrades 2>/dev/null || true")
-    if ua["output"] == "enabled":
+    if etat_unite("unattended-upgrades")["active_au_demarrage"] == "enabled":
         return ok(v, "unattended-upgrades activé", "✅ Auto-updates en place", preuve="unattended-upgrades enabled")
 
     return info(v, "Auto-updates non détectées", "Optionnel mais recommandé sur machines non critiques.", preuve="dnf-automatic / unattended-upgrades non activés")
@@ -492,9 +877,15 @@ def verifier_secure_boot():
         "Durcissement",
         "Limite les bootkits / modifications au démarrage."
     )
-    if not cmd_exists("mokutil"):
+    etat = sonde("etat_secure_boot")
+    if etat == "non_efi":
+        return info(v, "Démarrage BIOS (non UEFI)", "Non applicable.", preuve="/sys/firmware/efi absent")
+    if etat is not None:
+        r = {"output": f"SecureBoot {etat}"}
+    elif not cmd_exists("mokutil"):
         return info(v, "Vérification impossible", "Installez mokutil pour vérifier Secure Boot.", preuve="mokutil absent")
-    r = executer_commande("mokutil --sb-state 2>/dev/null || true")
+    else:
+        r = executer_commande("mokutil --sb-state 2>/dev/null || true")
     if "enabled" in (r["output"].lower()):
         return ok(v, "Secure Boot activé", "✅ Bon signal de durcissement", preuve=r["output"])
     if "disabled" in (r["output"].lower()):
@@ -509,7 +900,11 @@ def verifier_time_sync():
         "Système",
         "Une heure correcte est essentielle pour la sécurité (TLS, logs)."
     )
-    r = executer_commande("timedatectl show -p NTPSynchronized --value 2>/dev/null || true")
+    synchro = sonde("horloge_synchronisee")
+    if synchro is not None:
+        r = {"output": "yes" if synchro else "no", "error": ""}
+    else:
+        r = executer_commande("timedatectl show -p NTPSynchronized --value 2>/dev/null || true")
     if r["output"] == "yes":
         return ok(v, "NTP synchronisé", "✅ OK", preuve="timedatectl NTPSynchronized=yes")
     if r["output"] == "no":
@@ -517,46 +912,754 @@ def verifier_time_sync():
                     commande="pkexec timedatectl set-ntp true", auto_fix_safe=True)
     return info(v, "Vérification impossible", "Vérifiez timedatectl.", preuve=r["output"] or r["error"])
 
-# ---------------- REPORT ----------------
+def verifier_index_permissions():
+    v = make_verif(
+        "fs_index",
+        "Permissions sensibles",
+        "Recense SUID/SGID, fichiers modifiables par tous et propriétaires inconnus",
+        "Permissions",
+        "Un nouveau binaire SUID ou un fichier système modifiable par tous permet une élévation de privilèges."
+    )
+
+    echeance = getattr(_contexte, "echeance", None)
+    r = index_permissions.indexer(sondes.RACINE, echeance=echeance - 1 if echeance else None)
+    nombres = r["nombres"]
+    resume = (f"{nombres['suid']} SUID, {nombres['sgid']} SGID, {nombres['ecritureGlobale']} modifiables par tous, "
+              f"{nombres['proprietaireInconnu']} propriétaires inconnus ({r['statistiques']['dossiers']} dossiers)")
+
+    def lister(fiches):
+        return "\n".join([resume] + [f"{f['chemin']} ({f['mode']}, {', '.join(f['drapeaux'])})" for f in fiches[:30]])
+
+    if r["nouvelles"]:
+        return fail(v, "Eleve", 5, f"{r['nombreNouvelles']} nouvelle(s) entrée(s) sensible(s) depuis la référence",
+                    "Vérifiez l'origine de ces fichiers (SUID/SGID ou droits d'écriture ajoutés).", preuve=lister(r["nouvelles"]))
+    if nombres["ecritureGlobale"]:
+        return fail(v, "Moyen", 12, f"{nombres['ecritureGlobale']} fichier(s)/dossier(s) modifiable(s) par tous",
+                    "Retirez le droit d'écriture aux autres (chmod o-w) ou ajoutez le sticky bit aux dossiers partagés.",
+                    preuve=lister(r["entrees"]["ecritureGlobale"]))
+    if nombres["proprietaireInconnu"]:
+        return fail(v, "Faible", 16, f"{nombres['proprietaireInconnu']} fichier(s) sans propriétaire connu",
+                    "Attribuez ces fichiers à un compte existant (chown) ou supprimez-les.",
+                    preuve=lister(r["entrees"]["proprietaireInconnu"]))
+    if not r["complet"]:
+        return info(v, "Index partiel", "Relancez l'audit : le parcours reprend là où il s'est arrêté.", preuve=resume)
+    if not r["reference"]:
+        return ok(v, "Référence créée", "✅ Les prochaines apparitions seront signalées", preuve=lister(r["entrees"]["suid"]))
+    return ok(v, "Aucune nouvelle entrée sensible", "✅ OK", preuve=lister(r["entrees"]["suid"]))
+
+def verifier_integrite_paquets():
+    v = make_verif(
+        "package_integrity",
+        "Intégrité des paquets",
+        "Compare les fichiers installés aux empreintes des paquets (rpm/dpkg)",
+        "Système",
+        "Un binaire modifié hors du gestionnaire de paquets peut signaler une compromission."
+    )
+
+    # Marge pour rendre un résultat partiel avant l'expiration de la vérification
+    echeance = getattr(_contexte, "echeance", None)
+    r = integrite_paquets.verifier_integrite(sondes.RACINE, echeance=echeance - 1 if echeance else None)
+    if r["gestionnaire"] is None:
+        return info(v, "Vérification impossible", "Aucune base rpm/dpkg lisible.", preuve="rpmdb / dpkg status absents")
+
+    stats = r["statistiques"]
+    resume = (f"{r['verifies']}/{r['fichiers']} fichiers vérifiés ({stats['depuisCache']} depuis le cache), "
+              f"{stats['manquants']} absents, {stats['illisibles']} illisibles")
+    binaires = r["modifies"]["binaires"]
+    configuration = r["modifies"]["configuration"]
+    # Documentation et licences modifiées : sans incidence sur la sécurité, listées en dernier
+    annexes = r["modifies"]["documentation"] + r["modifies"]["licences"]
+    preuve = "\n".join([resume] + [f"{m['chemin']} ({m['paquet']})" for m in binaires + configuration + annexes][:30])
+
+    if binaires:
+        commande = "sudo rpm -Va" if r["gestionnaire"] == "rpm" else "sudo dpkg --verify"
+        return fail(v, "Eleve", 5, f"{r['nombreModifies']['binaires']} fichier(s) de paquet modifié(s)",
+                    "Vérifiez ces fichiers et réinstallez les paquets concernés.", preuve=preuve, commande=commande)
+    if not r["complet"]:
+        return info(v, "Vérification partielle", "Relancez l'audit approfondi : les fichiers déjà vérifiés sont en cache.", preuve=preuve)
+    if configuration:
+        return ok(v, f"Aucun binaire modifié ({r['nombreModifies']['configuration']} fichier(s) de configuration personnalisé(s))",
+                  "✅ Fichiers de configuration modifiés : attendu après personnalisation", preuve=preuve)
+    return ok(v, "Aucun fichier de paquet modifié", "✅ OK", preuve=preuve)
+
+# ---------------- RUNNER ----------------
+
+# Ordre du rapport (indépendant de l'ordre de fin des vérifications)
+VERIFICATIONS = [
+    verifier_firewall,
+    verifier_selinux,
+    verifier_fail2ban,
+    verifier_ssh,
+    verifier_updates,
+    verifier_ports_exposes,
+    verifier_exposition,
+    verifier_permissions,
+    verifier_sudo_users,
+    verifier_root_locked,
+    verifier_logs_persistants,
+    verifier_verrouillage_ecran,
+    verifier_chiffrement_disque,
+    verifier_flatpak_sandbox,
+    verifier_services_auto_updates,
+    verifier_secure_boot,
+    verifier_time_sync,
+    verifier_index_permissions,
+    verifier_integrite_paquets
+]
+
+# Classe de coût de chaque vérification :
+#   instant : lectures natives (/etc, /proc, /sys) ou états déjà chargés
+#   fast    : quelques commandes locales rapides ou parcours de /proc
+#   slow    : commandes locales lentes (plusieurs secondes possibles)
+#   network : dépend du réseau (métadonnées de dépôts)
+COUTS = {
+    verifier_firewall: "fast",
+    verifier_selinux: "instant",
+    verifier_fail2ban: "instant",
+    verifier_ssh: "fast",
+    verifier_updates: "network",
+    verifier_ports_exposes: "fast",
+    verifier_exposition: "fast",
+    verifier_permissions: "instant",
+    verifier_sudo_users: "instant",
+    verifier_root_locked: "instant",
+    verifier_logs_persistants: "instant",
+    verifier_verrouillage_ecran: "fast",
+    verifier_chiffrement_disque: "instant",
+    verifier_flatpak_sandbox: "slow",
+    verifier_services_auto_updates: "instant",
+    verifier_secure_boot: "instant",
+    verifier_time_sync: "instant",
+    verifier_index_permissions: "slow",
+    verifier_integrite_paquets: "slow"
+}
+
+# Classes exécutées par mode. Le mode deep ajoute les vérifications de PROFONDES
+# (analyses coûteuses, jamais lancées en standard).
+CLASSES_PAR_MODE = {
+    "quick": {"instant", "fast"},
+    "standard": {"instant", "fast", "slow", "network"},
+    "deep": {"instant", "fast", "slow", "network"}
+}
+PROFONDES = {verifier_integrite_paquets}
+MODE_DEFAUT = "standard"
+
+# Vérifications qui n'ont de sens que sur le système en cours d'exécution
+# (sockets, horloge, firmware, session, dépôts) : ignorées avec --root
+EXECUTION = {
+    verifier_updates,
+    verifier_ports_exposes,
+    verifier_exposition,
+    verifier_verrouillage_ecran,
+    verifier_chiffrement_disque,
+    verifier_flatpak_sandbox,
+    verifier_secure_boot,
+    verifier_time_sync
+}
+
+# Budget de la première phase (vérifications instant/fast) si non précisé
+BUDGET_RAPIDE_MS = 500
+
+def selectionner_verifications(mode=MODE_DEFAUT):
+    """
+    Vérifications d'un mode, séparées en deux phases
+
+    Returns:
+        tuple: (phase 1 : instant/fast, phase 2 : le reste) dans l'ordre du registre
+    """
+    classes = CLASSES_PAR_MODE[mode]
+    retenues = [f for f in VERIFICATIONS
+                if COUTS.get(f, "slow") in classes and (mode == "deep" or f not in PROFONDES)
+                and not (hors_ligne() and f in EXECUTION)]
+    rapides = [f for f in retenues if COUTS.get(f, "slow") in CLASSES_PAR_MODE["quick"] and f not in PROFONDES]
+    return rapides, [f for f in retenues if f not in rapides]
+
+def _verif_inconnue(fonction):
+    """Vérification minimale si le délai expire avant même make_verif"""
+    id_ = fonction.__name__.replace("verifier_", "")
+    return make_verif(id_, id_, "", "Système", "")
+
+def _executer_verification(fonction, echeance, etat):
+    """Exécute une vérification dans un thread du pool (échéance propre)"""
+    _contexte.echeance = echeance
+    _contexte.etat = etat
+    debut = time.monotonic()
+    etat["debut"] = debut
+    try:
+        verif = fonction()
+    except Exception as e:
+        verif = etat.get("verif") or _verif_inconnue(fonction)
+        verif = info(verif, "Erreur pendant la vérification", "Vérifiez manuellement.", preuve=str(e))
+    finally:
+        _contexte.echeance = None
+        _contexte.etat = None
+    verif["duree_ms"] = int((time.monotonic() - debut) * 1000)
+    return verif
 
-def executer_audit():
-    verifications = [
-        verifier_firewall(),
-        verifier_selinux(),
-        verifier_fail2ban(),
-        verifier_ssh(),
-        verifier_updates(),
-        verifier_ports_exposes(),
-        verifier_permissions(),
-        verifier_sudo_users(),
-        verifier_root_locked(),
-        verifier_logs_persistants(),
-        verifier_verrouillage_ecran(),
-        verifier_chiffrement_disque(),
-        verifier_flatpak_sandbox(),
-        verifier_services_auto_updates(),
-        verifier_secure_boot(),
-        verifier_time_sync()
-    ]
-
-    total_points = sum(v["points"] for v in verifications)
-    total_max = sum(v["points_max"] for v in verifications)
-    score = int((total_points / total_max) * 100) if total_max > 0 else 0
+def executer_verifications(fonctions=None, delai_verification=DELAI_VERIFICATION, delai_audit=DELAI_AUDIT,
+                           on_verification=None):
+    """
+    Exécute les vérifications en parallèle (elles sont indépendantes et
+    passent l'essentiel de leur temps à attendre des sous-processus).
+
+    Chaque vérification a sa propre échéance, bornée par celle de l'audit ;
+    les commandes lancées après l'échéance échouent immédiatement. Une
+    vérification qui n'a pas rendu la main à temps est rapportée en "info"
+    (sans pénalité) au lieu de bloquer le rapport. L'ordre du rapport est
+    celui de la liste, quel que soit l'ordre de fin.
+
+    Args:
+        on_verification: Callback(verif) appelé dès qu'une vérification se termine
+    """
+    fonctions = VERIFICATIONS if fonctions is None else fonctions
+    if not fonctions:
+        return []
+    debut = time.monotonic()
+    echeance_audit = debut + delai_audit
+    echeance = min(debut + delai_verification, echeance_audit)
+
+    # Threads démons : une vérification bloquée ne retient pas la fin du script
+    etats = [{} for _ in fonctions]
+    futures = [arriere_plan.soumettre(_executer_verification, f, echeance, etat, nom=f"audit-{f.__name__}")
+               for f, etat in zip(fonctions, etats)]
+
+    resultats = {}
+    en_attente = {future: i for i, future in enumerate(futures)}
+    while en_attente:
+        # Petite marge : la vérification peut encore formater son résultat
+        restant = echeance + 0.5 - time.monotonic()
+        if restant <= 0:
+            break
+        termines, _ = wait(en_attente, timeout=restant, return_when=FIRST_COMPLETED)
+        for future in termines:
+            i = en_attente.pop(future)
+            resultats[i] = future.result()
+            if on_verification:
+                on_verification(resultats[i])
+
+    for i in sorted(en_attente.values()):
+        verif = dict(etats[i].get("verif") or _verif_inconnue(fonctions[i]))
+        verif = info(verif, "Vérification interrompue (délai dépassé)", "Relancez l'audit ou vérifiez manuellement.",
+                     preuve=f"délai de {min(delai_verification, delai_audit):g}s dépassé")
+        verif["duree_ms"] = int((time.monotonic() - etats[i].get("debut", debut)) * 1000)
+        verif["expiree"] = True
+        resultats[i] = verif
+        if on_verification:
+            on_verification(verif)
+
+    return [resultats[i] for i in range(len(fonctions))]
+
+# ---------------- AUDIT INCRÉMENTAL ----------------
+
+# Résultats précédents et empreintes de leurs entrées
+CACHE_INCREMENTAL = Path.home() / ".tuxpilot" / "cache" / "audit_incremental.json"
+
+HOME = str(Path.home())
+
+# Entrées dont dépend chaque vérification. Si leur empreinte n'a pas changé
+# depuis le dernier audit, le résultat précédent est réutilisé. Types :
+#   ("fichier", chemin)   stat (mtime, taille, inode, mode, propriétaire)
+#   ("rpmdb",)            stat des fichiers de la base RPM (sqlite ou Berkeley DB)
+#   ("config_ssh",)       stat des fichiers de configuration sshd effectivement inclus
+#   ("contenu", chemin)   contenu d'un petit fichier (pseudo-fichiers /sys, /proc)
+#   ("unite", nom)        ActiveState/UnitFileState systemd
+#   ("commande", nom)     chemin de l'exécutable (installation/désinstallation)
+#   ("sockets",)          sockets en écoute (/proc/net/tcp*, udp*)
+#   ("boot",)             identifiant du démarrage courant
+#   ("ttl", secondes)     expiration forcée (état qui dépend de l'extérieur)
+# Une vérification absente de ENTREES est toujours réévaluée.
+ENTREES = {
+    verifier_selinux: [("commande", "getenforce"), ("contenu", "/sys/fs/selinux/enforce"),
+                       ("fichier", "/etc/selinux/config")],
+    verifier_fail2ban: [("unite", "fail2ban"), ("rpmdb",), ("fichier", "/var/lib/dpkg/status")],
+    # Le dossier sshd_config.d reste déclaré : un fichier ajouté modifie son mtime
+    verifier_ssh: [("config_ssh",), ("fichier", "/etc/ssh/sshd_config.d"), ("sockets",)],
+    verifier_updates: [("rpmdb",), ("fichier", "/var/lib/dpkg/status"),
+                       ("fichier", "/var/cache/libdnf5"), ("fichier", "/var/cache/dnf"),
+                       ("fichier", "/var/lib/apt/lists"), ("ttl", 6 * 3600)],
+    verifier_permissions: [("fichier", "/etc/passwd"), ("fichier", "/etc/shadow")],
+    verifier_sudo_users: [("fichier", "/etc/group")],
+    verifier_root_locked: [("fichier", "/etc/shadow")],
+    verifier_logs_persistants: [("fichier", "/var/log/journal")],
+    verifier_verrouillage_ecran: [("commande", "gsettings"), ("fichier", f"{HOME}/.config/dconf/user"),
+                                  ("fichier", "/etc/dconf/db")],
+    verifier_chiffrement_disque: [("boot",), ("fichier", "/dev/mapper")],
+    verifier_flatpak_sandbox: [("commande", "flatpak"), ("fichier", "/var/lib/flatpak/app"),
+                               ("fichier", "/var/lib/flatpak/overrides"),
+                               ("fichier", f"{HOME}/.local/share/flatpak/overrides")],
+    verifier_services_auto_updates: [("unite", "dnf-automatic.timer"), ("unite", "unattended-upgrades")],
+    verifier_secure_boot: [("boot",), ("commande", "mokutil")],
+    # verifier_time_sync : l'état NTP change sans trace locale, toujours réévalué
+    # verifier_firewall, verifier_exposition, verifier_ports_exposes : règles nft
+    # modifiables à chaud (nft add rule) sans fichier à surveiller, toujours réévaluées
+}
+
+# Base RPM : le dossier ne change pas quand la base est modifiée en place
+# (/var/lib/rpm est un lien vers /usr/lib/sysimage/rpm sur les Fedora récentes)
+FICHIERS_RPMDB = [
+    "/usr/lib/sysimage/rpm/rpmdb.sqlite", "/usr/lib/sysimage/rpm/rpmdb.sqlite-wal",
+    "/var/lib/rpm/rpmdb.sqlite", "/var/lib/rpm/rpmdb.sqlite-wal", "/var/lib/rpm/Packages",
+]
+
+_version_code = None
+
+def version_code():
+    """
+    Empreinte du code des vérifications : ce script et tous les modules
+    auxiliaires chargés depuis le même dossier (sondes, sshd_config, ...)
+    """
+    global _version_code
+    if _version_code is None:
+        dossier = os.path.dirname(os.path.abspath(__file__))
+        fichiers = {os.path.abspath(__file__)}
+        for module in list(sys.modules.values()):
+            chemin = getattr(module, "__file__", None)
+            if chemin and os.path.dirname(os.path.abspath(chemin)) == dossier:
+                fichiers.add(os.path.abspath(chemin))
+        h = hashlib.blake2b(digest_size=16)
+        for chemin in sorted(fichiers):
+            h.update(os.path.basename(chemin).encode() + b"\0")
+            try:
+                with open(chemin, "rb") as f:
+                    h.update(f.read())
+            except OSError:
+                pass
+        _version_code = h.hexdigest()
+    return _version_code
+
+def _stat_fichier(chemin):
+    try:
+        st = os.stat(chemin)
+        return [st.st_mtime_ns, st.st_size, st.st_ino, st.st_mode, st.st_uid, st.st_gid]
+    except OSError:
+        return None
+
+def _sockets_en_ecoute():
+    """Sockets TCP en écoute et UDP non connectées (adresse locale + inode)"""
+    sockets = []
+    for fichier, etat in (("tcp", "0A"), ("tcp6", "0A"), ("udp", "07"), ("udp6", "07")):
+        try:
+            with open(f"/proc/net/{fichier}", encoding="ascii") as f:
+                next(f, None)
+                for ligne in f:
+                    champs = ligne.split()
+                    if len(champs) >= 10 and champs[3] == etat:
+                        sockets.append(f"{fichier} {champs[1]} {champs[9]}")
+        except OSError:
+            pass
+    return sorted(sockets)
+
+def _valeur_entree(entree):
+    """Valeur courante (sérialisable) d'une entrée déclarée"""
+    genre = entree[0]
+    if genre == "fichier":
+        return _stat_fichier(entree[1])
+    if genre == "rpmdb":
+        return [_stat_fichier(chemin) for chemin in FICHIERS_RPMDB]
+    if genre == "config_ssh":
+        config = sshd_config.configuration_effective()
+        fichiers = config["fichiers"] if config else [sshd_config.CONFIG_PRINCIPALE]
+        return [[chemin, _stat_fichier(chemin)] for chemin in fichiers]
+    if genre == "contenu":
+        try:
+            with open(entree[1], "rb") as f:
+                return f.read(4096).hex()
+        except OSError:
+            return None
+    if genre == "unite":
+        return etat_unite(entree[1])
+    if genre == "commande":
+        return shutil.which(entree[1])
+    if genre == "sockets":
+        return _sockets_en_ecoute()
+    if genre == "boot":
+        try:
+            with open("/proc/sys/kernel/random/boot_id", encoding="ascii") as f:
+                return f.read().strip()
+        except OSError:
+            return None
+    if genre == "ttl":
+        return int(time.time() // entree[1])
+    return None
+
+def empreinte_entrees(fonction):
+    """
+    Empreinte des entrées d'une vérification (None si non déclarées)
+
+    La version du code (ce script et ses modules auxiliaires) fait partie de
+    l'empreinte : une vérification modifiée n'est jamais servie depuis un
+    ancien résultat.
+    """
+    entrees = ENTREES.get(fonction)
+    if entrees is None:
+        return None
+    valeurs = [version_code()] + [[list(e), _valeur_entree(e)] for e in entrees]
+    return hashlib.blake2b(json.dumps(valeurs, sort_keys=True).encode(), digest_size=16).hexdigest()
+
+def charger_resultats_precedents():
+    try:
+        with open(CACHE_INCREMENTAL, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def sauvegarder_resultats(resultats):
+    try:
+        CACHE_INCREMENTAL.parent.mkdir(parents=True, exist_ok=True)
+        temporaire = CACHE_INCREMENTAL.with_suffix(".tmp")
+        with open(temporaire, "w", encoding="utf-8") as f:
+            json.dump(resultats, f, ensure_ascii=False)
+        os.replace(temporaire, CACHE_INCREMENTAL)
+    except OSError:
+        pass
+
+def executer_verifications_incrementales(fonctions=None, delai_verification=DELAI_VERIFICATION,
+                                         delai_audit=DELAI_AUDIT, on_verification=None):
+    """
+    Réutilise le résultat précédent des vérifications dont les entrées n'ont
+    pas changé et n'exécute que les autres (en parallèle, comme un audit complet)
+
+    Returns:
+        tuple: (verifications dans l'ordre de la liste, ids réévalués, ids réutilisés)
+    """
+    fonctions = VERIFICATIONS if fonctions is None else fonctions
+    precedents = charger_resultats_precedents()
+    empreintes = {f.__name__: empreinte_entrees(f) for f in fonctions}
+
+    reutilisees = {}
+    a_executer = []
+    for fonction in fonctions:
+        nom = fonction.__name__
+        precedent = precedents.get(nom)
+        if empreintes[nom] is not None and precedent and precedent.get("empreinte") == empreintes[nom]:
+            reutilisees[nom] = dict(precedent["verif"], reutilisee=True)
+            if on_verification:
+                on_verification(reutilisees[nom])
+        else:
+            a_executer.append(fonction)
+
+    executees = dict(zip((f.__name__ for f in a_executer),
+                         executer_verifications(a_executer, delai_verification, delai_audit, on_verification)))
+
+    # Les résultats expirés ne sont pas mémorisés : ils seront recalculés.
+    # Les vérifications hors de cette liste (autre mode) gardent leur entrée.
+    connues = {f.__name__ for f in VERIFICATIONS}
+    nouveaux = {nom: e for nom, e in precedents.items() if nom in connues}
+    for nom, verif in executees.items():
+        if empreintes[nom] is not None and not verif.get("expiree"):
+            nouveaux[nom] = {"empreinte": empreintes[nom], "verif": verif}
+    sauvegarder_resultats(nouveaux)
+
+    verifications = [reutilisees.get(f.__name__) or executees[f.__name__] for f in fonctions]
+    return (
+        verifications,
+        [v["id"] for v in verifications if not v.get("reutilisee")],
+        [v["id"] for v in verifications if v.get("reutilisee")]
+    )
 
+# ---------------- REPORT ----------------
+
+def calculer_score(verifications):
+    """
+    Score sur 100, même formule quel que soit le mode : points obtenus sur
+    points possibles des seules vérifications réellement évaluées (une
+    vérification non lancée ou expirée ne compte ni pour ni contre)
+    """
+    evaluees = [v for v in verifications if not v.get("expiree")]
+    total_points = sum(v["points"] for v in evaluees)
+    total_max = sum(v["points_max"] for v in evaluees)
+    return int((total_points / total_max) * 100) if total_max > 0 else 0
+
+def construire_rapport(verifications, debut, commandes=None, mode=MODE_DEFAUT, non_evaluees=None):
     rapport = {
-        "score": score,
+        "score": calculer_score(verifications),
+        "mode": mode,
         "verifications": verifications,
         "verifications_reussies": sum(1 for v in verifications if v["reussie"]),
         "total_verifications": len(verifications),
         "problemes_critiques": sum(1 for v in verifications if v["niveau"] == "Critique"),
         "problemes_eleves": sum(1 for v in verifications if v["niveau"] == "Eleve"),
-        "problemes_moyens": sum(1 for v in verifications if v["niveau"] == "Moyen")
+        "problemes_moyens": sum(1 for v in verifications if v["niveau"] == "Moyen"),
+        "verifications_expirees": sum(1 for v in verifications if v.get("expiree")),
+        "non_evaluees": non_evaluees or [],
+        "duree_ms": int((time.monotonic() - debut) * 1000)
     }
+    if commandes is not None:
+        rapport["commandes"] = commandes
+    return rapport
+
+def _executer_phase(fonctions, incremental, delai_verification, delai_audit, on_verification, suivi):
+    if incremental:
+        verifications, reevaluees, reutilisees = executer_verifications_incrementales(
+            fonctions, delai_verification, delai_audit, on_verification)
+        suivi["reevaluees"] += reevaluees
+        suivi["reutilisees"] += reutilisees
+        return verifications
+    return executer_verifications(fonctions, delai_verification, delai_audit, on_verification)
+
+def executer_audit(incremental=False, mode=MODE_DEFAUT, budget_ms=None, on_phase=None, on_verification=None,
+                   budget_total_ms=None):
+    """
+    Audit en deux phases :
+      1. vérifications instant/fast, bornées par budget_ms (score rapide)
+      2. vérifications slow/network (et deep), sauf en mode quick
+
+    Args:
+        budget_ms: Budget de la phase 1 (défaut : DELAI_AUDIT, ou BUDGET_RAPIDE_MS si on_phase)
+        budget_total_ms: Budget de l'audit entier, phase 2 comprise (défaut : aucun) ;
+            les vérifications non terminées à temps sont rapportées expirées
+        on_phase: Callback(rapport) appelé à la fin de la phase 1
+        on_verification: Callback(verif) pour chaque vérification de la phase 2
+            (y compris les vérifications rapides relancées)
+
+    Returns:
+        dict: Rapport final (toutes les vérifications du mode, ordre du registre)
+    """
+    debut = time.monotonic()
+    rapides, lentes = selectionner_verifications(mode)
+    # Le cache incrémental décrit les entrées de l'hôte, pas celles d'une autre racine
+    incremental = incremental and not hors_ligne()
+    if budget_ms is None:
+        budget_ms = BUDGET_RAPIDE_MS if on_phase else DELAI_AUDIT * 1000
+    budget = budget_ms / 1000
+    echeance = debut + budget_total_ms / 1000 if budget_total_ms is not None else None
+    if echeance is not None:
+        budget = min(budget, budget_total_ms / 1000)
+    suivi = {"reevaluees": [], "reutilisees": []}
+
+    demarrer_cache_audit()
+    try:
+        # Le budget de la phase 1 court depuis le début : la lecture des
+        # unités (jusqu'à 5 s) en fait partie
+        echeance_phase1 = debut + budget
+        unites_lues = charger_etats_unites(echeance=echeance_phase1)
+        restant = max(0.0, echeance_phase1 - time.monotonic())
+        phase1 = _executer_phase(rapides, incremental, min(DELAI_VERIFICATION, restant), restant, None, suivi)
+
+        # Vérifications rapides hors budget : relancées avec la phase 2 plutôt
+        # que rapportées expirées (la lecture des unités peut tout consommer)
+        relancees = [f for f, v in zip(rapides, phase1) if v.get("expiree")]
+        resultats = {f: v for f, v in zip(rapides, phase1) if f not in relancees}
+        ids_relances = {v["id"] for v in phase1 if v.get("expiree")}
+        suivi["reevaluees"] = [i for i in suivi["reevaluees"] if i not in ids_relances]
+        if on_phase:
+            on_phase(construire_rapport(list(resultats.values()), debut, mode="quick",
+                                        non_evaluees=[f.__name__.replace("verifier_", "") for f in relancees + lentes]))
+
+        delai = DELAI_PROFOND if mode == "deep" else DELAI_VERIFICATION
+        delai_phase2 = max(delai, DELAI_AUDIT)
+        if echeance is not None:
+            delai_phase2 = max(0.0, min(delai_phase2, echeance - time.monotonic()))
+        if not unites_lues:
+            # États vides faute de temps : relus pour la phase 2
+            charger_etats_unites(echeance=time.monotonic() + delai_phase2)
+            if echeance is not None:
+                delai_phase2 = max(0.0, min(delai_phase2, echeance - time.monotonic()))
+        phase2 = _executer_phase(relancees + lentes, incremental, delai, delai_phase2, on_verification, suivi)
+        resultats.update(zip(relancees + lentes, phase2))
+    finally:
+        commandes = terminer_cache_audit()
+
+    verifications = [resultats[f] for f in VERIFICATIONS if f in resultats]
+    non_evaluees = [f.__name__.replace("verifier_", "") for f in VERIFICATIONS if f not in resultats]
+    rapport = construire_rapport(verifications, debut, commandes, mode, non_evaluees)
+    if hors_ligne():
+        rapport["racine"] = sondes.RACINE
+    if incremental:
+        rapport["incremental"] = suivi
+    return rapport
+
+def executer_audit_stream(incremental=False, mode=MODE_DEFAUT, budget_ms=None):
+    """
+    Audit en streaming : un événement "phase" avec le score rapide dès la
+    fin de la phase 1, un événement "verification" par vérification lente
+    terminée, puis le "resultat" complet
+    """
+    verrou = threading.Lock()
+
+    def on_verification(verif):
+        with verrou:
+            emettre_evenement("verification", verification=verif)
+
+    rapport = executer_audit(
+        incremental, mode, budget_ms,
+        on_phase=lambda r: emettre_evenement("phase", phase=1, rapport=r),
+        on_verification=on_verification
+    )
+    emettre_evenement("resultat", rapport=rapport)
+    return rapport
+
+def lire_option(args, nom):
+    """Valeur de --nom <v> ou --nom=<v> (None si absente)"""
+    for i, arg in enumerate(args):
+        if arg.startswith(f"--{nom}="):
+            return arg.split("=", 1)[1]
+        if arg == f"--{nom}" and i + 1 < len(args):
+            return args[i + 1]
+    return None
+
+def archiver(rapport):
+    """Ajoute le rapport à l'historique (un échec d'écriture n'invalide pas l'audit)"""
+    try:
+        rapport["historique_id"] = historique_audit.enregistrer(rapport)
+    except (OSError, sqlite3.Error):
+        rapport["historique_id"] = None
     return rapport
 
+# ---------------- AUDIT HORS LIGNE ----------------
+
+def definir_racine(racine):
+    """Arborescence auditée (image montée, rootfs de conteneur) ; "/" = système courant"""
+    racine = os.path.abspath(racine)
+    if not os.path.isdir(racine):
+        raise ValueError(f"Racine introuvable : {racine}")
+    sondes.RACINE = racine
+
+def _nom_rapport(racine):
+    """Nom de fichier du rapport d'une racine (ex. /srv/images/f40 -> srv_images_f40.json)"""
+    return (os.path.abspath(racine).strip("/").replace("/", "_") or "racine") + ".json"
+
+def _auditer_racine(racine, sortie, mode):
+    """Tâche du pool : audite une racine et écrit son rapport"""
+    debut = time.monotonic()
+    resume = {"racine": racine, "rapport": os.path.join(sortie, _nom_rapport(racine))}
+    try:
+        definir_racine(racine)
+        rapport = archiver(executer_audit(mode=mode))
+        with open(resume["rapport"], "w", encoding="utf-8") as f:
+            json.dump(rapport, f, ensure_ascii=False, indent=2)
+        resume["score"] = rapport["score"]
+    except Exception as e:
+        resume["erreur"] = str(e)
+    resume["duree_ms"] = int((time.monotonic() - debut) * 1000)
+    return resume
+
+def _processus_racine(conn, racine, sortie, mode):
+    """Corps d'un processus du lot : audite la racine et renvoie le résumé au parent"""
+    try:
+        conn.send(_auditer_racine(racine, sortie, mode))
+    finally:
+        conn.close()
+
+def auditer_lot(racines, sortie, mode=MODE_DEFAUT, processus=None):
+    """
+    Audite plusieurs racines en parallèle (un processus neuf par racine,
+    l'état de l'audit étant global au module) et écrit un rapport JSON par racine
+
+    Les processus sont démarrés en "spawn" : aucun état (RACINE, caches de
+    commandes et d'unités) n'est hérité du parent ni d'une racine précédente.
+    (ProcessPoolExecutor réutilise ses processus, et max_tasks_per_child
+    n'existe qu'à partir de Python 3.11.)
+
+    Returns:
+        dict: Résumé (score ou erreur, chemin du rapport) par racine
+    """
+    debut = time.monotonic()
+    os.makedirs(sortie, exist_ok=True)
+    maximum = max(1, min(processus or os.cpu_count() or 1, len(racines)))
+    contexte = multiprocessing.get_context("spawn")
+    resumes = [None] * len(racines)
+    a_lancer = list(enumerate(racines))
+    actifs = {}
+    while a_lancer or actifs:
+        while a_lancer and len(actifs) < maximum:
+            i, racine = a_lancer.pop(0)
+            lecture, ecriture = contexte.Pipe(duplex=False)
+            p = contexte.Process(target=_processus_racine, args=(ecriture, racine, sortie, mode), daemon=True)
+            p.start()
+            ecriture.close()
+            actifs[p.sentinel] = (i, racine, p, lecture)
+        for sentinelle in multiprocessing.connection.wait(list(actifs)):
+            i, racine, p, lecture = actifs.pop(sentinelle)
+            try:
+                resumes[i] = lecture.recv() if lecture.poll() else None
+            except (EOFError, OSError):
+                resumes[i] = None
+            lecture.close()
+            p.join()
+            if resumes[i] is None:
+                # Processus tué ou planté avant d'avoir rendu son résumé
+                resumes[i] = {"racine": racine, "rapport": os.path.join(sortie, _nom_rapport(racine)),
+                              "erreur": f"processus terminé sans résultat (code {p.exitcode})"}
+    return {
+        "rapports": resumes,
+        "echecs": sum(1 for r in resumes if "erreur" in r),
+        "duree_ms": int((time.monotonic() - debut) * 1000)
+    }
+
+# ---------------- BENCHMARK ----------------
+
+def benchmark(repetitions=3):
+    """
+    Compare un audit complet avec commandes seules et avec sondes natives :
+    nombre de processus lancés et durée (médiane des répétitions)
+    """
+    global SONDES_NATIVES
+    mesures = {}
+    initial = SONDES_NATIVES
+    try:
+        for nom, natives in (("commandes", False), ("sondes", True)):
+            SONDES_NATIVES = natives
+            durees = []
+            for _ in range(repetitions):
+                rapport = executer_audit()
+                durees.append(rapport["duree_ms"])
+            durees.sort()
+            mesures[nom] = {
+                "processus": rapport["commandes"]["processus"],
+                "dureeMedianeMs": durees[len(durees) // 2],
+                "score": rapport["score"]
+            }
+    finally:
+        SONDES_NATIVES = initial
+    mesures["repetitions"] = repetitions
+    return mesures
+
 if __name__ == "__main__":
     try:
-        rapport = executer_audit()
+        mode_impact.appliquer(mode_impact.lire_mode())
+        args = mode_impact.retirer_option(sys.argv[1:])
+        if args and args[0] == "bench":
+            resultat = benchmark(int(args[1]) if len(args) >= 2 else 3)
+            print(json.dumps(resultat, ensure_ascii=False, indent=2))
+            sys.exit(0)
+        if "--sans-sondes" in args:
+            SONDES_NATIVES = False
+        mode = lire_option(args, "mode") or MODE_DEFAUT
+        if mode not in CLASSES_PAR_MODE:
+            raise ValueError(f"Mode inconnu : {mode} (quick, standard, deep)")
+        if args and args[0] == "batch":
+            # batch --sortie <dossier> <racine>... : un rapport JSON par racine
+            sortie = lire_option(args, "sortie") or "rapports"
+            racines, ignorer = [], False
+            for arg in args[1:]:
+                if ignorer:
+                    ignorer = False
+                elif arg in ("--sortie", "--mode"):
+                    ignorer = True
+                elif not arg.startswith("--"):
+                    racines.append(arg)
+            if not racines:
+                raise ValueError("Aucune racine à auditer")
+            print(json.dumps(auditer_lot(racines, sortie, mode), ensure_ascii=False, indent=2))
+            sys.exit(0)
+        racine = lire_option(args, "root")
+        if racine is not None:
+            definir_racine(racine)
+        budget = lire_option(args, "budget-ms")
+        budget_ms = max(0, int(budget)) if budget is not None else None
+        incremental = "--incremental" in args
+        # Les audits incrémentaux sont des rafraîchissements d'arrière-plan
+        # (contexte de l'assistant) : historisés seulement sur demande
+        historique = "--sans-historique" not in args and (not incremental or "--historique" in args)
+        if "--stream" in args:
+            rapport = executer_audit_stream(incremental, mode, budget_ms)
+            if historique:
+                archiver(rapport)
+            sys.exit(0)
+        rapport = executer_audit(incremental, mode, budget_ms)
+        if historique:
+            archiver(rapport)
         print(json.dumps(rapport, ensure_ascii=False, indent=2))
         sys.exit(0)
     except Exception as e:
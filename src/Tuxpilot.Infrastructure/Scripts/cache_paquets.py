@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Tuxpilot - Analyse et élagage sélectif du cache des paquets
+Distingue les archives (.rpm/.deb) des métadonnées de dépôts : les métadonnées
+et les N versions les plus récentes de chaque paquet sont conservées, seules
+les archives obsolètes ou déjà installées sont supprimées (contrairement à
+"dnf clean all" / "apt-get clean" qui forcent un re-téléchargement complet).
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from urllib.parse import unquote
+
+# Racines du cache par gestionnaire
+RACINES_CACHE = {
+    "dnf5": ["/var/cache/libdnf5"],
+    "dnf": ["/var/cache/dnf"],
+    "apt": ["/var/cache/apt"],
+}
+
+# Nombre de versions gardées par paquet (permet un retour arrière hors ligne)
+VERSIONS_CONSERVEES = 1
+
+# Débit de référence pour estimer le coût de re-téléchargement évité
+DEBIT_REFERENCE_MO_S = 5
+
+DPKG_STATUS = "/var/lib/dpkg/status"
+
+
+# ---------------- COMPARAISON DE VERSIONS ----------------
+
+def comparer_versions_rpm(a, b):
+    """Équivalent de rpmvercmp : -1, 0 ou 1"""
+    if a == b:
+        return 0
+    sa = re.findall(r"~|\^|[A-Za-z]+|\d+", a)
+    sb = re.findall(r"~|\^|[A-Za-z]+|\d+", b)
+    i = 0
+    while True:
+        x = sa[i] if i < len(sa) else None
+        y = sb[i] if i < len(sb) else None
+        if x is None and y is None:
+            return 0
+        # "~" trie avant tout, même la fin de chaîne
+        if x == "~" or y == "~":
+            if x != "~":
+                return 1
+            if y != "~":
+                return -1
+        # "^" trie après la fin de chaîne mais avant tout le reste
+        elif x == "^" or y == "^":
+            if x is None:
+                return -1
+            if y is None:
+                return 1
+            if x != "^":
+                return 1
+            if y != "^":
+                return -1
+        elif x is None:
+            return -1
+        elif y is None:
+            return 1
+        elif x.isdigit() != y.isdigit():
+            return 1 if x.isdigit() else -1
+        elif x.isdigit():
+            if int(x) != int(y):
+                return 1 if int(x) > int(y) else -1
+        elif x != y:
+            return 1 if x > y else -1
+        i += 1
+
+
+def comparer_evr_rpm(a, b):
+    """Compare deux "version-release" RPM"""
+    va, _, ra = a.rpartition("-")
+    vb, _, rb = b.rpartition("-")
+    return comparer_versions_rpm(va, vb) or comparer_versions_rpm(ra, rb)
+
+
+def _ordre_deb(c):
+    """Ordre d'un caractère selon dpkg : ~ < fin < lettres < autres"""
+    if c == "~":
+        return -1
+    if c == "":
+        return 0
+    if c.isalpha():
+        return ord(c)
+    return ord(c) + 256
+
+
+def _comparer_partie_deb(a, b):
+    while a or b:
+        pa = re.match(r"\D*", a).group()
+        pb = re.match(r"\D*", b).group()
+        a, b = a[len(pa):], b[len(pb):]
+        for i in range(max(len(pa), len(pb))):
+            ca = _ordre_deb(pa[i] if i < len(pa) else "")
+            cb = _ordre_deb(pb[i] if i < len(pb) else "")
+            if ca != cb:
+                return -1 if ca < cb else 1
+
+        da = re.match(r"\d*", a).group()
+        db = re.match(r"\d*", b).group()
+        a, b = a[len(da):], b[len(db):]
+        na, nb = int(da or 0), int(db or 0)
+        if na != nb:
+            return -1 if na < nb else 1
+    return 0
+
+
+def comparer_versions_deb(a, b):
+    """Équivalent de dpkg --compare-versions : -1, 0 ou 1"""
+    ea, _, ra = a.partition(":") if ":" in a else ("0", "", a)
+    eb, _, rb = b.partition(":") if ":" in b else ("0", "", b)
+    if int(ea or 0) != int(eb or 0):
+        return -1 if int(ea or 0) < int(eb or 0) else 1
+    ua, _, reva = ra.rpartition("-") if "-" in ra else (ra, "", "")
+    ub, _, revb = rb.rpartition("-") if "-" in rb else (rb, "", "")
+    return _comparer_partie_deb(ua, ub) or _comparer_partie_deb(reva, revb)
+
+
+# ---------------- INVENTAIRE ----------------
+
+def parser_nom_archive(fichier):
+    """
+    Extrait (nom, version, arch) d'un nom d'archive
+
+    name-version-release.arch.rpm ou name_version_arch.deb (version encodée URL)
+    """
+    if fichier.endswith(".rpm"):
+        base, _, arch = fichier[:-4].rpartition(".")
+        nom_version, _, release = base.rpartition("-")
+        nom, _, version = nom_version.rpartition("-")
+        if nom and version and release and arch:
+            return nom, f"{version}-{release}", arch
+    elif fichier.endswith(".deb"):
+        parties = fichier[:-4].split("_")
+        if len(parties) == 3:
+            return parties[0], unquote(parties[1]), parties[2]
+    return None
+
+
+def versions_installees(gestionnaire, echeance=None):
+    """
+    Versions installées : {(nom, arch): version}
+
+    Returns:
+        tuple: (dict, complet) - complet=False si le budget n'a pas suffi
+    """
+    installees = {}
+
+    if gestionnaire == "apt":
+        # Lecture directe de la base dpkg (pas de sous-processus)
+        try:
+            with open(DPKG_STATUS, encoding="utf-8", errors="replace") as f:
+                bloc = {}
+                for ligne in list(f) + [""]:
+                    ligne = ligne.rstrip("\n")
+                    if not ligne:
+                        if bloc.get("Status", "").endswith(" installed"):
+                            installees[(bloc.get("Package"), bloc.get("Architecture"))] = bloc.get("Version")
+                        bloc = {}
+                    elif not ligne[0].isspace() and ":" in ligne:
+                        cle, _, valeur = ligne.partition(":")
+                        bloc[cle] = valeur.strip()
+        except OSError:
+            return installees, False
+        return installees, True
+
+    restant = None if echeance is None else echeance - time.monotonic()
+    if restant is not None and restant <= 0:
+        return installees, False
+    try:
+        r = subprocess.run(
+            ["rpm", "-qa", "--qf", "%{NAME} %{VERSION}-%{RELEASE} %{ARCH}\\n"],
+            capture_output=True,
+            text=True,
+            timeout=30 if restant is None else min(30, restant)
+        )
+        for ligne in r.stdout.splitlines():
+            parties = ligne.split()
+            if len(parties) == 3:
+                installees[(parties[0], parties[2])] = parties[1]
+        return installees, r.returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return installees, False
+
+
+def inventorier_cache(gestionnaire, echeance=None):
+    """
+    Sépare les archives de paquets des métadonnées dans le cache
+
+    Le parcours s'arrête à l'échéance : l'inventaire est alors incomplet.
+
+    Returns:
+        dict: {"archives": [...], "incompletes": [...], "metadonneesBytes": n, "complet": bool}
+    """
+    archives = []
+    incompletes = []
+    metadonnees = 0
+    complet = True
+    extension = ".deb" if gestionnaire == "apt" else ".rpm"
+
+    for racine in RACINES_CACHE.get(gestionnaire, []):
+        if not complet:
+            break
+        for dossier, _, fichiers in os.walk(racine):
+            if echeance is not None and time.monotonic() >= echeance:
+                complet = False
+                break
+            for fichier in fichiers:
+                chemin = os.path.join(dossier, fichier)
+                try:
+                    taille = os.lstat(chemin).st_size
+                except OSError:
+                    continue
+
+                if os.path.basename(dossier) == "partial":
+                    # Téléchargements APT interrompus : jamais réutilisés
+                    incompletes.append({"chemin": chemin, "taille": taille})
+                elif fichier.endswith(extension) and parser_nom_archive(fichier):
+                    nom, version, arch = parser_nom_archive(fichier)
+                    archives.append({
+                        "chemin": chemin,
+                        "taille": taille,
+                        "nom": nom,
+                        "version": version,
+                        "arch": arch
+                    })
+                else:
+                    metadonnees += taille
+
+    return {"archives": archives, "incompletes": incompletes, "metadonneesBytes": metadonnees, "complet": complet}
+
+
+def planifier_elagage(gestionnaire, conserver=VERSIONS_CONSERVEES, echeance=None):
+    """
+    Décide quelles archives supprimer
+
+    Par paquet (nom, arch), les `conserver` versions les plus récentes sont
+    gardées ; les autres sont "obsoletes". Parmi les gardées, celle
+    correspondant à la version installée est "installee" et supprimée aussi.
+
+    Returns:
+        dict: Plan d'élagage avec octets récupérés et coût évité
+    """
+    inventaire = inventorier_cache(gestionnaire, echeance)
+    installees, complet = versions_installees(gestionnaire, echeance)
+    comparer = comparer_versions_deb if gestionnaire == "apt" else comparer_evr_rpm
+
+    par_paquet = {}
+    for archive in inventaire["archives"]:
+        par_paquet.setdefault((archive["nom"], archive["arch"]), []).append(archive)
+
+    a_supprimer = [dict(a, raison="incomplete") for a in inventaire["incompletes"]]
+    conservees = 0
+
+    for (nom, arch), versions in par_paquet.items():
+        # Tri décroissant par version
+        ordonnees = []
+        for archive in versions:
+            position = 0
+            while position < len(ordonnees) and comparer(ordonnees[position]["version"], archive["version"]) > 0:
+                position += 1
+            ordonnees.insert(position, archive)
+
+        installee = installees.get((nom, arch))
+        for rang, archive in enumerate(ordonnees):
+            if rang >= conserver:
+                a_supprimer.append(dict(archive, raison="obsolete"))
+            elif installee is not None and archive["version"] == installee:
+                a_supprimer.append(dict(archive, raison="installee"))
+            else:
+                conservees += 1
+
+    recupere = sum(a["taille"] for a in a_supprimer)
+
+    # apt-get clean ne touche pas /var/lib/apt/lists : seul dnf re-télécharge
+    retelechargement = 0 if gestionnaire == "apt" else inventaire["metadonneesBytes"]
+
+    return {
+        "gestionnaire": gestionnaire,
+        "versionsConservees": conserver,
+        "aSupprimer": a_supprimer,
+        "archivesConservees": conservees,
+        "recupereBytes": recupere,
+        "metadonneesConserveesBytes": inventaire["metadonneesBytes"],
+        "retelechargementEviteBytes": retelechargement,
+        "coutEviteSecondes": round(retelechargement / (DEBIT_REFERENCE_MO_S * 1024 * 1024), 1),
+        "partiel": not complet or not inventaire["complet"]
+    }
+
+
+def elaguer(gestionnaire, conserver=VERSIONS_CONSERVEES):
+    """Applique l'élagage (en root depuis cleanup_root.sh)"""
+    plan = planifier_elagage(gestionnaire, conserver)
+    if plan["partiel"]:
+        # Sans liste des paquets installés, on ne supprime que l'obsolète
+        plan["aSupprimer"] = [a for a in plan["aSupprimer"] if a["raison"] != "installee"]
+
+    libere = 0
+    erreurs = 0
+    for archive in plan["aSupprimer"]:
+        try:
+            os.unlink(archive["chemin"])
+            libere += archive["taille"]
+        except OSError:
+            erreurs += 1
+
+    return {
+        "gestionnaire": gestionnaire,
+        "supprimees": len(plan["aSupprimer"]) - erreurs,
+        "erreurs": erreurs,
+        "libereBytes": libere,
+        "archivesConservees": plan["archivesConservees"],
+        "metadonneesConserveesBytes": plan["metadonneesConserveesBytes"],
+        "retelechargementEviteBytes": plan["retelechargementEviteBytes"],
+        "coutEviteSecondes": plan["coutEviteSecondes"]
+    }
+
+
+if __name__ == "__main__":
+    """Point d'entrée du script"""
+    try:
+        if len(sys.argv) < 3 or sys.argv[1] not in ("analyser", "elaguer"):
+            print(json.dumps({"erreur": "Usage: cache_paquets.py analyser|elaguer <gestionnaire> [versions]"}),
+                  file=sys.stderr)
+            sys.exit(1)
+
+        action, gestionnaire = sys.argv[1], sys.argv[2]
+        conserver = int(sys.argv[3]) if len(sys.argv) >= 4 else VERSIONS_CONSERVEES
+
+        if action == "elaguer":
+            resultat = elaguer(gestionnaire, conserver)
+        else:
+            resultat = planifier_elagage(gestionnaire, conserver)
+
+        print(json.dumps(resultat, indent=2, ensure_ascii=False))
+        sys.exit(0)
+    except Exception as e:
+        print(json.dumps({"erreur": str(e)}), file=sys.stderr)
+        sys.exit(1)
@@ -8,6 +8,7 @@ import json
 import sys
 import subprocess
 import distro
+import mode_impact
 
 
 def detecter_gestionnaire_paquets():
@@ -79,9 +80,10 @@ def verifier_dnf5():
         #     timeout=30
         # )
 
+        # Téléchargement des métadonnées : scope systemd à poids réduit selon le mode d'impact
         cmd = ['dnf5', 'check-update', '--quiet']
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+            result = subprocess.run(mode_impact.commande_scope(cmd), capture_output=True, text=True, timeout=120)
         except subprocess.TimeoutExpired:
             result = subprocess.run(cmd + ['--cacheonly'], capture_output=True, text=True, timeout=20)
 
@@ -126,7 +128,7 @@ def verifier_dnf():
     """Vérifie les mises à jour avec DNF"""
     try:
         result = subprocess.run(
-            ['dnf', 'check-update', '-q'],
+            mode_impact.commande_scope(['dnf', 'check-update', '-q']),
             capture_output=True,
             text=True,
             timeout=30
@@ -164,7 +166,7 @@ def verifier_apt():
     """Vérifie les mises à jour avec APT"""
     try:
         # Update package list
-        subprocess.run(['apt-get', 'update'], capture_output=True, timeout=30)
+        subprocess.run(mode_impact.commande_scope(['apt-get', 'update']), capture_output=True, timeout=30)
 
         # Check for upgradable packages
         result = subprocess.run(
@@ -206,6 +208,7 @@ def verifier_apt():
 if __name__ == "__main__":
     """Point d'entrée du script"""
     try:
+        mode_impact.appliquer(mode_impact.lire_mode())
         resultat = verifier_mises_a_jour()
         print(json.dumps(resultat, indent=2, ensure_ascii=False))
         sys.exit(0)
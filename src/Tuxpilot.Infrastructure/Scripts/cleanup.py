@@ -8,10 +8,26 @@ import json
 import sys
 import subprocess
 import os
+import time
 import distro
 import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from pathlib import Path
 
+import cache_paquets
+import doublons
+import fichiers_supprimes
+from evenements import emettre_evenement
+import mode_impact
+import plan_nettoyage
+
+# Dossier de cache local de Tuxpilot (partagé avec l'application)
+CACHE_DIR = Path.home() / ".tuxpilot" / "cache"
+
+# Historique structuré des nettoyages (une ligne JSON par exécution, en ajout seul)
+HISTORIQUE_NETTOYAGE = Path.home() / ".tuxpilot" / "historique_nettoyage.jsonl"
+
 
 def detecter_gestionnaire_paquets():
     """Détecte le gestionnaire de paquets"""
@@ -34,108 +50,168 @@ def detecter_gestionnaire_paquets():
         return 'unknown'
 
 
+def temps_restant(echeance):
+    """Secondes restantes avant l'échéance (None = pas de limite)"""
+    if echeance is None:
+        return None
+    return max(0.0, echeance - time.monotonic())
+
+
+def mesurer_dossier(chemin, echeance=None, filtre=None):
+    """
+    Mesure un dossier (taille + nombre de fichiers) dans la limite d'une échéance
+
+    Si l'échéance est atteinte avant la fin du parcours, les totaux sont
+    extrapolés d'après la proportion de dossiers déjà visités et le résultat
+    est marqué partiel.
+
+    Args:
+        chemin: Dossier à mesurer
+        echeance: Instant time.monotonic() à ne pas dépasser (None = illimité)
+        filtre: Fonction (entree, stat) -> bool pour ne compter que certains fichiers
+
+    Returns:
+        dict: {"taille": bytes, "fichiers": int, "partiel": bool}
+    """
+    resultat = {"taille": 0, "fichiers": 0, "partiel": False}
+    if not os.path.isdir(chemin):
+        return resultat
+
+    a_visiter = [chemin]
+    visites = 0
+
+    while a_visiter:
+        if visites and echeance is not None and time.monotonic() >= echeance:
+            # Extrapolation : les dossiers restants ressemblent aux dossiers vus
+            facteur = (visites + len(a_visiter)) / visites
+            resultat["taille"] = int(resultat["taille"] * facteur)
+            resultat["fichiers"] = int(resultat["fichiers"] * facteur)
+            resultat["partiel"] = True
+            break
+
+        mode_impact.ralentir(echeance)
+        dossier = a_visiter.pop()
+        visites += 1
+        try:
+            with os.scandir(dossier) as entrees:
+                for entree in entrees:
+                    try:
+                        if entree.is_dir(follow_symlinks=False):
+                            a_visiter.append(entree.path)
+                        elif entree.is_file(follow_symlinks=False):
+                            stat = entree.stat(follow_symlinks=False)
+                            if filtre is None or filtre(entree, stat):
+                                resultat["taille"] += stat.st_size
+                                resultat["fichiers"] += 1
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+
+    return resultat
+
+
 def obtenir_taille_dossier(chemin):
     """Calcule la taille totale d'un dossier en bytes"""
     try:
-        if not os.path.exists(chemin):
-            return 0
-
-        taille_totale = 0
-        for dirpath, dirnames, filenames in os.walk(chemin):
-            for filename in filenames:
-                filepath = os.path.join(dirpath, filename)
-                try:
-                    taille_totale += os.path.getsize(filepath)
-                except (OSError, FileNotFoundError):
-                    pass
-        return taille_totale
+        return mesurer_dossier(chemin)["taille"]
     except Exception:
         return 0
 
 
-def analyser_cache_paquets():
-    """Analyse le cache du gestionnaire de paquets"""
-    gestionnaire = detecter_gestionnaire_paquets()
+def charger_cache(nom):
+    """Charge une valeur mise en cache par une analyse précédente"""
+    try:
+        with open(CACHE_DIR / f"{nom}.json", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
+
+def sauvegarder_cache(nom, valeur):
+    """Mémorise une valeur pour servir d'estimation aux analyses suivantes"""
     try:
-        if gestionnaire in ['dnf5', 'dnf']:
-            # Cache DNF : /var/cache/dnf ou /var/cache/libdnf5
-            chemins_cache = ['/var/cache/dnf', '/var/cache/libdnf5']
-            taille_totale = sum(obtenir_taille_dossier(c) for c in chemins_cache)
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(CACHE_DIR / f"{nom}.json", "w", encoding="utf-8") as f:
+            json.dump(valeur, f)
+    except OSError:
+        pass
 
-            return {
-                "type": "cache_paquets",
-                "nom": f"Cache {gestionnaire.upper()}",
-                "chemin": ", ".join(chemins_cache),
-                "tailleMB": taille_totale // (1024 * 1024),
-                "description": "Cache des paquets téléchargés"
-            }
-        elif gestionnaire == 'apt':
-            chemin = '/var/cache/apt/archives'
-            taille = obtenir_taille_dossier(chemin)
 
-            return {
-                "type": "cache_paquets",
-                "nom": "Cache APT",
-                "chemin": chemin,
-                "tailleMB": taille // (1024 * 1024),
-                "description": "Cache des paquets téléchargés"
-            }
-        else:
-            return None
-    except Exception as e:
-        return None
+def analyser_cache_paquets(echeance=None):
+    """
+    Analyse le cache du gestionnaire de paquets
 
+    Seules les archives obsolètes ou déjà installées sont comptées : les
+    métadonnées de dépôts sont conservées par cleanup_root.sh.
+    """
+    gestionnaire = detecter_gestionnaire_paquets()
 
-def analyser_logs_anciens():
-    """Analyse les logs système anciens"""
     try:
-        chemin_logs = '/var/log'
+        if gestionnaire not in cache_paquets.RACINES_CACHE:
+            return None
 
-        # Compter les logs anciens (> 30 jours)
-        import time
-        now = time.time()
-        taille_totale = 0
-        nombre_fichiers = 0
+        plan = cache_paquets.planifier_elagage(gestionnaire, echeance=echeance)
+        nombre = len(plan["aSupprimer"])
+        metadonnees_mb = plan["metadonneesConserveesBytes"] // (1024 * 1024)
 
-        for root, dirs, files in os.walk(chemin_logs):
-            for file in files:
-                filepath = os.path.join(root, file)
-                try:
-                    # Logs compressés ou anciens
-                    if file.endswith(('.gz', '.old', '.1', '.2', '.3')) or '-' in file:
-                        stat = os.stat(filepath)
-                        age_jours = (now - stat.st_mtime) / 86400
-
-                        if age_jours > 30:
-                            taille_totale += stat.st_size
-                            nombre_fichiers += 1
-                except (OSError, FileNotFoundError):
-                    pass
+        return {
+            "type": "cache_paquets",
+            "nom": f"Cache {gestionnaire.upper()}",
+            "chemin": ", ".join(cache_paquets.RACINES_CACHE[gestionnaire]),
+            "tailleMB": plan["recupereBytes"] // (1024 * 1024),
+            "nombreFichiers": nombre,
+            "metadonneesConserveesMB": metadonnees_mb,
+            "coutEviteSecondes": plan["coutEviteSecondes"],
+            "description": f"{nombre} archive(s) obsolète(s), métadonnées conservées ({metadonnees_mb} Mo)",
+            "partiel": plan["partiel"]
+        }
+    except Exception:
+        return None
+
+
+def analyser_logs_anciens(echeance=None):
+    """Analyse les journaux archivés que journalctl --vacuum-time supprimera"""
+    try:
+        regle = plan_nettoyage.evaluer_regle("journald", echeance)
+        nombre_fichiers = regle["nombre"]
+        description = (f"{nombre_fichiers} journal(aux) archivé(s) de plus de "
+                       f"{plan_nettoyage.AGE_JOURNAL_JOURS} jours")
+        if regle["illisibles"]:
+            # Taille inconnue ici : ces dossiers ne sont parcourus que par l'étape root
+            description += f" (+ {len(regle['illisibles'])} dossier(s) protégé(s) vérifié(s) au nettoyage)"
 
         return {
             "type": "logs_anciens",
-            "nom": "Logs anciens (>30 jours)",
-            "chemin": chemin_logs,
-            "tailleMB": taille_totale // (1024 * 1024),
+            "nom": f"Logs anciens (>{plan_nettoyage.AGE_JOURNAL_JOURS} jours)",
+            "chemin": ", ".join(plan_nettoyage.RACINES_JOURNAL),
+            "tailleMB": regle["tailleBytes"] // (1024 * 1024),
             "nombreFichiers": nombre_fichiers,
-            "description": f"{nombre_fichiers} fichiers de logs anciens"
+            "description": description,
+            "partiel": regle["partiel"]
         }
     except Exception:
         return None
 
 
-def analyser_paquets_orphelins():
+def analyser_paquets_orphelins(echeance=None):
     """Analyse les paquets orphelins"""
     gestionnaire = detecter_gestionnaire_paquets()
 
+    # Le dernier comptage connu sert d'estimation si le budget est épuisé
+    restant = temps_restant(echeance)
+    timeout = 10 if restant is None else min(10, restant)
+
     try:
+        if timeout <= 0:
+            raise subprocess.TimeoutExpired(gestionnaire, 0)
+
         if gestionnaire == 'dnf5':
             result = subprocess.run(
                 ['dnf5', 'repoquery', '--unneeded'],
                 capture_output=True,
                 text=True,
-                timeout=10
+                timeout=timeout
             )
             paquets = [p.strip() for p in result.stdout.strip().split('\n') if p.strip()]
             nombre = len(paquets)
@@ -145,7 +221,7 @@ def analyser_paquets_orphelins():
                 ['package-cleanup', '--leaves', '--quiet'],
                 capture_output=True,
                 text=True,
-                timeout=10
+                timeout=timeout
             )
             paquets = [p.strip() for p in result.stdout.strip().split('\n') if p.strip()]
             nombre = len(paquets)
@@ -155,7 +231,7 @@ def analyser_paquets_orphelins():
                 ['apt-get', 'autoremove', '--dry-run'],
                 capture_output=True,
                 text=True,
-                timeout=10
+                timeout=timeout
             )
             # Parser la sortie pour compter les paquets
             lines = result.stdout.strip().split('\n')
@@ -171,12 +247,26 @@ def analyser_paquets_orphelins():
         else:
             nombre = 0
 
+        sauvegarder_cache("paquets_orphelins", {"gestionnaire": gestionnaire, "nombre": nombre})
+
         return {
             "type": "paquets_orphelins",
             "nom": "Paquets orphelins",
             "chemin": "Système",
             "nombrePaquets": nombre,
-            "description": f"{nombre} paquet(s) non utilisé(s)"
+            "description": f"{nombre} paquet(s) non utilisé(s)",
+            "partiel": False
+        }
+    except subprocess.TimeoutExpired:
+        precedent = charger_cache("paquets_orphelins") or {}
+        nombre = precedent.get("nombre", 0) if precedent.get("gestionnaire") == gestionnaire else 0
+        return {
+            "type": "paquets_orphelins",
+            "nom": "Paquets orphelins",
+            "chemin": "Système",
+            "nombrePaquets": nombre,
+            "description": f"~{nombre} paquet(s) non utilisé(s) (estimation)",
+            "partiel": True
         }
     except Exception:
         return {
@@ -184,64 +274,151 @@ def analyser_paquets_orphelins():
             "nom": "Paquets orphelins",
             "chemin": "Système",
             "nombrePaquets": 0,
-            "description": "0 paquet non utilisé"
+            "description": "0 paquet non utilisé",
+            "partiel": False
         }
 
 
-def analyser_fichiers_temporaires():
-    """Analyse les fichiers temporaires"""
+def analyser_fichiers_temporaires(echeance=None):
+    """Analyse les fichiers temporaires que cleanup_root.sh supprimera"""
     try:
-        chemins_tmp = ['/tmp', '/var/tmp']
-        taille_totale = sum(obtenir_taille_dossier(c) for c in chemins_tmp)
+        regle = plan_nettoyage.evaluer_regle("fichiers_temporaires", echeance)
+        nombre_fichiers = regle["nombre"]
+        description = (f"{nombre_fichiers} journal(aux) archivé(s) de plus de "
+                       f"{plan_nettoyage.AGE_JOURNAL_JOURS} jours")
+        if regle["illisibles"]:
+            # Taille inconnue ici : ces dossiers ne sont parcourus que par l'étape root
+            description += f" (+ {len(regle['illisibles'])} dossier(s) protégé(s) vérifié(s) au nettoyage)"
 
         return {
             "type": "fichiers_temporaires",
             "nom": "Fichiers temporaires",
-            "chemin": ", ".join(chemins_tmp),
-            "tailleMB": taille_totale // (1024 * 1024),
-            "description": "Fichiers temporaires système"
+            "chemin": plan_nettoyage.RACINE_TMP,
+            "tailleMB": regle["tailleBytes"] // (1024 * 1024),
+            "nombreFichiers": nombre_fichiers,
+            "description": description,
+            "dossiersIllisibles": len(regle["illisibles"]),
+            "partiel": regle["partiel"]
         }
     except Exception:
         return None
 
 
-def analyser_nettoyage():
+def analyser_fichiers_supprimes_ouverts(echeance=None):
+    """
+    Analyse l'espace retenu par des fichiers supprimés encore ouverts
+
+    Cet espace explique un "df" plein que les autres catégories ne justifient
+    pas ; il n'est libéré que par un redémarrage, pas par cleanup_root.sh
+    (élément informatif, exclu du total nettoyable).
+
+    L'analyse tourne sans privilèges : les descripteurs des services root
+    (journald, nginx...) sont illisibles, le total est alors un minimum et la
+    description le dit.
+    """
+    try:
+        resultat = fichiers_supprimes.analyser_fichiers_supprimes(echeance)
+        inaccessibles = resultat["processusInaccessibles"]
+        if resultat["nombreFichiers"] == 0 and not inaccessibles:
+            return None
+
+        description = f"{resultat['nombreFichiers']} fichier(s) supprimé(s) encore ouvert(s)"
+        if inaccessibles:
+            description += (f" ; {inaccessibles} processus système non lisibles sans droits administrateur"
+                            f" ne sont pas comptés (total minimal)")
+        if resultat["redemarrages"]:
+            premier = resultat["redemarrages"][0]
+            cible = premier["unite"] or ", ".join(premier["processus"])
+            description += f" - redémarrer {cible} libérerait {premier['tailleMB']} Mo"
+
+        return {
+            "type": "fichiers_supprimes_ouverts",
+            "nom": "Fichiers supprimés encore ouverts",
+            "chemin": "/proc/*/fd",
+            "tailleMB": int(resultat["tailleTotaleMB"]),
+            "nombreFichiers": resultat["nombreFichiers"],
+            "redemarrages": resultat["redemarrages"],
+            "processusInaccessibles": inaccessibles,
+            "minimum": inaccessibles > 0,
+            "informatif": True,
+            "description": description,
+            "partiel": resultat["partiel"]
+        }
+    except Exception:
+        return None
+
+
+# Analyseurs dans l'ordre d'affichage : (catégorie, fonction(echeance))
+ANALYSEURS = [
+    ("cache_paquets", analyser_cache_paquets),
+    ("logs_anciens", analyser_logs_anciens),
+    ("paquets_orphelins", analyser_paquets_orphelins),
+    ("fichiers_temporaires", analyser_fichiers_temporaires),
+    ("fichiers_supprimes_ouverts", analyser_fichiers_supprimes_ouverts),
+]
+
+
+def calculer_echeance(budget_ms):
+    """Convertit un budget en millisecondes en échéance time.monotonic()"""
+    if budget_ms is None:
+        return None
+    return time.monotonic() + budget_ms / 1000
+
+
+def iterer_analyses(echeance=None):
+    """
+    Lance les analyseurs en parallèle et les restitue au fil de l'eau
+
+    Yields:
+        tuple: (categorie, element ou None, duree_ms) dans l'ordre de fin
+    """
+    debut = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(ANALYSEURS)) as pool:
+        futures = {pool.submit(fn, echeance): categorie for categorie, fn in ANALYSEURS}
+        for future in as_completed(futures):
+            try:
+                element = future.result()
+            except Exception:
+                element = None
+            yield futures[future], element, int((time.monotonic() - debut) * 1000)
+
+
+def analyser_nettoyage(budget_ms=None, on_element=None):
     """
     Analyse tous les éléments nettoyables du système
-    
+
+    Args:
+        budget_ms: Budget de temps global ; au-delà, les analyseurs renvoient
+            des estimations extrapolées marquées "partiel"
+        on_element: Callback (categorie, element, duree_ms) appelé dès qu'une
+            catégorie est terminée
+
     Returns:
         dict: Informations sur les éléments nettoyables
     """
     try:
-        elements = []
-
-        # Analyser chaque type
-        cache = analyser_cache_paquets()
-        if cache:
-            elements.append(cache)
+        resultats = {}
 
-        logs = analyser_logs_anciens()
-        if logs:
-            elements.append(logs)
+        # Analyser chaque type (en parallèle)
+        for categorie, element, duree_ms in iterer_analyses(calculer_echeance(budget_ms)):
+            resultats[categorie] = element
+            if on_element:
+                on_element(categorie, element, duree_ms)
 
-        orphelins = analyser_paquets_orphelins()
-        if orphelins:
-            elements.append(orphelins)
+        # Ordre d'affichage stable, quel que soit l'ordre de fin
+        elements = [resultats[c] for c, _ in ANALYSEURS if resultats.get(c)]
 
-        tmp = analyser_fichiers_temporaires()
-        if tmp:
-            elements.append(tmp)
-
-        # Calculer le total
+        # Calculer le total (hors éléments informatifs, non nettoyables)
         taille_totale_mb = sum(
-            e.get('tailleMB', 0) for e in elements
+            e.get('tailleMB', 0) for e in elements if not e.get('informatif')
         )
 
         return {
             "gestionnaire": detecter_gestionnaire_paquets(),
             "elements": elements,
             "tailleTotaleMB": taille_totale_mb,
-            "nombreElements": len(elements)
+            "nombreElements": len(elements),
+            "partiel": any(e.get('partiel') for e in elements)
         }
 
     except Exception as e:
@@ -250,9 +427,149 @@ def analyser_nettoyage():
             "elements": [],
             "tailleTotaleMB": 0,
             "nombreElements": 0,
+            "partiel": False,
             "erreur": str(e)
         }
 
+
+def analyser_nettoyage_stream(budget_ms=None):
+    """
+    Analyse en mode streaming : progression et résultats par catégorie en NDJSON,
+    puis le résultat complet dans un dernier événement "resultat"
+    """
+    total = len(ANALYSEURS)
+    termines = []
+
+    emettre_evenement("progression", termines=0, total=total, message="Analyse démarrée")
+
+    def on_element(categorie, element, duree_ms):
+        termines.append(categorie)
+        emettre_evenement("element", categorie=categorie, element=element, dureeMs=duree_ms)
+        emettre_evenement("progression", termines=len(termines), total=total,
+                          message=f"{categorie} analysé")
+
+    resultat = analyser_nettoyage(budget_ms, on_element=on_element)
+    emettre_evenement("resultat", resultat=resultat)
+    return resultat
+
+
+def lire_budget_ms(args):
+    """Lit l'option --budget-ms <n> ou --budget-ms=<n> (None si absente)"""
+    for i, arg in enumerate(args):
+        if arg.startswith("--budget-ms="):
+            valeur = arg.split("=", 1)[1]
+        elif arg == "--budget-ms" and i + 1 < len(args):
+            valeur = args[i + 1]
+        else:
+            continue
+        try:
+            return max(0, int(valeur))
+        except ValueError:
+            return None
+    return None
+
+
+def parser_etape(ligne):
+    """Parse une ligne "ETAPE {json}" émise par cleanup_root.sh"""
+    if not ligne.startswith("ETAPE "):
+        return None
+    try:
+        etape = json.loads(ligne[len("ETAPE "):])
+    except ValueError:
+        return None
+    etape["libereBytes"] = max(0, etape.get("avant", 0) - etape.get("apres", 0))
+    return etape
+
+
+def agreger_etapes(etapes):
+    """
+    Agrège les enregistrements d'étapes en espace libéré par catégorie
+
+    Returns:
+        dict: {categorie: {"libereMB", "libereBytes", "dureeMs", "succes"}}
+    """
+    categories = {}
+    for etape in etapes:
+        cat = categories.setdefault(etape.get("categorie", etape.get("etape", "autre")), {
+            "libereBytes": 0,
+            "dureeMs": 0,
+            "succes": True
+        })
+        cat["libereBytes"] += etape["libereBytes"]
+        cat["dureeMs"] += etape.get("dureeMs", 0)
+        cat["succes"] = cat["succes"] and etape.get("code", 0) == 0
+
+    for cat in categories.values():
+        cat["libereMB"] = cat["libereBytes"] // (1024 * 1024)
+    return categories
+
+
+def enregistrer_historique_nettoyage(gestionnaire, etapes):
+    """Ajoute l'exécution à l'historique structuré des nettoyages"""
+    try:
+        HISTORIQUE_NETTOYAGE.parent.mkdir(parents=True, exist_ok=True)
+        entree = {
+            "date": datetime.now().isoformat(),
+            "gestionnaire": gestionnaire,
+            "etapes": etapes
+        }
+        with open(HISTORIQUE_NETTOYAGE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entree, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+
+
+def statistiques_etapes():
+    """
+    Statistiques par étape sur l'historique : utile pour voir quelles étapes
+    libèrent réellement de l'espace
+
+    Returns:
+        dict: {"executions": n, "etapes": [{etape, executions, libereMBTotal, ...}]}
+    """
+    stats = {}
+    executions = 0
+    try:
+        with open(HISTORIQUE_NETTOYAGE, encoding="utf-8") as f:
+            for ligne in f:
+                try:
+                    entree = json.loads(ligne)
+                except ValueError:
+                    continue
+                executions += 1
+                for etape in entree.get("etapes", []):
+                    s = stats.setdefault(etape.get("etape", "?"), {
+                        "etape": etape.get("etape", "?"),
+                        "categorie": etape.get("categorie", ""),
+                        "executions": 0,
+                        "echecs": 0,
+                        "libereBytes": 0,
+                        "dureeMs": 0
+                    })
+                    s["executions"] += 1
+                    s["echecs"] += 1 if etape.get("code", 0) != 0 else 0
+                    s["libereBytes"] += etape.get("libereBytes", 0)
+                    s["dureeMs"] += etape.get("dureeMs", 0)
+    except OSError:
+        pass
+
+    etapes = []
+    for s in stats.values():
+        n = s["executions"]
+        etapes.append({
+            "etape": s["etape"],
+            "categorie": s["categorie"],
+            "executions": n,
+            "echecs": s["echecs"],
+            "libereMBTotal": s["libereBytes"] // (1024 * 1024),
+            "libereMBMoyen": round(s["libereBytes"] / n / (1024 * 1024), 1),
+            "dureeMsMoyenne": s["dureeMs"] // n
+        })
+    etapes.sort(key=lambda e: e["libereMBTotal"], reverse=True)
+
+    return {"executions": executions, "etapes": etapes}
+
+
 def nettoyer_systeme():
     """
     Nettoie réellement les éléments du système
@@ -273,37 +590,72 @@ def nettoyer_systeme():
                 "succes": False,
                 "message": f"Script cleanup_root.sh introuvable: {cleanup_script}",
                 "resultats": [],
+                "etapes": [],
+                "parCategorie": {},
                 "espaceLibereMB": 0
             }
 
+        # Plan pré-calculé en utilisateur : le script root ne relance pas find
+        plan = plan_nettoyage.construire_plan()
+        chemin_plan = CACHE_DIR / "plan_nettoyage.json"
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(chemin_plan, "w", encoding="utf-8") as f:
+            json.dump(plan, f)
+
         # Appeler pkexec UNE SEULE FOIS avec le script shell
         result = subprocess.run(
-            ['pkexec', cleanup_script, gestionnaire],
+            ['pkexec', cleanup_script, gestionnaire, str(chemin_plan), mode_impact.mode_actif()],
             capture_output=True,
             text=True,
             timeout=180  # 3 minutes max
         )
 
-        # Parser les résultats
+        # Parser les résultats et les enregistrements d'étapes
         resultats = []
+        etapes = []
+        bilan_cache = {}
         in_results = False
 
         for line in result.stdout.strip().split('\n'):
+            etape = parser_etape(line)
+            if etape:
+                etapes.append(etape)
+                continue
+            if line.startswith("CACHE "):
+                try:
+                    bilan_cache = json.loads(line[len("CACHE "):])
+                except ValueError:
+                    pass
+                continue
             if line == "=== RESULTATS ===":
                 in_results = True
                 continue
             if in_results and line and not line.startswith("Nettoyage terminé"):
                 resultats.append(line)
 
+        par_categorie = agreger_etapes(etapes)
+        libere_mb = sum(e["libereBytes"] for e in etapes) // (1024 * 1024)
+
+        if etapes:
+            enregistrer_historique_nettoyage(gestionnaire, etapes)
+
         # Vérifier le succès
         success = result.returncode == 0
-        message = "Nettoyage terminé avec succès" if success else "Erreur lors du nettoyage"
+        message = (f"Nettoyage terminé avec succès : {libere_mb} Mo libérés"
+                   if success else "Erreur lors du nettoyage")
 
         return {
             "succes": success,
             "message": message,
             "resultats": resultats,
-            "espaceLibereMB": 0  # On pourrait calculer l'espace libéré
+            "etapes": etapes,
+            "parCategorie": par_categorie,
+            "cachePaquets": {
+                "metadonneesConserveesMB": bilan_cache.get("metadonneesConserveesBytes", 0) // (1024 * 1024),
+                "retelechargementEviteMB": bilan_cache.get("retelechargementEviteBytes", 0) // (1024 * 1024),
+                "coutEviteSecondes": bilan_cache.get("coutEviteSecondes", 0)
+            },
+            "espaceLibereMB": libere_mb
         }
 
     except subprocess.TimeoutExpired:
@@ -311,6 +663,8 @@ def nettoyer_systeme():
             "succes": False,
             "message": "Timeout lors du nettoyage (>3 minutes)",
             "resultats": [],
+            "etapes": [],
+            "parCategorie": {},
             "espaceLibereMB": 0
         }
     except Exception as e:
@@ -318,21 +672,43 @@ def nettoyer_systeme():
             "succes": False,
             "message": f"Erreur lors du nettoyage: {str(e)}",
             "resultats": [],
+            "etapes": [],
+            "parCategorie": {},
             "espaceLibereMB": 0
         }
-    
+
 
 if __name__ == "__main__":
     """Point d'entrée du script"""
     import sys
 
     # Vérifier les arguments
-    if len(sys.argv) > 1 and sys.argv[1] == "clean":
+    args = sys.argv[1:]
+    budget_ms = lire_budget_ms(args)
+    mode_impact.appliquer(mode_impact.lire_mode(args))
+    args = mode_impact.retirer_option(args)
+
+    if args and args[0] == "clean":
         # Mode nettoyage
         resultat = nettoyer_systeme()
+    elif args and args[0] == "doublons":
+        # Doublons et gros fichiers dans les données utilisateur ($HOME par défaut)
+        positionnels = [a for a in args[1:] if not a.startswith("--")]
+        racine = positionnels[0] if positionnels else str(Path.home())
+        if "--stream" in args:
+            doublons.trouver_doublons_stream(racine)
+            sys.exit(0)
+        resultat = doublons.trouver_doublons(racine)
+    elif args and args[0] == "historique":
+        # Statistiques des nettoyages précédents, par étape
+        resultat = statistiques_etapes()
+    elif "--stream" in args:
+        # Mode analyse en streaming (NDJSON, une ligne par événement)
+        analyser_nettoyage_stream(budget_ms)
+        sys.exit(0)
     else:
         # Mode analyse (par défaut)
-        resultat = analyser_nettoyage()
+        resultat = analyser_nettoyage(budget_ms)
 
     try:
         print(json.dumps(resultat, indent=2, ensure_ascii=False))
@@ -1,66 +1,131 @@
 #!/bin/bash
 # cleanup_root.sh - Script de nettoyage système (nécessite root)
 # Exécuté via pkexec pour éviter de demander le mot de passe plusieurs fois
+#
+# Chaque étape émet une ligne "ETAPE {json}" (et l'élagage du cache "CACHE {json}") :
+#   etape, categorie, mesure (cible|statvfs), avant/apres (bytes), dureeMs, code
+# "cible" = taille des seuls chemins visés, "statvfs" = espace occupé du FS
 
 set -e  # Arrêter en cas d'erreur
 
 GESTIONNAIRE=$1
+PLAN=$2  # Optionnel : plan JSON produit par plan_nettoyage.py
+IMPACT=${3:-normal}  # Optionnel : normal|reduit|inactif (voir mode_impact.py)
+SCRIPT_DIR=$(dirname "$(readlink -f "$0")")
 RESULTATS=()
 
+# Priorité CPU / E/S abaissée pour tout le nettoyage (héritée par les commandes)
+case "$IMPACT" in
+    reduit)
+        renice -n 10 -p $$ >/dev/null 2>&1 || true
+        ionice -c 2 -n 7 -p $$ >/dev/null 2>&1 || true
+        ;;
+    inactif)
+        renice -n 19 -p $$ >/dev/null 2>&1 || true
+        ionice -c 3 -p $$ >/dev/null 2>&1 || true
+        chrt -i -p 0 $$ >/dev/null 2>&1 || true
+        ;;
+esac
+export TUXPILOT_IMPACT="$IMPACT"
+
 # Fonction pour ajouter un résultat
 add_result() {
     RESULTATS+=("$1")
 }
 
+# Horodatage en millisecondes
+maintenant_ms() {
+    date +%s%3N
+}
+
+# Espace occupé (bytes) du système de fichiers contenant $1 (statvfs)
+espace_occupe() {
+    stat -f -c '%b %f %S' "$1" 2>/dev/null | awk '{print ($1 - $2) * $3}' || echo 0
+}
+
+# Taille cumulée (bytes) des seuls chemins visés par une étape
+taille_cible() {
+    du -sb "$@" 2>/dev/null | awk '{s += $1} END {print s + 0}' || echo 0
+}
+
+# Émet l'enregistrement structuré d'une étape
+emettre_etape() {
+    # $1 etape, $2 categorie, $3 mesure, $4 avant, $5 apres, $6 debut ms, $7 code
+    local duree=$(( $(maintenant_ms) - $6 ))
+    printf 'ETAPE {"etape":"%s","categorie":"%s","mesure":"%s","avant":%d,"apres":%d,"dureeMs":%d,"code":%d}\n' \
+        "$1" "$2" "$3" "${4:-0}" "${5:-0}" "$duree" "$7"
+}
+
 echo "Début du nettoyage avec gestionnaire: $GESTIONNAIRE"
 
-# 1. Nettoyer le cache des paquets
+# 1. Élaguer le cache des paquets (archives obsolètes/installées uniquement,
+#    les métadonnées sont gardées pour ne pas tout re-télécharger)
 echo "Nettoyage du cache..."
-if [ "$GESTIONNAIRE" = "dnf5" ]; then
-    if dnf5 clean all 2>/dev/null; then
-        add_result "Cache DNF5 nettoyé"
-    else
-        add_result "Erreur cache DNF5"
-    fi
-elif [ "$GESTIONNAIRE" = "dnf" ]; then
-    if dnf clean all 2>/dev/null; then
-        add_result "Cache DNF nettoyé"
-    else
-        add_result "Erreur cache DNF"
-    fi
-elif [ "$GESTIONNAIRE" = "apt" ]; then
-    if apt-get clean 2>/dev/null; then
-        add_result "Cache APT nettoyé"
+case "$GESTIONNAIRE" in
+    dnf5) CACHE_DIRS=(/var/cache/libdnf5); LIBELLE="DNF5" ;;
+    dnf)  CACHE_DIRS=(/var/cache/dnf);     LIBELLE="DNF" ;;
+    apt)  CACHE_DIRS=(/var/cache/apt);     LIBELLE="APT" ;;
+    *)    CACHE_DIRS=() ;;
+esac
+CMD_CACHE=(python3 "$SCRIPT_DIR/cache_paquets.py" elaguer "$GESTIONNAIRE")
+
+if [ ${#CACHE_DIRS[@]} -gt 0 ]; then
+    debut=$(maintenant_ms)
+    avant=$(taille_cible "${CACHE_DIRS[@]}")
+    code=0
+    bilan=$("${CMD_CACHE[@]}" 2>/dev/null) || code=$?
+    apres=$(taille_cible "${CACHE_DIRS[@]}")
+    emettre_etape "cache_paquets" "cache_paquets" "cible" "$avant" "$apres" "$debut" "$code"
+    # Bilan de l'élagage (métadonnées conservées, re-téléchargement évité)
+    [ -n "$bilan" ] && echo "CACHE $(echo "$bilan" | tr -d '\n')"
+    if [ "$code" -eq 0 ]; then
+        add_result "Cache $LIBELLE nettoyé"
     else
-        add_result "Erreur cache APT"
+        add_result "Erreur cache $LIBELLE"
     fi
 fi
 
 # 2. Supprimer les paquets orphelins
 echo "Suppression des paquets orphelins..."
-if [ "$GESTIONNAIRE" = "dnf5" ]; then
-    if dnf5 autoremove -y 2>/dev/null; then
-        add_result "Paquets orphelins supprimés (DNF5)"
-    else
-        add_result "Erreur paquets orphelins DNF5"
-    fi
-elif [ "$GESTIONNAIRE" = "dnf" ]; then
-    if dnf autoremove -y 2>/dev/null; then
-        add_result "Paquets orphelins supprimés (DNF)"
-    else
-        add_result "Erreur paquets orphelins DNF"
-    fi
-elif [ "$GESTIONNAIRE" = "apt" ]; then
-    if apt-get autoremove -y 2>/dev/null; then
-        add_result "Paquets orphelins supprimés (APT)"
+case "$GESTIONNAIRE" in
+    dnf5) CMD_ORPHELINS=(dnf5 autoremove -y); LIBELLE="DNF5" ;;
+    dnf)  CMD_ORPHELINS=(dnf autoremove -y);  LIBELLE="DNF" ;;
+    apt)  CMD_ORPHELINS=(apt-get autoremove -y); LIBELLE="APT" ;;
+    *)    CMD_ORPHELINS=() ;;
+esac
+
+if [ ${#CMD_ORPHELINS[@]} -gt 0 ]; then
+    # Les fichiers supprimés sont dispersés : on mesure le FS racine (statvfs)
+    debut=$(maintenant_ms)
+    avant=$(espace_occupe /)
+    code=0
+    "${CMD_ORPHELINS[@]}" >/dev/null 2>&1 || code=$?
+    apres=$(espace_occupe /)
+    emettre_etape "paquets_orphelins" "paquets_orphelins" "statvfs" "$avant" "$apres" "$debut" "$code"
+    if [ "$code" -eq 0 ]; then
+        add_result "Paquets orphelins supprimés ($LIBELLE)"
     else
-        add_result "Erreur paquets orphelins APT"
+        add_result "Erreur paquets orphelins $LIBELLE"
     fi
 fi
 
 # 3. Nettoyer les fichiers temporaires (>7 jours dans /tmp)
 echo "Nettoyage des fichiers temporaires..."
-if find /tmp -type f -atime +7 -delete 2>/dev/null; then
+debut=$(maintenant_ms)
+code=0
+if [ -n "$PLAN" ] && [ -r "$PLAN" ]; then
+    # Plan pré-calculé par plan_nettoyage.py : pas de nouveau parcours en root,
+    # les fichiers modifiés depuis la planification sont ignorés
+    bilan=$(python3 "$SCRIPT_DIR/plan_nettoyage.py" appliquer "$PLAN" 2>/dev/null) || code=$?
+    prevu=$(echo "$bilan" | sed -n 's/.*"prevuBytes": \([0-9]*\).*/\1/p')
+    libere=$(echo "$bilan" | sed -n 's/.*"libereBytes": \([0-9]*\).*/\1/p')
+    emettre_etape "fichiers_temporaires" "fichiers_temporaires" "cible" "${prevu:-0}" $(( ${prevu:-0} - ${libere:-0} )) "$debut" "$code"
+else
+    # -printf après -delete : seule la taille des fichiers réellement supprimés est comptée
+    supprime=$(set -o pipefail; find /tmp -type f -atime +7 -delete -printf '%s\n' 2>/dev/null | awk '{s += $1} END {print s + 0}') || code=$?
+    emettre_etape "fichiers_temporaires" "fichiers_temporaires" "cible" "${supprime:-0}" 0 "$debut" "$code"
+fi
+if [ "$code" -eq 0 ]; then
     add_result "Fichiers temporaires nettoyés"
 else
     add_result "Erreur fichiers temporaires"
@@ -68,7 +133,14 @@ fi
 
 # 4. Nettoyer les logs journald (>30 jours)
 echo "Nettoyage des logs journald..."
-if journalctl --vacuum-time=30d 2>/dev/null; then
+JOURNAL_DIRS=(/var/log/journal /run/log/journal)
+debut=$(maintenant_ms)
+avant=$(taille_cible "${JOURNAL_DIRS[@]}")
+code=0
+journalctl --vacuum-time=30d >/dev/null 2>&1 || code=$?
+apres=$(taille_cible "${JOURNAL_DIRS[@]}")
+emettre_etape "journald" "logs_anciens" "cible" "$avant" "$apres" "$debut" "$code"
+if [ "$code" -eq 0 ]; then
     add_result "Logs journald nettoyés (>30 jours)"
 else
     add_result "Erreur logs journald"
@@ -81,4 +153,4 @@ for result in "${RESULTATS[@]}"; do
 done
 
 echo "Nettoyage terminé avec succès"
-exit 0
\ No newline at end of file
+exit 0
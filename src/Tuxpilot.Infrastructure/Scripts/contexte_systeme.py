@@ -1,31 +1,605 @@
 #!/usr/bin/env python3
+"""
+Tuxpilot - Contexte système pour l'assistant IA
+Collecte les sections (audit de sécurité, monitoring, configuration,
+services, logs, réseau) en parallèle. Chaque section a sa propre durée de
+validité : un message de chat ne recalcule que les sections périmées, les
+autres sont relues depuis ~/.tuxpilot/cache/contexte.json. La durée de
+collecte et l'âge de chaque section figurent dans le résultat.
+"""
+
+import hashlib
 import json
+import os
+import platform
+import re
+import shutil
 import subprocess
+import sys
+import time
+from concurrent.futures import wait
+from datetime import datetime
+from pathlib import Path
+
+import arriere_plan
+import audit_securite
+import diagnostic
+import mode_impact
+import sondes
+
+CACHE_CONTEXTE = Path.home() / ".tuxpilot" / "cache" / "contexte.json"
+
+# Délai maximal de collecte d'une section (au-delà : ancienne valeur ou erreur)
+DELAI_SECTION = 20
+
+# Budget de l'audit (chargement des unités et deux phases compris), sous
+# DELAI_SECTION pour que la section rende un résultat partiel plutôt qu'expirer
+BUDGET_AUDIT_MS = (DELAI_SECTION - 2) * 1000
+
+# Entrées du journal lues au plus (la compaction les regroupe ensuite)
+LOGS_MAX = 500
+
+
+# ---------------- SECTIONS ----------------
+
+def collecter_audit():
+    """Score et problèmes de l'audit (incrémental : seules les entrées modifiées sont réévaluées)"""
+    rapport = audit_securite.executer_audit(incremental=True, budget_ms=BUDGET_AUDIT_MS // 2,
+                                            budget_total_ms=BUDGET_AUDIT_MS)
+    ordre = {"Critique": 0, "Eleve": 1, "Moyen": 2, "Faible": 3, "Aucun": 4}
+    problemes = sorted(
+        (v for v in rapport["verifications"] if not v["reussie"] or v["niveau"] != "Aucun"),
+        key=lambda v: (ordre.get(v["niveau"], 5), v["nom"])
+    )
+    return {
+        "score": rapport["score"],
+        "mode": rapport["mode"],
+        "problemes": [{
+            "id": v["id"],
+            "nom": v["nom"],
+            "niveau": v["niveau"],
+            "details": v["details"],
+            "preuve": v["preuve"],
+            "impact": v["impact"],
+            "recommandation": v["recommandation"]
+        } for v in problemes]
+    }
+
+
+def _lire_meminfo():
+    valeurs = {}
+    for ligne in (sondes.lire_fichier("/proc/meminfo") or "").splitlines():
+        cle, _, reste = ligne.partition(":")
+        champs = reste.split()
+        if champs and champs[0].isdigit():
+            valeurs[cle] = int(champs[0]) // 1024
+    return valeurs
+
+
+def collecter_monitoring():
+    """Charge, mémoire, disque et processus les plus gourmands"""
+    memoire = _lire_meminfo()
+    total, disponible = memoire.get("MemTotal", 0), memoire.get("MemAvailable", 0)
+    disque = shutil.disk_usage("/")
+    charge = os.getloadavg()
+    return {
+        "charge": [round(c, 2) for c in charge],
+        "cpuThreads": os.cpu_count(),
+        "ramTotaleMB": total,
+        "ramUtiliseeMB": total - disponible,
+        "pourcentageRam": round(100 * (total - disponible) / total, 1) if total else 0,
+        "swapUtiliseMB": memoire.get("SwapTotal", 0) - memoire.get("SwapFree", 0),
+        "pourcentageDisque": round(100 * disque.used / disque.total, 1) if disque.total else 0,
+        "processus": diagnostic.analyser_processus_gourmands()
+    }
+
+
+def collecter_configuration():
+    """Distribution, noyau, bureau, redémarrage nécessaire"""
+    os_release = {}
+    for ligne in (sondes.lire_fichier("/etc/os-release") or "").splitlines():
+        cle, _, valeur = ligne.partition("=")
+        os_release[cle] = valeur.strip().strip('"')
+
+    redemarrage = None
+    if os.path.exists("/var/run/reboot-required"):
+        redemarrage = True
+    elif shutil.which("needs-restarting"):
+        try:
+            r = subprocess.run(["needs-restarting", "-r"], capture_output=True, timeout=10)
+            # needs-restarting -r : 1 quand un redémarrage est nécessaire
+            redemarrage = {0: False, 1: True}.get(r.returncode)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+    return {
+        "distribution": os_release.get("PRETTY_NAME", ""),
+        "noyau": platform.release(),
+        "machine": platform.node(),
+        "bureau": os.environ.get("XDG_CURRENT_DESKTOP", ""),
+        "redemarrageNecessaire": redemarrage
+    }
+
+
+def collecter_services():
+    """Services systemd en échec"""
+    return diagnostic.verifier_services()
+
+
+def collecter_logs():
+    """Avertissements et erreurs du journal (24 h), avec priorité et horodatage"""
+    try:
+        r = subprocess.run(
+            ["journalctl", "-p", "warning", "--since", "24 hours ago", "--no-pager", "-o", "json", "-n", str(LOGS_MAX)],
+            capture_output=True, text=True, timeout=15
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return diagnostic.analyser_logs_recents()
+
+    logs = []
+    for ligne in r.stdout.splitlines():
+        try:
+            entree = json.loads(ligne)
+        except ValueError:
+            continue
+        message = entree.get("MESSAGE")
+        if not isinstance(message, str) or not message.strip():
+            continue  # Messages binaires (listes d'octets) ignorés
+        horodatage = int(entree.get("__REALTIME_TIMESTAMP", 0)) / 1e6
+        logs.append({
+            "timestamp": datetime.fromtimestamp(horodatage).isoformat(timespec="seconds"),
+            "horodatage": horodatage,
+            "service": entree.get("SYSLOG_IDENTIFIER") or entree.get("_COMM") or "",
+            "message": message[:300],
+            "priorite": int(entree.get("PRIORITY", 4))
+        })
+    return {"nombreLogs": len(logs), "logs": logs}
+
+
+def collecter_reseau():
+    """Pare-feu actif et services en écoute hors boucle locale"""
+    pare_feu = "none"
+    try:
+        r = subprocess.run(["systemctl", "is-active", "ufw", "firewalld"], capture_output=True, text=True, timeout=5)
+        etats = r.stdout.split()
+        for nom, etat in zip(("ufw", "firewalld"), etats):
+            if etat == "active":
+                pare_feu = f"{nom} active"
+                break
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+
+    ecoutes = sondes.sockets_en_ecoute() or []
+    exposes = sorted({f"{e['proto']} {e['port']} {e['users']}".strip() for e in ecoutes if not e["locale"]})
+    return {
+        "pareFeu": pare_feu,
+        "portsExposes": exposes,
+        "ecoutesLocales": sum(1 for e in ecoutes if e["locale"])
+    }
+
+
+# Section -> (fonction, durée de validité en secondes)
+SECTIONS = {
+    "audit_securite": (collecter_audit, 20 * 60),
+    "monitoring": (collecter_monitoring, 30),
+    "system_config": (collecter_configuration, 6 * 3600),
+    "services": (collecter_services, 2 * 60),
+    "logs": (collecter_logs, 5 * 60),
+    "network": (collecter_reseau, 60)
+}
+
+
+# ---------------- CACHE ----------------
+
+def charger_cache(chemin=CACHE_CONTEXTE):
+    try:
+        with open(chemin, encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def sauvegarder_cache(cache, chemin=CACHE_CONTEXTE):
+    try:
+        Path(chemin).parent.mkdir(parents=True, exist_ok=True)
+        temporaire = Path(chemin).with_suffix(f".{os.getpid()}.tmp")
+        with open(temporaire, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(temporaire, chemin)
+    except OSError:
+        pass
+
+
+def _mesurer(fonction):
+    """Exécute une collecte : (données, durée ms, erreur)"""
+    debut = time.monotonic()
+    try:
+        return fonction(), int((time.monotonic() - debut) * 1000), None
+    except Exception as e:
+        return None, int((time.monotonic() - debut) * 1000), str(e)
+
+
+# ---------------- COMPACTION ----------------
+
+# Part du budget de tokens par section (la part inutilisée est redistribuée)
+PARTS_BUDGET = {
+    "audit_securite": 0.30,
+    "logs": 0.25,
+    "monitoring": 0.12,
+    "services": 0.12,
+    "network": 0.12,
+    "system_config": 0.09
+}
+
+# Section -> clé de la liste d'éléments à classer et tronquer
+LISTES = {
+    "audit_securite": "problemes",
+    "logs": "logs",
+    "services": "services",
+    "network": "portsExposes"
+}
+
+# Longueur maximale d'un texte conservé dans un élément
+TEXTE_MAX = 240
+
+SEVERITE_NIVEAU = {"Critique": 4, "Eleve": 3, "Moyen": 2, "Faible": 1}
+PRIORITE_SEVERITE = {"error": 3, "warning": 4, "info": 6}
+
+_VARIABLES = [
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I), "<uuid>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<ip>"),
+    (re.compile(r"\b0x[0-9a-f]+\b|\b[0-9a-f]{12,}\b", re.I), "<hex>"),
+    (re.compile(r"\d+"), "<n>")
+]
+
+
+def estimer_tokens(valeur):
+    """Estimation bon marché : ~4 caractères par token sur le JSON compact"""
+    texte = valeur if isinstance(valeur, str) else json.dumps(valeur, ensure_ascii=False, separators=(",", ":"))
+    return (len(texte) + 3) // 4
+
+
+def modele_log(message):
+    """Message sans ses parties variables (PID, adresses, identifiants, nombres)"""
+    for motif, remplacement in _VARIABLES:
+        message = motif.sub(remplacement, message)
+    return message
+
+
+def regrouper_logs(logs):
+    """Fusionne les logs d'un même service au même modèle : dernier exemple + occurrences"""
+    groupes = {}
+    for log in logs:
+        cle = (log.get("service", ""), modele_log(log.get("message", "")))
+        groupe = groupes.get(cle)
+        if groupe is None:
+            groupes[cle] = dict(log, occurrences=1)
+            continue
+        groupe["occurrences"] += 1
+        if log.get("horodatage", 0) >= groupe.get("horodatage", 0):
+            groupe.update({k: v for k, v in log.items() if k != "priorite"})
+        if "priorite" in log:
+            groupe["priorite"] = min(groupe.get("priorite", 7), log["priorite"])
+    return list(groupes.values())
+
+
+def _rang(section, element):
+    """Clé de tri : les plus graves, puis les plus récents, puis les plus fréquents d'abord"""
+    if section == "audit_securite":
+        return (-SEVERITE_NIVEAU.get(element.get("niveau"), 0),)
+    if section == "logs":
+        priorite = element.get("priorite", PRIORITE_SEVERITE.get(element.get("severity"), 4))
+        return (priorite, -element.get("horodatage", 0), -element.get("occurrences", 1))
+    return (0,)
+
+
+def _raccourcir(element):
+    if isinstance(element, str):
+        return element if len(element) <= TEXTE_MAX else element[:TEXTE_MAX - 1] + "…"
+    if isinstance(element, dict):
+        return {k: _raccourcir(v) for k, v in element.items()}
+    return element
+
+
+def compacter(sections, budget_tokens):
+    """
+    Réduit les sections du contexte à un budget de tokens
+
+    Les listes (problèmes, logs, services, ports) sont classées par gravité
+    puis récence et tronquées dans la part du budget de leur section ; les
+    logs répétés sont regroupés par modèle. Le reste de chaque section est
+    toujours conservé.
+
+    Args:
+        sections: Sections produites par get_full_context
+        budget_tokens: Budget total estimé
+
+    Returns:
+        tuple: (sections compactées, rapport de compaction)
+    """
+    tokens_avant = estimer_tokens(sections)
+    preparees = {}
+    for nom, section in sections.items():
+        donnees = section.get("donnees")
+        cle = LISTES.get(nom)
+        elements = []
+        if isinstance(donnees, dict) and isinstance(donnees.get(cle), list):
+            elements = donnees[cle]
+            if nom == "logs":
+                elements = regrouper_logs(elements)
+            elements = sorted((_raccourcir(e) for e in elements), key=lambda e: _rang(nom, e))
+            # L'horodatage numérique ne sert qu'au classement ("timestamp" reste lisible)
+            elements = [{k: v for k, v in e.items() if k != "horodatage"} if isinstance(e, dict) else e
+                        for e in elements]
+            donnees = {k: v for k, v in donnees.items() if k != cle}
+        enveloppe = dict(section, donnees=donnees)
+        preparees[nom] = {
+            "enveloppe": enveloppe,
+            "cle": cle if elements else None,
+            "elements": elements,
+            "couts": [estimer_tokens(e) + 1 for e in elements],
+            "gardes": 0,
+            "utilises": estimer_tokens(enveloppe)
+        }
+
+    # 1er passage : chaque section dans sa part ; 2e passage : le reste aux suivantes
+    parts = {nom: budget_tokens * PARTS_BUDGET.get(nom, 0.1) for nom in preparees}
+    for passage in (1, 2):
+        if passage == 2:
+            # Les parties fixes qui dépassent leur part sont prises sur le reste
+            reste = max(0, budget_tokens - sum(p["utilises"] for p in preparees.values()))
+        for nom in sorted(preparees, key=lambda n: -PARTS_BUDGET.get(n, 0.1)):
+            p = preparees[nom]
+            limite = parts[nom] if passage == 1 else p["utilises"] + reste
+            while p["gardes"] < len(p["elements"]) and p["utilises"] + p["couts"][p["gardes"]] <= limite:
+                p["utilises"] += p["couts"][p["gardes"]]
+                p["gardes"] += 1
+            if passage == 2:
+                reste = max(0, limite - p["utilises"])
+
+    compactees, detail = {}, {}
+    for nom, p in preparees.items():
+        section = p["enveloppe"]
+        omis = len(p["elements"]) - p["gardes"]
+        if p["cle"]:
+            section["donnees"] = dict(section["donnees"], **{p["cle"]: p["elements"][:p["gardes"]]})
+            if omis:
+                section["omis"] = omis
+        compactees[nom] = section
+        detail[nom] = {"tokens": p["utilises"], "gardes": p["gardes"], "omis": omis}
+
+    tokens_apres = estimer_tokens(compactees)
+    return compactees, {
+        "budgetTokens": budget_tokens,
+        "tokensAvant": tokens_avant,
+        "tokensApres": tokens_apres,
+        "tokensOmis": max(0, tokens_avant - tokens_apres),
+        "elementsOmis": sum(d["omis"] for d in detail.values()),
+        "sections": detail
+    }
+
+
+# ---------------- DELTA ENTRE LES TOURS ----------------
+
+# Dernier contexte envoyé par conversation (référence des deltas)
+CACHE_ENVOIS = Path.home() / ".tuxpilot" / "cache" / "contexte_envoye.json"
+
+# Au-delà de cette fraction du contexte complet, le delta n'est plus rentable
+SEUIL_DELTA = 0.6
+
+# Conversations dont la référence est conservée
+CONVERSATIONS_MAX = 20
+
+# Champs qui changent à chaque appel sans refléter l'état du système
+_VOLATILS = {"ageS", "dureeMs", "depuisCache"}
+
+
+def empreinte(valeur):
+    """Empreinte courte et stable d'une valeur JSON"""
+    texte = json.dumps(valeur, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(texte.encode(), digest_size=8).hexdigest()
+
+
+def _contenu(section):
+    return {k: v for k, v in section.items() if k not in _VOLATILS}
+
+
+def difference(avant, apres):
+    """
+    Différence structurée entre deux valeurs JSON
+
+    Dictionnaires : {"modifie": {clé: valeur ou différence}, "supprime": [clés]} ;
+    listes d'objets : {"ajoute": [...], "retire": [...]} ; autres (dont les
+    listes de valeurs simples, où l'ordre compte) : la nouvelle valeur.
+    """
+    if isinstance(avant, dict) and isinstance(apres, dict):
+        modifie = {}
+        for cle, valeur in apres.items():
+            if cle not in avant:
+                modifie[cle] = valeur
+            elif avant[cle] != valeur:
+                modifie[cle] = difference(avant[cle], valeur)
+        resultat = {"modifie": modifie} if modifie else {}
+        supprime = [cle for cle in avant if cle not in apres]
+        if supprime:
+            resultat["supprime"] = supprime
+        return resultat
+    if (isinstance(avant, list) and isinstance(apres, list)
+            and all(isinstance(e, dict) for e in avant + apres)):
+        anciens = {empreinte(e) for e in avant}
+        nouveaux = {empreinte(e) for e in apres}
+        resultat = {}
+        ajoute = [e for e in apres if empreinte(e) not in anciens]
+        retire = [e for e in avant if empreinte(e) not in nouveaux]
+        if ajoute:
+            resultat["ajoute"] = ajoute
+        if retire:
+            resultat["retire"] = retire
+        return resultat
+    return apres
+
+
+def encoder_delta(sections, conversation, nouvelle=False, chemin=CACHE_ENVOIS):
+    """
+    Contexte à envoyer pour un tour de conversation
+
+    Le premier tour (ou nouvelle=True) reçoit le contexte complet. Les tours
+    suivants reçoivent, par rapport au dernier contexte envoyé dans la même
+    conversation, la différence des sections modifiées ; les sections
+    inchangées ne sont référencées que par leur empreinte. Si la différence
+    dépasse SEUIL_DELTA du contexte complet, le contexte complet est renvoyé.
+
+    Returns:
+        tuple: (sections à envoyer, {"type", "empreinte", "base", "tokens", "tokensComplet"})
+    """
+    empreintes = {nom: empreinte(_contenu(section)) for nom, section in sections.items()}
+    globale = empreinte(empreintes)
+    complet = {nom: dict(section, empreinte=empreintes[nom]) for nom, section in sections.items()}
+
+    envois = charger_cache(chemin)
+    precedent = None if nouvelle else envois.get(conversation)
+
+    envoi, base = complet, None
+    if precedent:
+        base = precedent["empreinte"]
+        anciennes = precedent["sections"]
+        delta = {}
+        for nom, section in sections.items():
+            ancienne = anciennes.get(nom)
+            if ancienne is not None and ancienne["empreinte"] == empreintes[nom]:
+                delta[nom] = {"inchange": empreintes[nom]}
+            elif ancienne is None:
+                delta[nom] = complet[nom]
+            else:
+                delta[nom] = dict({k: v for k, v in section.items() if k in _VOLATILS},
+                                  empreinte=empreintes[nom],
+                                  difference=difference(ancienne["contenu"], _contenu(section)))
+        supprimees = [nom for nom in anciennes if nom not in sections]
+        if supprimees:
+            delta["_supprimees"] = supprimees
+        if estimer_tokens(delta) <= SEUIL_DELTA * estimer_tokens(complet):
+            envoi = delta
+
+    # Référence du prochain tour : le contexte tel que le modèle le connaît désormais
+    envois.pop(conversation, None)
+    envois[conversation] = {
+        "empreinte": globale,
+        "horodatage": time.time(),
+        "sections": {nom: {"empreinte": empreintes[nom], "contenu": _contenu(section)}
+                     for nom, section in sections.items()}
+    }
+    while len(envois) > CONVERSATIONS_MAX:
+        envois.pop(next(iter(envois)))
+    sauvegarder_cache(envois, chemin)
+
+    return envoi, {
+        "type": "complet" if envoi is complet else "delta",
+        "empreinte": globale,
+        "base": base if envoi is not complet else None,
+        "tokens": estimer_tokens(envoi),
+        "tokensComplet": estimer_tokens(complet)
+    }
+
+
+# ---------------- COLLECTE ----------------
+
+def get_full_context(forcer=False, sections=None, budget_tokens=None, conversation=None, nouvelle=False,
+                     chemin_cache=CACHE_CONTEXTE):
+    """
+    Collecte tout le contexte système pour l'IA
+
+    Args:
+        forcer: Recalculer toutes les sections demandées, même valides
+        sections: Noms des sections (défaut : toutes)
+        budget_tokens: Budget de tokens du contexte (compaction, voir compacter)
+        conversation: Identifiant de conversation (envoi en delta, voir encoder_delta)
+        nouvelle: Début de conversation : contexte complet
+
+    Returns:
+        dict: {"sections": {nom: {"donnees", "ageS", "dureeMs", "depuisCache"[, "erreur", "omis"]}},
+               "timestamp", "dureeMs", "rafraichies"[, "compaction", "delta"]}
+    """
+    debut = time.monotonic()
+    maintenant = time.time()
+    noms = [n for n in (sections or SECTIONS) if n in SECTIONS]
+    cache = charger_cache(chemin_cache)
+
+    perimees = [n for n in noms if forcer or n not in cache
+                or maintenant - cache[n].get("horodatage", 0) > SECTIONS[n][1]]
+
+    resultats = {}
+    if perimees:
+        # Threads démons : une section bloquée garde son ancienne valeur et
+        # ne retient pas la fin du script
+        futures = {n: arriere_plan.soumettre(_mesurer, SECTIONS[n][0], nom=f"contexte-{n}") for n in perimees}
+        wait(futures.values(), timeout=DELAI_SECTION)
+        for nom, future in futures.items():
+            if future.done():
+                resultats[nom] = future.result()
+            else:
+                resultats[nom] = (None, DELAI_SECTION * 1000, f"délai de {DELAI_SECTION}s dépassé")
+
+    sortie = {}
+    for nom in noms:
+        if nom in resultats:
+            donnees, duree_ms, erreur = resultats[nom]
+            if erreur is None:
+                cache[nom] = {"horodatage": time.time(), "dureeMs": duree_ms, "donnees": donnees}
+                sortie[nom] = {"donnees": donnees, "ageS": 0, "dureeMs": duree_ms, "depuisCache": False}
+                continue
+            if nom in cache:
+                # Échec : dernière valeur connue, même périmée, avec l'erreur
+                entree = cache[nom]
+                sortie[nom] = {"donnees": entree["donnees"], "ageS": int(maintenant - entree["horodatage"]),
+                               "dureeMs": duree_ms, "depuisCache": True, "erreur": erreur}
+            else:
+                sortie[nom] = {"donnees": None, "ageS": None, "dureeMs": duree_ms, "depuisCache": False, "erreur": erreur}
+            continue
+        entree = cache[nom]
+        sortie[nom] = {"donnees": entree["donnees"], "ageS": int(maintenant - entree["horodatage"]),
+                       "dureeMs": entree.get("dureeMs", 0), "depuisCache": True}
+
+    if resultats:
+        sauvegarder_cache(cache, chemin_cache)
 
-# Réutiliser les scripts existants
-from audit_securite import get_audit_results
-from info_systeme import get_system_info
-# etc.
-
-def get_full_context():
-    """Collecte TOUT le contexte système pour l'IA"""
-
-    context = {
-        "audit_securite": get_audit_data(),
-        "monitoring": get_monitoring_data(),
-        "system_config": get_system_config(),
-        "services": get_services_data(),
-        "logs": get_logs_data(),
-        "network": get_network_data(),
+    contexte = {
+        "sections": sortie,
+        "rafraichies": [n for n in perimees if sortie[n]["depuisCache"] is False and "erreur" not in sortie[n]],
         "timestamp": datetime.now().isoformat()
     }
+    if budget_tokens:
+        contexte["sections"], contexte["compaction"] = compacter(sortie, budget_tokens)
+    if conversation:
+        contexte["sections"], contexte["delta"] = encoder_delta(contexte["sections"], conversation, nouvelle)
+    contexte["dureeMs"] = int((time.monotonic() - debut) * 1000)
+    return contexte
 
-    return context
 
 if __name__ == "__main__":
+    """Point d'entrée du script : [--rafraichir] [--sections a,b,...] [--budget tokens]
+    [--conversation id [--nouvelle]]"""
     try:
-        context = get_full_context()
-        print(json.dumps(context, indent=2))
+        mode_impact.appliquer(mode_impact.lire_mode())
+        args = mode_impact.retirer_option(sys.argv[1:])
+        sections, budget, conversation = None, None, None
+        for i, arg in enumerate(args):
+            if arg.startswith("--sections="):
+                sections = arg.split("=", 1)[1].split(",")
+            elif arg == "--sections" and i + 1 < len(args):
+                sections = args[i + 1].split(",")
+            elif arg.startswith("--budget="):
+                budget = int(arg.split("=", 1)[1])
+            elif arg == "--budget" and i + 1 < len(args):
+                budget = int(args[i + 1])
+            elif arg.startswith("--conversation="):
+                conversation = arg.split("=", 1)[1]
+            elif arg == "--conversation" and i + 1 < len(args):
+                conversation = args[i + 1]
+        context = get_full_context(forcer="--rafraichir" in args, sections=sections, budget_tokens=budget,
+                                   conversation=conversation, nouvelle="--nouvelle" in args)
+        print(json.dumps(context, indent=2, ensure_ascii=False))
+        sys.exit(0)
     except Exception as e:
-        print(json.dumps({"error": str(e)}), file=sys.stderr)
-        sys.exit(1)
\ No newline at end of file
+        print(json.dumps({"erreur": str(e)}), file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Tuxpilot - Recherche de doublons et de gros fichiers (données utilisateur)
+Les candidats sont réduits par étapes : regroupement par taille, puis
+empreinte partielle (64 Kio de début et de fin), puis empreinte complète
+(mmap, pool de processus). Les empreintes sont en cache par
+(inode, mtime, taille) : un nouveau scan d'un dossier inchangé est quasi
+gratuit. Les groupes de doublons sont émis au fur et à mesure.
+"""
+
+import heapq
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import empreintes
+from evenements import emettre_evenement
+import mode_impact
+
+# Taille minimale d'un fichier pris en compte pour les doublons
+TAILLE_MIN_DEFAUT = 1024 * 1024
+
+# Nombre de plus gros fichiers rapportés
+NOMBRE_GROS_FICHIERS = 20
+
+# Dossiers jamais parcourus (relatifs à la racine)
+EXCLUSIONS = {".tuxpilot"}
+
+
+def _mo(octets):
+    return round(octets / (1024 * 1024), 1)
+
+
+def parcourir(racine, meme_fs=True):
+    """
+    Liste les fichiers réguliers sous une racine (sans suivre les liens)
+
+    Yields:
+        tuple: (chemin, stat)
+    """
+    try:
+        dev_racine = os.stat(racine).st_dev
+    except OSError:
+        return
+
+    a_visiter = [racine]
+    while a_visiter:
+        mode_impact.ralentir()
+        dossier = a_visiter.pop()
+        try:
+            with os.scandir(dossier) as entrees:
+                for entree in entrees:
+                    try:
+                        if entree.is_dir(follow_symlinks=False):
+                            if dossier == racine and entree.name in EXCLUSIONS:
+                                continue
+                            if meme_fs and entree.stat(follow_symlinks=False).st_dev != dev_racine:
+                                continue
+                            a_visiter.append(entree.path)
+                        elif entree.is_file(follow_symlinks=False):
+                            yield entree.path, entree.stat(follow_symlinks=False)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+
+
+def trouver_doublons(racine, taille_min=TAILLE_MIN_DEFAUT, on_groupe=None, on_progression=None,
+                     chemin_cache=None, processus=None):
+    """
+    Recherche les fichiers en double et les plus gros fichiers sous une racine
+
+    Args:
+        racine: Dossier à analyser (généralement $HOME)
+        taille_min: Taille minimale des fichiers comparés
+        on_groupe: Callback(groupe) appelé dès qu'un groupe de doublons est confirmé
+        on_progression: Callback(etape, message) entre les étapes
+        chemin_cache: Base d'empreintes (défaut : ~/.tuxpilot/cache/empreintes.db)
+        processus: Taille du pool de hachage (défaut : nombre de cœurs)
+
+    Returns:
+        dict: Groupes de doublons, plus gros fichiers et statistiques par étape
+    """
+    debut = time.monotonic()
+    stats = {
+        "fichiersAnalyses": 0,
+        "candidatsTaille": 0,
+        "candidatsPartiels": 0,
+        "hachagesPartiels": 0,
+        "hachagesComplets": 0,
+        "depuisCache": 0,
+        "octetsHaches": 0
+    }
+
+    # 1. Parcours : regroupement par taille (un inode = un fichier, liens durs exclus)
+    par_taille = {}
+    inodes_vus = set()
+    gros_fichiers = []
+    for chemin, st in parcourir(racine):
+        stats["fichiersAnalyses"] += 1
+        if len(gros_fichiers) < NOMBRE_GROS_FICHIERS:
+            heapq.heappush(gros_fichiers, (st.st_size, chemin))
+        elif st.st_size > gros_fichiers[0][0]:
+            heapq.heapreplace(gros_fichiers, (st.st_size, chemin))
+
+        if st.st_size < max(1, taille_min) or (st.st_dev, st.st_ino) in inodes_vus:
+            continue
+        inodes_vus.add((st.st_dev, st.st_ino))
+        par_taille.setdefault(st.st_size, []).append((chemin, st))
+
+    groupes_taille = {t: f for t, f in par_taille.items() if len(f) > 1}
+    stats["candidatsTaille"] = sum(len(f) for f in groupes_taille.values())
+    if on_progression:
+        on_progression("taille", f"{stats['candidatsTaille']} fichier(s) de même taille")
+
+    conn = empreintes.ouvrir_cache(chemin_cache)
+    groupes = []
+    pool = None
+    try:
+        # 2. Empreinte partielle (début + fin)
+        candidats = {}
+        for taille, fichiers in groupes_taille.items():
+            for chemin, st in fichiers:
+                partielle, complete = empreintes.lire_cache(conn, st)
+                if partielle:
+                    stats["depuisCache"] += 1
+                else:
+                    try:
+                        partielle = empreintes.hacher_partiel(chemin, taille)
+                    except OSError:
+                        continue
+                    stats["hachagesPartiels"] += 1
+                    empreintes.ecrire_cache(conn, st, partielle=partielle)
+                candidats.setdefault((taille, partielle), []).append([chemin, st, complete])
+        conn.commit()
+
+        candidats = {k: f for k, f in candidats.items() if len(f) > 1}
+        stats["candidatsPartiels"] = sum(len(f) for f in candidats.values())
+        if on_progression:
+            on_progression("partiel", f"{stats['candidatsPartiels']} candidat(s) après empreinte partielle")
+
+        # 3. Empreinte complète, les plus grosses tailles d'abord (gain maximal en tête)
+        for (taille, partielle), fichiers in sorted(candidats.items(), key=lambda x: x[0][0], reverse=True):
+            if taille <= 2 * empreintes.TAILLE_BLOC_PARTIEL:
+                # L'empreinte partielle couvre déjà tout le fichier
+                for f in fichiers:
+                    f[2] = partielle
+            else:
+                taches = [(i, f[0]) for i, f in enumerate(fichiers) if not f[2]]
+                stats["depuisCache"] += len(fichiers) - len(taches)
+                if len(taches) > 1 and pool is None:
+                    # Un seul pool pour toute l'étape, créé au premier groupe à hacher
+                    pool = empreintes.creer_pool(processus)
+                for i, complete in empreintes.hacher_en_parallele(taches, processus=processus, pool=pool):
+                    fichiers[i][2] = complete
+                    if complete:
+                        stats["hachagesComplets"] += 1
+                        stats["octetsHaches"] += taille
+                        empreintes.ecrire_cache(conn, fichiers[i][1], partielle=partielle, complete=complete)
+                conn.commit()
+
+            par_empreinte = {}
+            for chemin, st, complete in fichiers:
+                if complete:
+                    par_empreinte.setdefault(complete, []).append(chemin)
+
+            for complete, chemins in par_empreinte.items():
+                if len(chemins) < 2:
+                    continue
+                groupe = {
+                    "empreinte": complete,
+                    "tailleMB": _mo(taille),
+                    "fichiers": sorted(chemins),
+                    "gaspilleMB": _mo(taille * (len(chemins) - 1))
+                }
+                groupes.append(groupe)
+                if on_groupe:
+                    on_groupe(groupe)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        conn.close()
+
+    return {
+        "racine": str(racine),
+        "groupes": groupes,
+        "nombreGroupes": len(groupes),
+        "gaspilleMB": round(sum(g["gaspilleMB"] for g in groupes), 1),
+        "plusGrosFichiers": [
+            {"chemin": chemin, "tailleMB": _mo(taille)}
+            for taille, chemin in sorted(gros_fichiers, reverse=True)
+        ],
+        "statistiques": dict(stats, dureeMs=int((time.monotonic() - debut) * 1000))
+    }
+
+
+def trouver_doublons_stream(racine, taille_min=TAILLE_MIN_DEFAUT):
+    """Recherche en streaming : progression, puis un événement par groupe confirmé"""
+    resultat = trouver_doublons(
+        racine,
+        taille_min,
+        on_groupe=lambda groupe: emettre_evenement("groupe", groupe=groupe),
+        on_progression=lambda etape, message: emettre_evenement("progression", etape=etape, message=message)
+    )
+    emettre_evenement("resultat", resultat=resultat)
+    return resultat
+
+
+# ---------------- BENCHMARK ----------------
+
+def generer_corpus(dossier, nombre_fichiers=300, taille_moyenne=1024 * 1024):
+    """
+    Corpus synthétique : ~1/3 de doublons exacts, des fichiers de même taille
+    au contenu différent, et des fichiers identiques au début et à la fin mais
+    différents au milieu (éliminés seulement par l'empreinte complète).
+    """
+    import random
+    aleatoire = random.Random(42)
+    originaux = []
+
+    for i in range(nombre_fichiers):
+        sous_dossier = os.path.join(dossier, f"d{i % 10}")
+        os.makedirs(sous_dossier, exist_ok=True)
+        chemin = os.path.join(sous_dossier, f"f{i}.bin")
+        genre = i % 6
+
+        if genre in (0, 1) and originaux:
+            # Doublon exact
+            shutil.copyfile(aleatoire.choice(originaux), chemin)
+            continue
+
+        taille = max(1, int(aleatoire.expovariate(1 / taille_moyenne)))
+        if genre == 2 and originaux:
+            # Même début et même fin qu'un original, milieu différent
+            source = aleatoire.choice(originaux)
+            with open(source, "rb") as f:
+                contenu = bytearray(f.read())
+            if len(contenu) > 2 * empreintes.TAILLE_BLOC_PARTIEL:
+                contenu[len(contenu) // 2] ^= 0xFF
+            with open(chemin, "wb") as f:
+                f.write(contenu)
+            continue
+
+        with open(chemin, "wb") as f:
+            f.write(aleatoire.randbytes(taille))
+        originaux.append(chemin)
+
+
+def benchmark(nombre_fichiers=300, taille_moyenne=1024 * 1024):
+    """Mesure un scan à froid puis à chaud (cache d'empreintes rempli)"""
+    with tempfile.TemporaryDirectory(prefix="tuxpilot-doublons-") as dossier:
+        corpus = os.path.join(dossier, "corpus")
+        cache = os.path.join(dossier, "empreintes.db")
+        generer_corpus(corpus, nombre_fichiers, taille_moyenne)
+
+        mesures = {}
+        for passe in ("froid", "chaud"):
+            debut = time.monotonic()
+            resultat = trouver_doublons(corpus, taille_min=1, chemin_cache=cache)
+            duree = time.monotonic() - debut
+            stats = resultat["statistiques"]
+            mesures[passe] = {
+                "dureeMs": int(duree * 1000),
+                "groupes": resultat["nombreGroupes"],
+                "hachagesComplets": stats["hachagesComplets"],
+                "depuisCache": stats["depuisCache"],
+                "debitMoS": round(stats["octetsHaches"] / (1024 * 1024) / duree, 1) if duree else 0
+            }
+
+        return {
+            "fichiers": nombre_fichiers,
+            "tailleCorpusMB": _mo(sum(st.st_size for _, st in parcourir(corpus))),
+            "processus": os.cpu_count(),
+            "passes": mesures
+        }
+
+
+if __name__ == "__main__":
+    """Point d'entrée du script"""
+    try:
+        args = sys.argv[1:]
+        mode_impact.appliquer(mode_impact.lire_mode(args))
+        args = mode_impact.retirer_option(args)
+        if args and args[0] == "bench":
+            nombre = int(args[1]) if len(args) >= 2 else 300
+            resultat = benchmark(nombre)
+        else:
+            positionnels = [a for a in args if not a.startswith("--")]
+            racine = positionnels[0] if positionnels else str(Path.home())
+            if "--stream" in args:
+                trouver_doublons_stream(racine)
+                sys.exit(0)
+            resultat = trouver_doublons(racine)
+
+        print(json.dumps(resultat, indent=2, ensure_ascii=False))
+        sys.exit(0)
+    except Exception as e:
+        print(json.dumps({"erreur": str(e)}), file=sys.stderr)
+        sys.exit(1)
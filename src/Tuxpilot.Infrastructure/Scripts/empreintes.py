@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Tuxpilot - Empreintes de fichiers (hachage + cache persistant)
+Hachage partiel (début + fin) et complet via mmap, réparti sur un pool de
+processus. Les empreintes sont mises en cache par (dev, inode, mtime, taille)
+dans une base SQLite : un fichier inchangé n'est jamais relu.
+"""
+
+import hashlib
+import mmap
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# Taille lue au début et à la fin du fichier pour l'empreinte partielle
+TAILLE_BLOC_PARTIEL = 64 * 1024
+
+# Tranches passées à hashlib depuis le mmap
+TAILLE_TRANCHE = 8 * 1024 * 1024
+
+CACHE_EMPREINTES = Path.home() / ".tuxpilot" / "cache" / "empreintes.db"
+
+
+# ---------------- HACHAGE ----------------
+
+def hacher_partiel(chemin, taille):
+    """Empreinte des 64 premiers et 64 derniers Kio (fichier entier si plus petit)"""
+    h = hashlib.blake2b(digest_size=20)
+    fd = os.open(chemin, os.O_RDONLY)
+    try:
+        h.update(os.pread(fd, TAILLE_BLOC_PARTIEL, 0))
+        if taille > 2 * TAILLE_BLOC_PARTIEL:
+            h.update(os.pread(fd, TAILLE_BLOC_PARTIEL, taille - TAILLE_BLOC_PARTIEL))
+        elif taille > TAILLE_BLOC_PARTIEL:
+            h.update(os.pread(fd, taille - TAILLE_BLOC_PARTIEL, TAILLE_BLOC_PARTIEL))
+    finally:
+        os.close(fd)
+    return h.hexdigest()
+
+
+def hacher_complet(chemin, algorithme="blake2b"):
+    """Empreinte du fichier entier, lu via mmap (sans copie en espace utilisateur)"""
+    h = hashlib.blake2b(digest_size=20) if algorithme == "blake2b" else hashlib.new(algorithme)
+    with open(chemin, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return h.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            m.madvise(mmap.MADV_SEQUENTIAL)
+            vue = memoryview(m)
+            try:
+                for debut in range(0, len(m), TAILLE_TRANCHE):
+                    h.update(vue[debut:debut + TAILLE_TRANCHE])
+            finally:
+                vue.release()
+    return h.hexdigest()
+
+
+def _tache_complete(args):
+    """Tâche du pool : (cle, chemin, algorithme) -> (cle, empreinte ou None)"""
+    cle, chemin, algorithme = args
+    try:
+        return cle, hacher_complet(chemin, algorithme)
+    except (OSError, ValueError):
+        return cle, None
+
+
+def _lot_complet(lot):
+    """Tâche du pool : liste de (cle, chemin, algorithme) -> liste de (cle, empreinte ou None)"""
+    return [_tache_complete(args) for args in lot]
+
+
+def creer_pool(processus=None):
+    """
+    Pool de hachage à partager entre tous les appels d'une même étape
+    (créer un pool par groupe de candidats coûte plus que le hachage)
+    """
+    return ProcessPoolExecutor(max_workers=processus or os.cpu_count() or 1)
+
+
+def hacher_en_parallele(taches, algorithme="blake2b", processus=None, pool=None):
+    """
+    Hache complètement une liste de fichiers sur tous les cœurs
+
+    Args:
+        taches: Liste de (cle, chemin)
+        processus: Nombre de processus (défaut : nombre de cœurs)
+        pool: Pool existant (creer_pool) ; sans pool, un pool temporaire est créé
+
+    Yields:
+        tuple: (cle, empreinte ou None) dans l'ordre de fin des lots
+    """
+    if not taches:
+        return
+    if len(taches) == 1:
+        cle, chemin = taches[0]
+        yield _tache_complete((cle, chemin, algorithme))
+        return
+    if pool is None:
+        with creer_pool(min(processus or os.cpu_count() or 1, len(taches))) as pool:
+            yield from hacher_en_parallele(taches, algorithme, processus, pool)
+        return
+
+    processus = processus or os.cpu_count() or 1
+    taille_lot = max(1, len(taches) // (processus * 8))
+    futures = [
+        pool.submit(_lot_complet, [(cle, chemin, algorithme) for cle, chemin in taches[i:i + taille_lot]])
+        for i in range(0, len(taches), taille_lot)
+    ]
+    for future in as_completed(futures):
+        yield from future.result()
+
+
+# ---------------- CACHE ----------------
+
+def ouvrir_cache(chemin=None):
+    """Ouvre (ou crée) la base SQLite du cache d'empreintes"""
+    chemin = Path(chemin or CACHE_EMPREINTES)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(chemin))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS empreintes (
+            dev INTEGER NOT NULL,
+            inode INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            taille INTEGER NOT NULL,
+            algorithme TEXT NOT NULL,
+            partielle TEXT,
+            complete TEXT,
+            PRIMARY KEY (dev, inode, algorithme)
+        )
+    """)
+    return conn
+
+
+def lire_cache(conn, st, algorithme="blake2b"):
+    """
+    Empreintes connues pour un fichier inchangé
+
+    Returns:
+        tuple: (partielle, complete) - None pour les valeurs inconnues
+    """
+    ligne = conn.execute(
+        "SELECT mtime_ns, taille, partielle, complete FROM empreintes "
+        "WHERE dev = ? AND inode = ? AND algorithme = ?",
+        (st.st_dev, st.st_ino, algorithme)
+    ).fetchone()
+    if ligne is None or ligne[0] != st.st_mtime_ns or ligne[1] != st.st_size:
+        return None, None
+    return ligne[2], ligne[3]
+
+
+def ecrire_cache(conn, st, partielle=None, complete=None, algorithme="blake2b"):
+    """Mémorise les empreintes d'un fichier (conserve celles déjà connues)"""
+    conn.execute(
+        "INSERT INTO empreintes (dev, inode, mtime_ns, taille, algorithme, partielle, complete) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (dev, inode, algorithme) DO UPDATE SET "
+        "partielle = CASE WHEN excluded.mtime_ns = mtime_ns AND excluded.taille = taille "
+        "                 THEN COALESCE(excluded.partielle, partielle) ELSE excluded.partielle END, "
+        "complete = CASE WHEN excluded.mtime_ns = mtime_ns AND excluded.taille = taille "
+        "                THEN COALESCE(excluded.complete, complete) ELSE excluded.complete END, "
+        "mtime_ns = excluded.mtime_ns, taille = excluded.taille",
+        (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size, algorithme, partielle, complete)
+    )
@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+"""
+Tuxpilot - Événements NDJSON
+Format commun des modes --stream : un objet JSON par ligne sur stdout,
+vidé immédiatement (lu ligne à ligne par ExecuterAvecStreamingAsync).
+"""
+
+import json
+from datetime import datetime
+
+
+def emettre_evenement(type, **donnees):
+    """Écrit un événement NDJSON sur stdout (mode --stream)"""
+    evenement = {"type": type, **donnees, "timestamp": datetime.now().isoformat()}
+    print(json.dumps(evenement, ensure_ascii=False), flush=True)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Tuxpilot - Espace retenu par des fichiers supprimés encore ouverts
+Parcourt /proc/[pid]/fd à la recherche de cibles "(deleted)" : ces fichiers
+occupent toujours le disque (df) tant qu'un processus les garde ouverts.
+Le résultat indique quel redémarrage de service libérerait combien d'espace.
+"""
+
+import json
+import os
+import stat
+import sys
+import time
+
+SUFFIXE_SUPPRIME = " (deleted)"
+
+# Nombre maximal d'entrées par liste dans le résultat
+LIMITE_LISTES = 20
+
+
+def unite_cgroup(chemin):
+    """
+    Unité systemd redémarrable d'après un chemin cgroup v2
+
+    Le gestionnaire de session (user@UID.service) n'est jamais retenu : le
+    redémarrer fermerait toute la session. Une application de bureau placée
+    dans un .scope sous ce gestionnaire n'a donc pas d'unité (repli sur le pid).
+
+    Returns:
+        tuple: (unité, gestionnaire) - gestionnaire vaut "user@UID.service" pour
+               une unité du gestionnaire utilisateur, None pour une unité système
+    """
+    unite = None
+    gestionnaire = None
+    for partie in chemin.split("/"):
+        if partie.startswith("user@") and partie.endswith(".service"):
+            gestionnaire = partie
+            unite = None
+        elif partie.endswith(".service"):
+            unite = partie
+    return unite, gestionnaire if unite else None
+
+
+def infos_processus(racine_proc, pid):
+    """Nom (comm) et unité systemd (.service) d'un processus"""
+    nom = ""
+    unite = None
+    gestionnaire = None
+    try:
+        with open(f"{racine_proc}/{pid}/comm", encoding="utf-8", errors="replace") as f:
+            nom = f.read().strip()
+    except OSError:
+        pass
+
+    try:
+        with open(f"{racine_proc}/{pid}/cgroup", encoding="utf-8", errors="replace") as f:
+            for ligne in f:
+                # cgroup v2 : "0::/system.slice/nginx.service"
+                # ou "0::/user.slice/user-1000.slice/user@1000.service/session.slice/pipewire.service"
+                chemin = ligne.rstrip("\n").split(":", 2)[-1]
+                unite, gestionnaire = unite_cgroup(chemin)
+                if unite:
+                    break
+    except OSError:
+        pass
+
+    return {"pid": pid, "nom": nom, "unite": unite, "gestionnaire": gestionnaire}
+
+
+def scanner_fd(echeance=None, racine_proc="/proc"):
+    """
+    Collecte les fichiers supprimés encore ouverts, dédupliqués par inode
+
+    Seul readlink est fait pour chaque fd ; le stat (qui suit le lien magique
+    vers l'inode ouvert, donc fonctionne même après suppression) n'est fait
+    que pour les cibles "(deleted)". Cela reste rapide avec 2000+ processus.
+
+    Returns:
+        dict: {"fichiers": {(dev, ino): {...}}, "processus": {pid: {...}},
+               "analyses", "inaccessibles", "partiel"}
+    """
+    fichiers = {}
+    processus = {}
+    analyses = 0
+    inaccessibles = 0
+    partiel = False
+
+    try:
+        pids = [int(e.name) for e in os.scandir(racine_proc) if e.name.isdigit()]
+    except OSError:
+        pids = []
+
+    for pid in pids:
+        if echeance is not None and time.monotonic() >= echeance:
+            partiel = True
+            break
+
+        try:
+            entrees = os.scandir(f"{racine_proc}/{pid}/fd")
+        except PermissionError:
+            # Processus d'un autre utilisateur (analyse non root)
+            inaccessibles += 1
+            continue
+        except OSError:
+            # Processus terminé entre-temps
+            continue
+
+        analyses += 1
+        with entrees:
+            for entree in entrees:
+                try:
+                    cible = os.readlink(entree.path)
+                except OSError:
+                    continue
+                # memfd et autres objets anonymes ne sont pas sur disque
+                if not cible.endswith(SUFFIXE_SUPPRIME) or not cible.startswith("/") or cible.startswith("/memfd:"):
+                    continue
+
+                try:
+                    st = os.stat(entree.path)
+                except OSError:
+                    continue
+                if not stat.S_ISREG(st.st_mode) or st.st_nlink > 0:
+                    continue
+
+                fichier = fichiers.setdefault((st.st_dev, st.st_ino), {
+                    "chemin": cible[:-len(SUFFIXE_SUPPRIME)],
+                    "taille": st.st_size,
+                    "pids": set()
+                })
+                fichier["pids"].add(pid)
+
+                if pid not in processus:
+                    processus[pid] = infos_processus(racine_proc, pid)
+
+    return {
+        "fichiers": fichiers,
+        "processus": processus,
+        "analyses": analyses,
+        "inaccessibles": inaccessibles,
+        "partiel": partiel
+    }
+
+
+def _cible(infos):
+    """Clé de redémarrage : unité (préfixée du gestionnaire utilisateur) ou pid"""
+    if not infos["unite"]:
+        return f"pid:{infos['pid']}"
+    if infos["gestionnaire"]:
+        return f"{infos['gestionnaire']}/{infos['unite']}"
+    return infos["unite"]
+
+
+def _mo(octets):
+    return round(octets / (1024 * 1024), 1)
+
+
+def analyser_fichiers_supprimes(echeance=None, racine_proc="/proc"):
+    """
+    Agrège les fichiers supprimés ouverts par processus, par chemin d'origine
+    et par redémarrage (unité systemd, ou processus hors service)
+
+    Un fichier n'est attribué à un redémarrage que si tous les processus qui
+    le gardent ouvert appartiennent à la même unité ; sinon il est "partagé".
+
+    Returns:
+        dict: Résultat sérialisable
+    """
+    debut = time.monotonic()
+    scan = scanner_fd(echeance, racine_proc)
+    fichiers = scan["fichiers"]
+    processus = scan["processus"]
+
+    par_chemin = {}
+    par_processus = {}
+    par_redemarrage = {}
+    partage = 0
+
+    for fichier in fichiers.values():
+        taille = fichier["taille"]
+
+        c = par_chemin.setdefault(fichier["chemin"], {"chemin": fichier["chemin"], "taille": 0, "pids": set()})
+        c["taille"] += taille
+        c["pids"].update(fichier["pids"])
+
+        for pid in fichier["pids"]:
+            p = par_processus.setdefault(pid, dict(processus[pid], taille=0))
+            p["taille"] += taille
+
+        # Unité à redémarrer (ou le processus lui-même s'il n'est pas un service)
+        cibles = {_cible(processus[pid]) for pid in fichier["pids"]}
+        if len(cibles) == 1:
+            cible = cibles.pop()
+            r = par_redemarrage.setdefault(cible, {"cible": cible, "taille": 0, "fichiers": 0, "pids": set()})
+            r["taille"] += taille
+            r["fichiers"] += 1
+            r["pids"].update(fichier["pids"])
+        else:
+            partage += taille
+
+    redemarrages = []
+    for r in sorted(par_redemarrage.values(), key=lambda x: x["taille"], reverse=True)[:LIMITE_LISTES]:
+        # Tous les pids d'une cible partagent la même unité
+        p = processus[next(iter(r["pids"]))]
+        unite = None if r["cible"].startswith("pid:") else p["unite"]
+        if unite is None:
+            commande = None
+        elif p["gestionnaire"]:
+            commande = f"systemctl --user restart {unite}"
+        else:
+            commande = f"systemctl restart {unite}"
+        redemarrages.append({
+            "unite": unite,
+            "gestionnaire": p["gestionnaire"] if unite else None,
+            "processus": sorted({processus[pid]["nom"] for pid in r["pids"]}),
+            "pids": sorted(r["pids"]),
+            "tailleMB": _mo(r["taille"]),
+            "nombreFichiers": r["fichiers"],
+            "commande": commande
+        })
+
+    total = sum(f["taille"] for f in fichiers.values())
+
+    return {
+        "tailleTotaleMB": _mo(total),
+        "nombreFichiers": len(fichiers),
+        "partageMB": _mo(partage),
+        "redemarrages": redemarrages,
+        "parChemin": [
+            {"chemin": c["chemin"], "tailleMB": _mo(c["taille"]), "pids": sorted(c["pids"])}
+            for c in sorted(par_chemin.values(), key=lambda x: x["taille"], reverse=True)[:LIMITE_LISTES]
+        ],
+        "parProcessus": [
+            {"pid": p["pid"], "nom": p["nom"], "unite": p["unite"], "tailleMB": _mo(p["taille"])}
+            for p in sorted(par_processus.values(), key=lambda x: x["taille"], reverse=True)[:LIMITE_LISTES]
+        ],
+        "processusAnalyses": scan["analyses"],
+        "processusInaccessibles": scan["inaccessibles"],
+        "dureeMs": int((time.monotonic() - debut) * 1000),
+        "partiel": scan["partiel"]
+    }
+
+
+if __name__ == "__main__":
+    """Point d'entrée du script"""
+    try:
+        resultat = analyser_fichiers_supprimes()
+        print(json.dumps(resultat, indent=2, ensure_ascii=False))
+        sys.exit(0)
+    except Exception as e:
+        print(json.dumps({"erreur": str(e)}), file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Tuxpilot - Historique des audits de sécurité
+Chaque audit est ajouté (jamais réécrit) dans une base SQLite en mode WAL :
+une ligne par audit et une ligne par vérification. Les requêtes (évolution
+du score, régressions, délais de correction) s'appuient sur des index et
+ne chargent jamais l'historique complet.
+"""
+
+import json
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# À côté de historique.json (actions de l'application)
+BASE_HISTORIQUE = Path.home() / ".tuxpilot" / "historique_audit.db"
+
+
+def ouvrir(chemin=None):
+    """Ouvre (ou crée) la base d'historique"""
+    chemin = Path(chemin or BASE_HISTORIQUE)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(chemin))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS audits (
+            id INTEGER PRIMARY KEY,
+            horodatage REAL NOT NULL,
+            racine TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            duree_ms INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS resultats (
+            audit_id INTEGER NOT NULL REFERENCES audits(id),
+            verification TEXT NOT NULL,
+            reussie INTEGER NOT NULL,
+            niveau TEXT NOT NULL,
+            points INTEGER NOT NULL,
+            points_max INTEGER NOT NULL,
+            details TEXT,
+            PRIMARY KEY (audit_id, verification)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_audits_racine ON audits (racine, id);
+        CREATE INDEX IF NOT EXISTS idx_resultats_verification ON resultats (verification, audit_id);
+    """)
+    return conn
+
+
+def _date(horodatage):
+    return datetime.fromtimestamp(horodatage).isoformat(timespec="seconds")
+
+
+def enregistrer(rapport, chemin=None, horodatage=None):
+    """
+    Ajoute un rapport d'audit à l'historique
+
+    Les vérifications expirées ou non évaluées ne sont pas enregistrées :
+    elles ne disent rien de l'état du système. Un rapport identique au
+    dernier audit de la même racine et du même mode (score et résultats)
+    n'ajoute pas de ligne : les transitions restent datées par le premier
+    audit qui les constate.
+
+    Returns:
+        int: Identifiant de l'audit (celui du précédent si identique)
+    """
+    racine = rapport.get("racine", "/")
+    mode = rapport.get("mode", "standard")
+    resultats = sorted(
+        (v["id"], int(v["reussie"]), v["niveau"], v["points"], v["points_max"], v.get("details"))
+        for v in rapport["verifications"] if not v.get("expiree")
+    )
+    conn = ouvrir(chemin)
+    try:
+        precedent = conn.execute(
+            "SELECT id, score FROM audits WHERE racine = ? AND mode = ? ORDER BY id DESC LIMIT 1",
+            (racine, mode)
+        ).fetchone()
+        if precedent is not None and precedent[1] == rapport["score"]:
+            lignes = conn.execute(
+                "SELECT verification, reussie, niveau, points, points_max, details FROM resultats "
+                "WHERE audit_id = ? ORDER BY verification", (precedent[0],)
+            ).fetchall()
+            if lignes == resultats:
+                return precedent[0]
+        with conn:
+            curseur = conn.execute(
+                "INSERT INTO audits (horodatage, racine, mode, score, duree_ms) VALUES (?, ?, ?, ?, ?)",
+                (horodatage or time.time(), racine, mode, rapport["score"], rapport.get("duree_ms"))
+            )
+            audit_id = curseur.lastrowid
+            conn.executemany(
+                "INSERT INTO resultats (audit_id, verification, reussie, niveau, points, points_max, details) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(audit_id, *r) for r in resultats]
+            )
+        return audit_id
+    finally:
+        conn.close()
+
+
+def evolution_score(racine="/", limite=100, chemin=None):
+    """Scores des derniers audits d'une racine, du plus ancien au plus récent"""
+    conn = ouvrir(chemin)
+    try:
+        lignes = conn.execute(
+            "SELECT id, horodatage, mode, score FROM audits WHERE racine = ? ORDER BY id DESC LIMIT ?",
+            (racine, limite)
+        ).fetchall()
+    finally:
+        conn.close()
+    return [{"audit": i, "date": _date(h), "mode": m, "score": s} for i, h, m, s in reversed(lignes)]
+
+
+def regressions(racine="/", chemin=None):
+    """
+    Vérifications moins bien notées qu'à l'audit précédent (même racine),
+    parmi celles évaluées dans les deux audits
+    """
+    conn = ouvrir(chemin)
+    try:
+        derniers = [i for (i,) in conn.execute(
+            "SELECT id FROM audits WHERE racine = ? ORDER BY id DESC LIMIT 2", (racine,))]
+        if len(derniers) < 2:
+            return {"audit": derniers[0] if derniers else None, "precedent": None, "regressions": []}
+        actuel, precedent = derniers
+        lignes = conn.execute("""
+            SELECT a.verification, p.niveau, a.niveau, p.points, a.points, a.details
+            FROM resultats a
+            JOIN resultats p ON p.audit_id = ? AND p.verification = a.verification
+            WHERE a.audit_id = ? AND (a.points < p.points OR (p.reussie = 1 AND a.reussie = 0))
+            ORDER BY a.points - p.points
+        """, (precedent, actuel)).fetchall()
+    finally:
+        conn.close()
+    return {
+        "audit": actuel,
+        "precedent": precedent,
+        "regressions": [
+            {"verification": v, "niveauAvant": na, "niveau": n, "pointsAvant": pa, "points": p, "details": d}
+            for v, na, n, pa, p, d in lignes
+        ]
+    }
+
+
+def delais_correction(racine="/", verification=None, chemin=None):
+    """
+    Délai de correction de chaque problème : du premier audit en échec
+    jusqu'au premier audit réussi qui suit (problèmes en cours : sans fin)
+    """
+    conn = ouvrir(chemin)
+    try:
+        lignes = conn.execute("""
+            WITH suite AS (
+                SELECT r.verification, r.reussie, a.horodatage,
+                       LAG(r.reussie, 1, 1) OVER (PARTITION BY r.verification ORDER BY r.audit_id) AS avant
+                FROM resultats r JOIN audits a ON a.id = r.audit_id
+                WHERE a.racine = ? AND (? IS NULL OR r.verification = ?)
+            ),
+            transitions AS (
+                SELECT verification, reussie, horodatage,
+                       LEAD(horodatage) OVER (PARTITION BY verification ORDER BY horodatage) AS suivante
+                FROM suite WHERE reussie != avant
+            )
+            SELECT verification, horodatage, suivante FROM transitions
+            WHERE reussie = 0 ORDER BY horodatage
+        """, (racine, verification, verification)).fetchall()
+    finally:
+        conn.close()
+
+    problemes = []
+    for v, debut, fin in lignes:
+        problemes.append({
+            "verification": v,
+            "depuis": _date(debut),
+            "corrige": _date(fin) if fin else None,
+            "delaiHeures": round(((fin or time.time()) - debut) / 3600, 1),
+            "enCours": fin is None
+        })
+    corriges = [p["delaiHeures"] for p in problemes if not p["enCours"]]
+    return {
+        "problemes": problemes,
+        "delaiMoyenHeures": round(sum(corriges) / len(corriges), 1) if corriges else None
+    }
+
+
+if __name__ == "__main__":
+    """Point d'entrée du script : evolution [n] | regressions | corrections [verification]"""
+    try:
+        args = sys.argv[1:]
+        commande = args[0] if args else "evolution"
+        if commande == "evolution":
+            resultat = evolution_score(limite=int(args[1]) if len(args) >= 2 else 100)
+        elif commande == "regressions":
+            resultat = regressions()
+        elif commande == "corrections":
+            resultat = delais_correction(verification=args[1] if len(args) >= 2 else None)
+        else:
+            print(json.dumps({"erreur": f"Commande inconnue : {commande}"}), file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(resultat, indent=2, ensure_ascii=False))
+        sys.exit(0)
+    except Exception as e:
+        print(json.dumps({"erreur": str(e)}), file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Tuxpilot - Index des permissions sensibles (systèmes de fichiers locaux)
+Recense les exécutables SUID/SGID, les fichiers et dossiers accessibles en
+écriture à tous (dossiers sans sticky bit) et les fichiers dont le
+propriétaire n'existe pas. Le parcours (scandir) est réparti sur un pool de
+threads et l'index est conservé dans ~/.tuxpilot/cache/index_permissions.db.
+
+Rescans : un dossier dont le mtime n'a pas changé n'est pas relu, seules
+ses entrées déjà signalées sont revérifiées. Un chmod sur un fichier
+existant ne modifie pas le mtime de son dossier : un parcours complet est
+donc refait tous les PLEIN_SCAN_JOURS jours.
+
+Budget : BUDGET_INDEX_S secondes par parcours (DELAI_VERIFICATION dans
+l'audit). Mesure de référence ("index_permissions.py bench") : racine de
+590 000 entrées / 56 000 dossiers, 4 à 6 s à froid avec les métadonnées en
+cache mémoire (jusqu'à ~35 s sur disque froid), 1,5 s pour un rescan. Si
+le budget est dépassé, l'index est partiel et le parcours suivant reprend
+les dossiers non encore indexés.
+"""
+
+import json
+import os
+import sqlite3
+import stat as stat_mod
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+import mode_impact
+import sondes
+
+CACHE_INDEX = Path.home() / ".tuxpilot" / "cache" / "index_permissions.db"
+
+BUDGET_INDEX_S = 60
+PLEIN_SCAN_JOURS = 7
+
+# Durée pendant laquelle une entrée apparue après la référence reste "nouvelle"
+NOUVEAUTE_JOURS = 7
+
+# scandir/lstat libèrent le GIL : plus de threads que de cœurs
+THREADS_MAX = 32
+
+# Systèmes de fichiers parcourus (tmpfs, vfat, réseau et pseudo-fs exclus)
+FS_LOCAUX = {"ext2", "ext3", "ext4", "xfs", "btrfs", "f2fs", "jfs", "reiserfs", "zfs", "bcachefs", "overlay"}
+
+# Plage des utilisateurs dynamiques de systemd (DynamicUser=)
+UID_DYNAMIQUES = range(61184, 65520)
+
+# Dossiers traités par tâche du pool (limite le coût de synchronisation)
+DOSSIERS_PAR_TACHE = 64
+
+# Nombre d'entrées rapportées par catégorie
+EXEMPLES_MAX = 100
+
+DRAPEAUX = ("suid", "sgid", "ecritureGlobale", "proprietaireInconnu")
+
+
+# ---------------- PARCOURS ----------------
+
+def peripheriques_locaux(racine=sondes.RACINE):
+    """st_dev des systèmes de fichiers locaux montés sous la racine"""
+    devs = set()
+    racine_reelle = os.path.realpath(racine)
+    try:
+        with open("/proc/self/mounts", encoding="utf-8") as f:
+            montages = [ligne.split()[:3] for ligne in f]
+    except OSError:
+        montages = []
+    for _, point, type_fs in montages:
+        point = point.replace("\\040", " ")
+        if type_fs not in FS_LOCAUX:
+            continue
+        if racine_reelle != "/" and point != racine_reelle and not point.startswith(racine_reelle + "/"):
+            continue
+        try:
+            devs.add(os.stat(point).st_dev)
+        except OSError:
+            pass
+    # Arborescence hors montage (image extraite dans un dossier)
+    try:
+        devs.add(os.stat(racine).st_dev)
+    except OSError:
+        pass
+    return devs
+
+
+def proprietaires_connus(racine=sondes.RACINE):
+    """
+    (uids, gids) de /etc/passwd et /etc/group ; (None, None) si les comptes
+    viennent aussi d'une source réseau (sss, ldap...) non lisible ici
+    """
+    if set(sondes._sources_nss("passwd", racine)) - {"files", "systemd", "compat"}:
+        return None, None
+    ids = []
+    for fichier in ("/etc/passwd", "/etc/group"):
+        valeurs = set()
+        for ligne in (sondes.lire_fichier(fichier, racine) or "").splitlines():
+            champs = ligne.split(":")
+            if len(champs) >= 3 and champs[2].isdigit():
+                valeurs.add(int(champs[2]))
+        ids.append(valeurs)
+    if not ids[0]:
+        return None, None
+    return ids[0], ids[1]
+
+
+def analyser_entree(nom, st, uids, gids):
+    """Entrée signalée [nom, type, permissions, uid, gid, drapeaux] ou None"""
+    mode = st.st_mode
+    drapeaux = []
+    if stat_mod.S_ISREG(mode):
+        type_ = "fichier"
+        if mode & stat_mod.S_ISUID:
+            drapeaux.append("suid")
+        if mode & stat_mod.S_ISGID:
+            drapeaux.append("sgid")
+        if mode & stat_mod.S_IWOTH:
+            drapeaux.append("ecritureGlobale")
+    elif stat_mod.S_ISDIR(mode):
+        type_ = "dossier"
+        if mode & stat_mod.S_IWOTH and not mode & stat_mod.S_ISVTX:
+            drapeaux.append("ecritureGlobale")
+    else:
+        return None
+    if uids is not None and (
+        (st.st_uid not in uids and st.st_uid not in UID_DYNAMIQUES)
+        or (st.st_gid not in gids and st.st_gid not in UID_DYNAMIQUES)
+    ):
+        drapeaux.append("proprietaireInconnu")
+    if not drapeaux:
+        return None
+    return [nom, type_, format(stat_mod.S_IMODE(mode), "o"), st.st_uid, st.st_gid, drapeaux]
+
+
+def _scanner_dossier(relatif, precedent, plein_depuis, racine, devs, uids, gids):
+    """
+    Tâche du pool : analyse un dossier, ou réutilise son entrée d'index si
+    son mtime n'a pas changé (et qu'il a déjà été vu pendant le parcours
+    complet en cours)
+
+    Returns:
+        tuple: (relatif, mtime_ns, sous_dossiers, entrees, examinees, rescanne) ou None si illisible
+    """
+    reel = sondes.chemin(relatif, racine)
+    try:
+        st = os.lstat(reel)
+    except OSError:
+        return None
+
+    if (precedent is not None and precedent[0] == st.st_mtime_ns
+            and (plein_depuis is None or precedent[3] >= plein_depuis)):
+        sous_dossiers = precedent[1].split("\0") if precedent[1] else []
+        entrees = []
+        anciennes = json.loads(precedent[2])
+        for ancienne in anciennes:
+            try:
+                entree = analyser_entree(ancienne[0], os.lstat(os.path.join(reel, ancienne[0])), uids, gids)
+            except OSError:
+                continue
+            if entree:
+                entrees.append(entree)
+        return relatif, st.st_mtime_ns, sous_dossiers, entrees, len(anciennes), False
+
+    sous_dossiers, entrees, examinees = [], [], 0
+    try:
+        with os.scandir(reel) as iterateur:
+            for e in iterateur:
+                try:
+                    st_e = e.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                examinees += 1
+                entree = analyser_entree(e.name, st_e, uids, gids)
+                if entree:
+                    entrees.append(entree)
+                if stat_mod.S_ISDIR(st_e.st_mode) and st_e.st_dev in devs:
+                    sous_dossiers.append(e.name)
+    except OSError:
+        return None
+    return relatif, st.st_mtime_ns, sous_dossiers, entrees, examinees, True
+
+
+def _scanner_lot(relatifs, precedents, plein_depuis, racine, devs, uids, gids):
+    """Tâche du pool : plusieurs dossiers -> [(relatif, résultat ou None)]"""
+    return [(r, _scanner_dossier(r, precedents.get(r), plein_depuis, racine, devs, uids, gids)) for r in relatifs]
+
+
+# ---------------- INDEX ----------------
+
+def ouvrir_index(chemin=None):
+    """Ouvre (ou crée) la base SQLite de l'index"""
+    chemin = Path(chemin or CACHE_INDEX)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(chemin))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dossiers (
+            racine TEXT NOT NULL,
+            chemin TEXT NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            sous_dossiers TEXT NOT NULL,
+            entrees TEXT NOT NULL,
+            verifie_le REAL NOT NULL,
+            PRIMARY KEY (racine, chemin)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS etat (
+            racine TEXT PRIMARY KEY,
+            reference INTEGER NOT NULL DEFAULT 0,
+            dernier_plein REAL,
+            plein_depuis REAL
+        )
+    """)
+    return conn
+
+
+def _chemin_enfant(relatif, nom):
+    return relatif.rstrip("/") + "/" + nom
+
+
+def indexer(racine=sondes.RACINE, echeance=None, chemin_index=None, threads=None):
+    """
+    Met à jour l'index des permissions sensibles d'une racine
+
+    Les entrées signalées apparues (ou avec un nouveau drapeau) depuis le
+    premier parcours complet, qui sert de référence, sont rapportées dans
+    "nouvelles" pendant NOUVEAUTE_JOURS jours.
+
+    Args:
+        echeance: Limite time.monotonic() (défaut : maintenant + BUDGET_INDEX_S)
+        chemin_index: Base de l'index (défaut : ~/.tuxpilot/cache/index_permissions.db)
+
+    Returns:
+        dict: Entrées par drapeau, nouvelles entrées, statistiques
+    """
+    debut = time.monotonic()
+    echeance = debut + BUDGET_INDEX_S if echeance is None else echeance
+    maintenant = time.time()
+    devs = peripheriques_locaux(racine)
+    uids, gids = proprietaires_connus(racine)
+
+    conn = ouvrir_index(chemin_index)
+    try:
+        etat = conn.execute("SELECT reference, dernier_plein, plein_depuis FROM etat WHERE racine = ?",
+                            (racine,)).fetchone() or (0, None, None)
+        reference, dernier_plein, plein_depuis = etat
+        if plein_depuis is None and (not reference or dernier_plein is None
+                                     or maintenant - dernier_plein > PLEIN_SCAN_JOURS * 86400):
+            plein_depuis = maintenant
+
+        precedents = {
+            chemin: (mtime, sous, entrees, verifie_le)
+            for chemin, mtime, sous, entrees, verifie_le in conn.execute(
+                "SELECT chemin, mtime_ns, sous_dossiers, entrees, verifie_le FROM dossiers WHERE racine = ?",
+                (racine,))
+        }
+
+        visites = {}
+        stats = {"dossiers": 0, "dossiersRescannes": 0, "dossiersIllisibles": 0, "entreesExaminees": 0}
+        complet = True
+        threads = threads or min(THREADS_MAX, (os.cpu_count() or 1) * 4)
+        pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="index")
+        a_scanner = ["/"]
+        en_cours = set()
+        try:
+            while a_scanner or en_cours:
+                # Lots plus petits tant que la file est courte (parallélisme au démarrage)
+                taille_lot = max(1, min(DOSSIERS_PAR_TACHE, len(a_scanner) // threads))
+                while a_scanner and len(en_cours) < threads * 2:
+                    lot = a_scanner[-taille_lot:]
+                    del a_scanner[-taille_lot:]
+                    en_cours.add(pool.submit(_scanner_lot, lot, precedents, plein_depuis, racine, devs, uids, gids))
+
+                mode_impact.ralentir(echeance)
+                restant = echeance - time.monotonic()
+                if restant <= 0:
+                    complet = False
+                    break
+                termines, en_cours = wait(en_cours, timeout=restant, return_when=FIRST_COMPLETED)
+                for future in termines:
+                    for relatif, resultat in future.result():
+                        if resultat is None:
+                            stats["dossiersIllisibles"] += 1
+                            continue
+                        _, mtime, sous_dossiers, entrees, examinees, rescanne = resultat
+                        visites[relatif] = (mtime, sous_dossiers, entrees, rescanne)
+                        stats["dossiers"] += 1
+                        stats["dossiersRescannes"] += rescanne
+                        stats["entreesExaminees"] += examinees
+                        a_scanner.extend(_chemin_enfant(relatif, nom) for nom in sous_dossiers)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        # Première apparition de chaque entrée signalée (0 = présente dès la référence)
+        horodatage = maintenant if reference else 0
+        limite_nouveaute = maintenant - NOUVEAUTE_JOURS * 86400
+        signalees = {d: [] for d in DRAPEAUX}
+        nouvelles = []
+        for relatif, (mtime, sous_dossiers, entrees, rescanne) in visites.items():
+            precedent = precedents.get(relatif)
+            connues = {e[0]: e for e in json.loads(precedent[2])} if precedent else {}
+            for e in entrees:
+                ancienne = connues.get(e[0])
+                if ancienne is not None and len(ancienne) > 6 and set(e[5]) <= set(ancienne[5]):
+                    e.append(ancienne[6])
+                else:
+                    e.append(horodatage)
+                chemin = _chemin_enfant(relatif, e[0])
+                fiche = {"chemin": chemin, "type": e[1], "mode": e[2], "uid": e[3], "gid": e[4], "drapeaux": e[5],
+                         "premierVu": datetime.fromtimestamp(e[6]).isoformat(timespec="seconds") if e[6] else None}
+                for d in e[5]:
+                    signalees[d].append(fiche)
+                if e[6] and e[6] >= limite_nouveaute:
+                    nouvelles.append(fiche)
+            entrees_json = json.dumps(entrees)
+            if rescanne or precedent is None or precedent[2] != entrees_json:
+                conn.execute(
+                    "INSERT OR REPLACE INTO dossiers (racine, chemin, mtime_ns, sous_dossiers, entrees, verifie_le) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (racine, relatif, mtime, "\0".join(sous_dossiers), entrees_json,
+                     maintenant if rescanne else precedent[3])
+                )
+
+        if complet:
+            # Dossiers disparus
+            disparus = [(racine, c) for c in precedents if c not in visites]
+            conn.executemany("DELETE FROM dossiers WHERE racine = ? AND chemin = ?", disparus)
+            conn.execute("INSERT OR REPLACE INTO etat (racine, reference, dernier_plein, plein_depuis) "
+                         "VALUES (?, 1, ?, NULL)", (racine, plein_depuis or dernier_plein))
+        else:
+            conn.execute("INSERT OR REPLACE INTO etat (racine, reference, dernier_plein, plein_depuis) "
+                         "VALUES (?, ?, ?, ?)", (racine, reference, dernier_plein, plein_depuis))
+        conn.commit()
+    finally:
+        conn.close()
+
+    for liste in signalees.values():
+        liste.sort(key=lambda f: f["chemin"])
+    nouvelles.sort(key=lambda f: f["chemin"])
+    return {
+        "racine": racine,
+        "complet": complet,
+        "reference": bool(reference),
+        "parcoursComplet": plein_depuis is not None,
+        "proprietairesVerifies": uids is not None,
+        "entrees": {d: liste[:EXEMPLES_MAX] for d, liste in signalees.items()},
+        "nombres": {d: len(liste) for d, liste in signalees.items()},
+        "nouvelles": nouvelles[:EXEMPLES_MAX],
+        "nombreNouvelles": len(nouvelles),
+        "statistiques": stats,
+        "budgetMs": int((echeance - debut) * 1000),
+        "dureeMs": int((time.monotonic() - debut) * 1000)
+    }
+
+
+# ---------------- BENCHMARK ----------------
+
+def benchmark(racine=sondes.RACINE, budget=BUDGET_INDEX_S):
+    """Mesure un parcours à froid (index vide) puis un rescan"""
+    with tempfile.TemporaryDirectory(prefix="tuxpilot-index-") as dossier:
+        index = os.path.join(dossier, "index.db")
+        mesures = {}
+        for passe in ("froid", "chaud"):
+            resultat = indexer(racine, echeance=time.monotonic() + budget, chemin_index=index)
+            stats = resultat["statistiques"]
+            duree = resultat["dureeMs"] / 1000
+            mesures[passe] = {
+                "dureeMs": resultat["dureeMs"],
+                "complet": resultat["complet"],
+                "dossiers": stats["dossiers"],
+                "dossiersRescannes": stats["dossiersRescannes"],
+                "entreesExaminees": stats["entreesExaminees"],
+                "entreesParSeconde": int(stats["entreesExaminees"] / duree) if duree else 0
+            }
+        return {"racine": racine, "budgetMs": budget * 1000, "threads": min(THREADS_MAX, (os.cpu_count() or 1) * 4),
+                "passes": mesures}
+
+
+if __name__ == "__main__":
+    """Point d'entrée du script"""
+    try:
+        args = sys.argv[1:]
+        mode_impact.appliquer(mode_impact.lire_mode(args))
+        args = mode_impact.retirer_option(args)
+        if args and args[0] == "bench":
+            resultat = benchmark(args[1] if len(args) >= 2 else sondes.RACINE)
+        else:
+            resultat = indexer(args[0] if args else sondes.RACINE)
+
+        print(json.dumps(resultat, indent=2, ensure_ascii=False))
+        sys.exit(0)
+    except Exception as e:
+        print(json.dumps({"erreur": str(e)}), file=sys.stderr)
+        sys.exit(1)
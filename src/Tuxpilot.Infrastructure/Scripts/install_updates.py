@@ -10,6 +10,8 @@ import sys
 import os
 from datetime import datetime
 
+import mode_impact
+
 def log_message(message, type="info"):
     """Envoie un message de log au format JSON sur stdout"""
     log = {
@@ -194,6 +196,11 @@ def main():
 
         log_message(f"🔧 Gestionnaire détecté : {manager}", "info")
 
+        # Priorité réduite héritée par pkexec et le gestionnaire de paquets
+        impact = mode_impact.appliquer(mode_impact.lire_mode())
+        if impact["mode"] != "normal":
+            log_message(f"🐢 Mode d'impact : {impact['mode']}", "info")
+
         # Lancer l'installation selon le gestionnaire
         if manager == 'dnf5':
             success = install_with_dnf5()
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Tuxpilot - Intégrité des fichiers installés par les paquets
+Compare le contenu des fichiers aux empreintes des manifestes : base rpm
+(rpmdb.sqlite, en-têtes lus directement) ou /var/lib/dpkg/info/*.md5sums
+et conffiles de /var/lib/dpkg/status. Le hachage passe par empreintes.py
+(mmap, pool de processus) et son cache (dev, inode, mtime, taille) : une
+nouvelle vérification ne relit que les fichiers modifiés depuis.
+"""
+
+import json
+import os
+import sqlite3
+import stat as stat_mod
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+import empreintes
+import mode_impact
+import sondes
+
+# Volume haché entre deux contrôles de l'échéance (et écritures du cache)
+OCTETS_PAR_LOT = 256 * 1024 * 1024
+FICHIERS_PAR_LOT = 4000
+
+# Nombre d'exemples rapportés par catégorie
+EXEMPLES_MAX = 50
+
+# En-têtes rpm (rpmtag.h)
+RPMTAG_NAME = 1000
+RPMTAG_FILEMODES = 1030
+RPMTAG_FILEDIGESTS = 1035
+RPMTAG_FILEFLAGS = 1037
+RPMTAG_FILEVERIFYFLAGS = 1045
+RPMTAG_DIRINDEXES = 1116
+RPMTAG_BASENAMES = 1117
+RPMTAG_DIRNAMES = 1118
+RPMTAG_FILEDIGESTALGO = 5011
+RPMFILE_CONFIG = 1 << 0
+RPMFILE_DOC = 1 << 1
+RPMFILE_GHOST = 1 << 6
+RPMFILE_LICENSE = 1 << 7
+RPMFILE_README = 1 << 8
+# Bit RPMVERIFY_FILEDIGEST : absent (%verify(not md5) ...), rpm -V ne compare pas le contenu
+RPMVERIFY_FILEDIGEST = 1 << 0
+
+# Catégories des fichiers modifiés (seuls les binaires signalent un problème)
+CATEGORIES = ("binaires", "configuration", "documentation", "licences")
+
+# Algorithmes d'empreinte rpm (PGPHASHALGO_*) -> hashlib
+ALGORITHMES_RPM = {1: "md5", 2: "sha1", 8: "sha256", 9: "sha384", 10: "sha512", 11: "sha224"}
+
+
+# ---------------- MANIFESTES ----------------
+
+def _lire_entete_rpm(blob):
+    """
+    Décode les étiquettes utiles d'un en-tête rpm (format de rpmdb.sqlite :
+    nombre d'entrées, taille des données, index de 16 octets, données)
+    """
+    nombre, _ = struct.unpack_from(">ii", blob, 0)
+    donnees = 8 + nombre * 16
+    utiles = {RPMTAG_NAME, RPMTAG_FILEMODES, RPMTAG_FILEDIGESTS, RPMTAG_FILEFLAGS, RPMTAG_FILEVERIFYFLAGS,
+              RPMTAG_DIRINDEXES, RPMTAG_BASENAMES, RPMTAG_DIRNAMES, RPMTAG_FILEDIGESTALGO}
+    valeurs = {}
+    for i in range(nombre):
+        tag, type_, decalage, compte = struct.unpack_from(">iiii", blob, 8 + i * 16)
+        if tag not in utiles:
+            continue
+        position = donnees + decalage
+        if type_ == 3:
+            valeurs[tag] = struct.unpack_from(f">{compte}H", blob, position)
+        elif type_ == 4:
+            valeurs[tag] = struct.unpack_from(f">{compte}I", blob, position)
+        elif type_ in (6, 8, 9):
+            chaines = []
+            for _ in range(compte if type_ == 8 else 1):
+                fin = blob.index(b"\0", position)
+                chaines.append(blob[position:fin].decode("utf-8", "replace"))
+                position = fin + 1
+            valeurs[tag] = chaines if type_ == 8 else chaines[0]
+    return valeurs
+
+
+def _categorie_rpm(flags):
+    """Catégorie d'un fichier rpm d'après RPMTAG_FILEFLAGS (%config, %doc, %license)"""
+    if flags & RPMFILE_CONFIG:
+        return "configuration"
+    if flags & RPMFILE_LICENSE:
+        return "licences"
+    if flags & (RPMFILE_DOC | RPMFILE_README):
+        return "documentation"
+    return "binaires"
+
+
+def _a_verifier_rpm(flags, verification):
+    """Fichier dont rpm -V compare le contenu (ni %ghost, ni %verify(not md5))"""
+    return not flags & RPMFILE_GHOST and bool(verification & RPMVERIFY_FILEDIGEST)
+
+
+def _fichiers_entete_rpm(valeurs):
+    """Fichiers réguliers d'un paquet : (chemin, algorithme, empreinte, catégorie, paquet)"""
+    paquet = valeurs.get(RPMTAG_NAME, "?")
+    noms = valeurs.get(RPMTAG_BASENAMES, [])
+    dossiers = valeurs.get(RPMTAG_DIRNAMES, [])
+    index = valeurs.get(RPMTAG_DIRINDEXES, [])
+    digests = valeurs.get(RPMTAG_FILEDIGESTS, [])
+    modes = valeurs.get(RPMTAG_FILEMODES, [])
+    drapeaux = valeurs.get(RPMTAG_FILEFLAGS, [])
+    verifications = valeurs.get(RPMTAG_FILEVERIFYFLAGS, [])
+    algorithme = ALGORITHMES_RPM.get((valeurs.get(RPMTAG_FILEDIGESTALGO) or [1])[0])
+    if algorithme is None:
+        return
+    for i, nom in enumerate(noms):
+        if i >= len(digests) or not digests[i] or i >= len(index):
+            continue
+        if i < len(modes) and not stat_mod.S_ISREG(modes[i]):
+            continue
+        flags = drapeaux[i] if i < len(drapeaux) else 0
+        # Étiquette absente : tout est vérifié (comportement par défaut de rpm)
+        verification = verifications[i] if i < len(verifications) else ~0
+        if not _a_verifier_rpm(flags, verification):
+            continue
+        yield dossiers[index[i]] + nom, algorithme, digests[i], _categorie_rpm(flags), paquet
+
+
+def manifeste_rpm(racine=sondes.RACINE):
+    """
+    Fichiers de la base rpm : lecture directe de rpmdb.sqlite, sinon
+    requête rpm (bases BerkeleyDB/ndb, système courant uniquement)
+
+    Returns:
+        list | None: [(chemin, algorithme, empreinte, catégorie, paquet)], None sans base rpm
+    """
+    base = sondes.chemin("/var/lib/rpm/rpmdb.sqlite", racine)
+    if os.path.exists(base):
+        fichiers = []
+        try:
+            conn = sqlite3.connect(f"file:{base}?mode=ro", uri=True)
+            try:
+                for (blob,) in conn.execute("SELECT blob FROM Packages"):
+                    try:
+                        fichiers.extend(_fichiers_entete_rpm(_lire_entete_rpm(bytes(blob))))
+                    except (struct.error, ValueError, IndexError):
+                        continue
+            finally:
+                conn.close()
+            return fichiers
+        except sqlite3.Error:
+            pass
+
+    if racine != "/" or not os.path.isdir("/var/lib/rpm"):
+        return None
+    format_ = ("[%{FILENAMES}\\t%{FILEDIGESTS}\\t%{FILEFLAGS}\\t%{FILEVERIFYFLAGS}\\t%{FILEMODES}"
+               "\\t%{=FILEDIGESTALGO}\\t%{=NAME}\\n]")
+    try:
+        r = subprocess.run(["rpm", "-qa", "--qf", format_], capture_output=True, text=True, timeout=120)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if r.returncode != 0:
+        return None
+    fichiers = []
+    for ligne in r.stdout.splitlines():
+        champs = ligne.split("\t")
+        if len(champs) != 7 or not champs[1]:
+            continue
+        try:
+            flags, verification, mode = int(champs[2]), int(champs[3]), int(champs[4])
+            algorithme = ALGORITHMES_RPM.get(int(champs[5]) if champs[5].isdigit() else 1)
+        except ValueError:
+            continue
+        if algorithme and stat_mod.S_ISREG(mode) and _a_verifier_rpm(flags, verification):
+            fichiers.append((champs[0], algorithme, champs[1], _categorie_rpm(flags), champs[6]))
+    return fichiers
+
+
+def _detournements_dpkg(racine):
+    """Chemins détournés par dpkg-divert (original et destination) : non vérifiables"""
+    contenu = sondes.lire_fichier("/var/lib/dpkg/diversions", racine) or ""
+    lignes = contenu.splitlines()
+    detournes = set()
+    for i in range(0, len(lignes) - 2, 3):
+        detournes.update((lignes[i], lignes[i + 1]))
+    return detournes
+
+
+def _categorie_dpkg(chemin):
+    """Catégorie d'un fichier dpkg livré (hors conffiles) : dpkg n'a pas d'équivalent de %doc"""
+    if chemin.startswith("/usr/share/doc/"):
+        return "licences" if os.path.basename(chemin) == "copyright" else "documentation"
+    if chemin.startswith(("/usr/share/man/", "/usr/share/info/")):
+        return "documentation"
+    return "binaires"
+
+
+def manifeste_dpkg(racine=sondes.RACINE):
+    """
+    Fichiers des paquets dpkg : *.md5sums (fichiers livrés) et champ
+    Conffiles de status (fichiers de configuration)
+
+    Returns:
+        list | None: [(chemin, "md5", empreinte, catégorie, paquet)], None sans base dpkg
+    """
+    statut = sondes.lire_fichier("/var/lib/dpkg/status", racine, limite=256 * 1024 * 1024)
+    if statut is None:
+        return None
+
+    fichiers = []
+    vus = _detournements_dpkg(racine)
+    for bloc in statut.split("\n\n"):
+        paquet, installe, dans_conffiles = None, False, False
+        conffiles = []
+        for ligne in bloc.splitlines():
+            if ligne.startswith("Package: "):
+                paquet = ligne[len("Package: "):]
+            elif ligne.startswith("Status:"):
+                installe = ligne.endswith(" installed")
+            elif ligne.startswith("Conffiles:"):
+                dans_conffiles = True
+            elif dans_conffiles and ligne.startswith(" "):
+                champs = ligne.split()
+                # "obsolete" / "remove-on-upgrade" : fichier plus livré par le paquet
+                if len(champs) == 2 and champs[1] != "newconffile":
+                    conffiles.append((champs[0], champs[1]))
+            else:
+                dans_conffiles = False
+        if installe:
+            for chemin, empreinte in conffiles:
+                if chemin not in vus:
+                    vus.add(chemin)
+                    fichiers.append((chemin, "md5", empreinte, "configuration", paquet))
+
+    dossier = sondes.chemin("/var/lib/dpkg/info", racine)
+    try:
+        sommes = sorted(e.name for e in os.scandir(dossier) if e.name.endswith(".md5sums"))
+    except OSError:
+        sommes = []
+    for nom in sommes:
+        paquet = nom[:-len(".md5sums")].split(":")[0]
+        try:
+            with open(os.path.join(dossier, nom), encoding="utf-8", errors="replace") as f:
+                for ligne in f:
+                    empreinte, _, relatif = ligne.rstrip("\n").partition("  ")
+                    chemin = "/" + relatif
+                    if relatif and chemin not in vus:
+                        vus.add(chemin)
+                        fichiers.append((chemin, "md5", empreinte, _categorie_dpkg(chemin), paquet))
+        except OSError:
+            continue
+    return fichiers
+
+
+def charger_manifeste(racine=sondes.RACINE):
+    """
+    Returns:
+        tuple: (gestionnaire, fichiers) - (None, []) si aucune base lisible
+    """
+    fichiers = manifeste_rpm(racine)
+    if fichiers is not None:
+        return "rpm", fichiers
+    fichiers = manifeste_dpkg(racine)
+    if fichiers is not None:
+        return "dpkg", fichiers
+    return None, []
+
+
+# ---------------- VÉRIFICATION ----------------
+
+def _lots(taches, tailles):
+    """Découpe les tâches en lots bornés en octets et en nombre"""
+    lot, octets = [], 0
+    for tache in taches:
+        lot.append(tache)
+        octets += tailles[tache[0]]
+        if octets >= OCTETS_PAR_LOT or len(lot) >= FICHIERS_PAR_LOT:
+            yield lot
+            lot, octets = [], 0
+    if lot:
+        yield lot
+
+
+def verifier_integrite(racine=sondes.RACINE, echeance=None, chemin_cache=None, processus=None):
+    """
+    Vérifie les fichiers installés contre les empreintes des paquets
+
+    Seuls les fichiers absents du cache (ou modifiés depuis) sont hachés,
+    par lots, sur tous les cœurs. Si l'échéance est atteinte, le résultat
+    est partiel ("complet": False) mais les empreintes calculées restent en
+    cache : la vérification suivante reprend là où celle-ci s'est arrêtée.
+
+    Args:
+        echeance: Limite time.monotonic() (None = pas de limite)
+        chemin_cache: Base d'empreintes (défaut : ~/.tuxpilot/cache/empreintes.db)
+
+    Returns:
+        dict: Fichiers modifiés par catégorie (CATEGORIES), statistiques, débit
+    """
+    debut = time.monotonic()
+    gestionnaire, manifeste = charger_manifeste(racine)
+    stats = {"depuisCache": 0, "haches": 0, "octetsHaches": 0, "manquants": 0, "illisibles": 0}
+    modifies = {categorie: [] for categorie in CATEGORIES}
+    attendus, tailles, a_hacher = {}, {}, {}
+
+    conn = empreintes.ouvrir_cache(chemin_cache)
+    pool = None
+    try:
+        # 1. Fichiers inchangés depuis la dernière vérification : empreinte en cache
+        for i, (chemin, algorithme, empreinte, categorie, paquet) in enumerate(manifeste):
+            mode_impact.ralentir(echeance)
+            try:
+                st = os.lstat(sondes.chemin(chemin, racine))
+            except OSError:
+                stats["manquants"] += 1
+                continue
+            if not stat_mod.S_ISREG(st.st_mode):
+                continue
+            _, complete = empreintes.lire_cache(conn, st, algorithme)
+            attendus[i] = st
+            if complete is not None:
+                stats["depuisCache"] += 1
+                if complete != empreinte.lower():
+                    modifies[categorie].append({"chemin": chemin, "paquet": paquet})
+            else:
+                tailles[i] = st.st_size
+                a_hacher.setdefault(algorithme, []).append((i, sondes.chemin(chemin, racine)))
+
+        # 2. Hachage parallèle du reste, par lots (échéance contrôlée entre deux lots)
+        debut_hachage = time.monotonic()
+        complet = True
+        if sum(len(t) for t in a_hacher.values()) > 1:
+            pool = empreintes.creer_pool(processus)
+        for algorithme, taches in a_hacher.items():
+            for lot in _lots(taches, tailles):
+                if echeance is not None and time.monotonic() >= echeance:
+                    complet = False
+                    break
+                for i, complete in empreintes.hacher_en_parallele(lot, algorithme, processus, pool):
+                    chemin, _, empreinte, categorie, paquet = manifeste[i]
+                    if complete is None:
+                        stats["illisibles"] += 1
+                        continue
+                    stats["haches"] += 1
+                    stats["octetsHaches"] += tailles[i]
+                    empreintes.ecrire_cache(conn, attendus[i], complete=complete, algorithme=algorithme)
+                    if complete != empreinte.lower():
+                        modifies[categorie].append({"chemin": chemin, "paquet": paquet})
+                conn.commit()
+            if not complet:
+                break
+        duree_hachage = time.monotonic() - debut_hachage
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        conn.commit()
+        conn.close()
+
+    for liste in modifies.values():
+        liste.sort(key=lambda m: m["chemin"])
+    verifies = stats["depuisCache"] + stats["haches"]
+    return {
+        "gestionnaire": gestionnaire,
+        "fichiers": len(manifeste),
+        "verifies": verifies,
+        "complet": complet and verifies + stats["illisibles"] == len(attendus),
+        "modifies": {cle: liste[:EXEMPLES_MAX] for cle, liste in modifies.items()},
+        "nombreModifies": {cle: len(liste) for cle, liste in modifies.items()},
+        "statistiques": stats,
+        "debitGoS": round(stats["octetsHaches"] / 1e9 / duree_hachage, 2) if duree_hachage > 0 else 0,
+        "dureeMs": int((time.monotonic() - debut) * 1000)
+    }
+
+
+# ---------------- BENCHMARK ----------------
+
+def benchmark(racine=sondes.RACINE, limite=None):
+    """
+    Mesure une vérification à froid (cache d'empreintes vide) puis à chaud
+
+    Le cache de pages du noyau n'est pas vidé : le débit à froid mesure le
+    hachage, pas le disque, dès que les fichiers ont été lus récemment.
+    """
+    with tempfile.TemporaryDirectory(prefix="tuxpilot-integrite-") as dossier:
+        cache = os.path.join(dossier, "empreintes.db")
+        mesures = {}
+        for passe in ("froid", "chaud"):
+            echeance = time.monotonic() + limite if limite else None
+            resultat = verifier_integrite(racine, echeance=echeance, chemin_cache=cache)
+            stats = resultat["statistiques"]
+            mesures[passe] = {
+                "dureeMs": resultat["dureeMs"],
+                "verifies": resultat["verifies"],
+                "haches": stats["haches"],
+                "depuisCache": stats["depuisCache"],
+                "octetsHaches": stats["octetsHaches"],
+                "debitGoS": resultat["debitGoS"]
+            }
+
+        return {
+            "gestionnaire": resultat["gestionnaire"],
+            "fichiers": resultat["fichiers"],
+            "processus": os.cpu_count(),
+            "passes": mesures
+        }
+
+
+if __name__ == "__main__":
+    """Point d'entrée du script"""
+    try:
+        args = sys.argv[1:]
+        mode_impact.appliquer(mode_impact.lire_mode(args))
+        args = mode_impact.retirer_option(args)
+        if args and args[0] == "bench":
+            # bench [secondes] : durée maximale de chaque passe
+            resultat = benchmark(limite=float(args[1]) if len(args) >= 2 else None)
+        else:
+            racine = args[0] if args else sondes.RACINE
+            resultat = verifier_integrite(racine)
+            if resultat["gestionnaire"] is None:
+                print(json.dumps({"erreur": "Aucune base de paquets lisible"}), file=sys.stderr)
+                sys.exit(1)
+
+        print(json.dumps(resultat, indent=2, ensure_ascii=False))
+        sys.exit(0)
+    except Exception as e:
+        print(json.dumps({"erreur": str(e)}), file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Tuxpilot - Mode d'impact (priorité CPU / E/S des analyses et maintenances)
+Les scripts abaissent leur propre priorité (nice, SCHED_IDLE, classe d'E/S
+idle via ioprio_set) ; les processus enfants en héritent. Les parcours de
+fichiers consultent aussi la pression système (PSI) et font une pause quand
+la machine est chargée, pour finir pendant les temps morts.
+
+Modes :
+    normal  : aucune modification
+    reduit  : nice 10, E/S best-effort priorité 7
+    inactif : nice 19, SCHED_IDLE, classe d'E/S idle
+"""
+
+import ctypes
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+MODES = ("normal", "reduit", "inactif")
+MODE_DEFAUT = "normal"
+
+# Réglage persistant (même emplacement que theme.json de l'application)
+FICHIER_CONFIG = Path.home() / ".tuxpilot" / "impact.json"
+
+# Poids des scopes systemd transitoires par mode (défaut systemd : 100)
+POIDS_SCOPE = {"reduit": 20, "inactif": 1}
+
+# ioprio_set(2)
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_BE = 2
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+SYSCALL_IOPRIO_SET = {
+    "x86_64": 251,
+    "i686": 289,
+    "i386": 289,
+    "aarch64": 30,
+    "riscv64": 30,
+    "armv7l": 314,
+    "ppc64le": 273,
+    "s390x": 282,
+}
+
+# Seuils PSI (avg10, en %) au-delà desquels les parcours font une pause
+SEUIL_PSI_IO = 20.0
+SEUIL_PSI_CPU = 40.0
+PAUSE_PSI = 0.2
+ATTENTE_PSI_MAX = 5.0
+INTERVALLE_VERIFICATION_PSI = 0.1
+
+_mode_actif = MODE_DEFAUT
+_derniere_verification = 0.0
+
+
+def lire_mode(args=None):
+    """
+    Mode demandé : option --impact, puis TUXPILOT_IMPACT, puis ~/.tuxpilot/impact.json
+    """
+    args = sys.argv[1:] if args is None else args
+    mode = None
+    for i, arg in enumerate(args):
+        if arg.startswith("--impact="):
+            mode = arg.split("=", 1)[1]
+        elif arg == "--impact" and i + 1 < len(args):
+            mode = args[i + 1]
+
+    if mode is None:
+        mode = os.environ.get("TUXPILOT_IMPACT")
+
+    if mode is None:
+        try:
+            with open(FICHIER_CONFIG, encoding="utf-8") as f:
+                mode = json.load(f).get("Mode")
+        except (OSError, ValueError, AttributeError):
+            mode = None
+
+    return mode if mode in MODES else MODE_DEFAUT
+
+
+def enregistrer_mode(mode, chemin=None):
+    """Mémorise le mode dans ~/.tuxpilot/impact.json (même format que l'application)"""
+    if mode not in MODES:
+        raise ValueError(f"Mode inconnu : {mode} (attendu : {', '.join(MODES)})")
+    chemin = Path(chemin or FICHIER_CONFIG)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    temporaire = chemin.with_suffix(".tmp")
+    with open(temporaire, "w", encoding="utf-8") as f:
+        json.dump({"Mode": mode}, f, indent=2)
+    os.replace(temporaire, chemin)
+    return mode
+
+
+def retirer_option(args):
+    """Arguments sans --impact <mode> / --impact=<mode> (pour les positionnels)"""
+    restants = []
+    ignorer = False
+    for arg in args:
+        if ignorer:
+            ignorer = False
+        elif arg == "--impact":
+            ignorer = True
+        elif not arg.startswith("--impact="):
+            restants.append(arg)
+    return restants
+
+
+def _ioprio_set(classe, niveau):
+    """ioprio_set(IOPRIO_WHO_PROCESS, 0, ...) par appel système direct"""
+    numero = SYSCALL_IOPRIO_SET.get(platform.machine())
+    if numero is None:
+        return False
+    libc = ctypes.CDLL(None, use_errno=True)
+    valeur = (classe << IOPRIO_CLASS_SHIFT) | niveau
+    return libc.syscall(numero, IOPRIO_WHO_PROCESS, 0, valeur) == 0
+
+
+def appliquer(mode):
+    """
+    Abaisse la priorité du processus courant (héritée par les enfants)
+
+    Returns:
+        dict: Réglages effectivement appliqués
+    """
+    global _mode_actif
+    _mode_actif = mode if mode in MODES else MODE_DEFAUT
+    applique = {"mode": _mode_actif, "nice": None, "schedIdle": False, "ioprio": None}
+    if _mode_actif == "normal":
+        return applique
+
+    cible_nice = 19 if _mode_actif == "inactif" else 10
+    try:
+        actuel = os.getpriority(os.PRIO_PROCESS, 0)
+        if actuel < cible_nice:
+            os.setpriority(os.PRIO_PROCESS, 0, cible_nice)
+        applique["nice"] = os.getpriority(os.PRIO_PROCESS, 0)
+    except OSError:
+        pass
+
+    if _mode_actif == "inactif":
+        try:
+            os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+            applique["schedIdle"] = True
+        except (OSError, AttributeError):
+            pass
+
+    classe, niveau = (IOPRIO_CLASS_IDLE, 0) if _mode_actif == "inactif" else (IOPRIO_CLASS_BE, 7)
+    try:
+        if _ioprio_set(classe, niveau):
+            applique["ioprio"] = "idle" if classe == IOPRIO_CLASS_IDLE else "be/7"
+    except OSError:
+        pass
+
+    if applique["ioprio"] is None:
+        # Repli sur ionice si l'appel système n'est pas disponible
+        options = ["-c", "3"] if classe == IOPRIO_CLASS_IDLE else ["-c", "2", "-n", "7"]
+        try:
+            r = subprocess.run(["ionice", *options, "-p", str(os.getpid())],
+                               capture_output=True, timeout=5)
+            if r.returncode == 0:
+                applique["ioprio"] = "idle" if classe == IOPRIO_CLASS_IDLE else "be/7"
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+    return applique
+
+
+def mode_actif():
+    """Mode appliqué au processus courant (transmis aux scripts root)"""
+    return _mode_actif
+
+
+def commande_scope(cmd, mode=None, utilisateur=True):
+    """
+    Préfixe une commande pour l'exécuter dans un scope systemd transitoire
+    avec CPUWeight/IOWeight réduits (alternative quand la priorité du
+    processus ne suffit pas, ex. démon qui réinitialise sa priorité)
+
+    La commande est renvoyée telle quelle en mode normal, sans systemd, ou
+    sans bus de session utilisateur (scope --user impossible).
+    """
+    mode = _mode_actif if mode is None else mode
+    poids = POIDS_SCOPE.get(mode)
+    if poids is None or not os.path.exists("/run/systemd/system") or not shutil.which("systemd-run"):
+        return list(cmd)
+    if utilisateur:
+        runtime = os.environ.get("XDG_RUNTIME_DIR")
+        if not runtime or not os.path.exists(os.path.join(runtime, "bus")):
+            return list(cmd)
+    prefixe = ["systemd-run", "--scope", "--quiet", "--collect",
+               "-p", f"CPUWeight={poids}", "-p", f"IOWeight={poids}"]
+    if utilisateur:
+        prefixe.insert(1, "--user")
+    return prefixe + list(cmd)
+
+
+def lire_pression(ressource):
+    """Valeur "some avg10" de /proc/pressure/<ressource> (None si PSI absent)"""
+    try:
+        with open(f"/proc/pressure/{ressource}", encoding="utf-8") as f:
+            for ligne in f:
+                if ligne.startswith("some "):
+                    for champ in ligne.split():
+                        if champ.startswith("avg10="):
+                            return float(champ[len("avg10="):])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def ralentir(echeance=None):
+    """
+    Pause tant que la pression E/S ou CPU dépasse les seuils
+
+    À appeler régulièrement dans les boucles de parcours : sans effet en
+    mode normal, et PSI n'est relu qu'au plus toutes les 100 ms. La pause
+    ne dépasse ni ATTENTE_PSI_MAX ni l'échéance éventuelle.
+
+    Returns:
+        float: Secondes passées en pause
+    """
+    global _derniere_verification
+    if _mode_actif == "normal":
+        return 0.0
+
+    maintenant = time.monotonic()
+    if maintenant - _derniere_verification < INTERVALLE_VERIFICATION_PSI:
+        return 0.0
+    _derniere_verification = maintenant
+
+    limite = maintenant + ATTENTE_PSI_MAX
+    if echeance is not None:
+        limite = min(limite, echeance)
+
+    attente = 0.0
+    while time.monotonic() < limite:
+        io = lire_pression("io")
+        cpu = lire_pression("cpu")
+        if (io is None or io < SEUIL_PSI_IO) and (cpu is None or cpu < SEUIL_PSI_CPU):
+            break
+        pause = min(PAUSE_PSI, max(0.0, limite - time.monotonic()))
+        time.sleep(pause)
+        attente += pause
+
+    _derniere_verification = time.monotonic()
+    return attente
+
+
+if __name__ == "__main__":
+    """
+    Point d'entrée du script : affiche le mode et la pression actuelle
+
+    Usage :
+        mode_impact.py                 -> mode courant
+        mode_impact.py definir <mode>  -> mémorise le mode dans impact.json
+    """
+    try:
+        args = retirer_option(sys.argv[1:])
+        if args and args[0] == "definir":
+            if len(args) < 2:
+                raise ValueError(f"Mode manquant (attendu : {', '.join(MODES)})")
+            enregistrer_mode(args[1])
+        mode = lire_mode()
+        print(json.dumps({
+            "mode": mode,
+            "modes": list(MODES),
+            "pression": {"io": lire_pression("io"), "cpu": lire_pression("cpu")}
+        }, indent=2, ensure_ascii=False))
+        sys.exit(0)
+    except Exception as e:
+        print(json.dumps({"erreur": str(e)}), file=sys.stderr)
+        sys.exit(1)
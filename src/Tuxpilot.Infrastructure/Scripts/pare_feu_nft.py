@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Tuxpilot - Exposition réseau d'après le jeu de règles nftables
+Lit le jeu de règles en une fois ("nft -j list ruleset", aussi utilisé par
+firewalld et ufw via iptables-nft), indexe les règles des chaînes de base
+accrochées à "input", puis évalue pour chaque socket en écoute si une
+nouvelle connexion venant de l'extérieur serait acceptée.
+
+Évaluation volontairement prudente : une règle dont une condition n'est
+pas comprise (adresse source, marque...) rend le port "restreint" si elle
+accepte, et n'est pas considérée comme bloquante si elle rejette.
+"""
+
+import json
+import subprocess
+import sys
+
+import sondes
+
+# Verdicts d'exposition, du plus fermé au plus ouvert
+BLOQUE = "bloque"
+RESTREINT = "restreint"
+ACCEPTE = "accepte"
+ORDRE = {BLOQUE: 0, RESTREINT: 1, ACCEPTE: 2}
+
+# Familles nftables qui voient le trafic IPv4 / IPv6
+FAMILLES = {4: ("ip", "inet"), 6: ("ip6", "inet")}
+
+PROFONDEUR_SAUT_MAX = 16
+
+
+# ---------------- LECTURE ----------------
+
+def lire_ruleset(fichier=None, timeout=5):
+    """
+    Jeu de règles JSON (liste "nftables"), depuis nft ou un fichier enregistré
+
+    Returns:
+        list | None: Objets nftables, None si nft est absent ou non autorisé
+    """
+    try:
+        if fichier is not None:
+            with open(fichier, encoding="utf-8") as f:
+                return decoder_ruleset(f.read())
+        r = subprocess.run(["nft", "-j", "list", "ruleset"], capture_output=True, text=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return decoder_ruleset(r.stdout) if r.returncode == 0 else None
+
+
+def decoder_ruleset(texte):
+    """Sortie de "nft -j list ruleset" -> objets nftables (None si invalide)"""
+    try:
+        donnees = json.loads(texte or '{"nftables": []}')
+    except ValueError:
+        return None
+    return donnees.get("nftables") if isinstance(donnees, dict) else None
+
+
+def resume_ruleset(ruleset):
+    """Chaînes input et leur politique (preuve lisible)"""
+    return [f"{e['cle'][0]} {e['cle'][1]} {e['cle'][2]} (policy {e['politique']})"
+            for e in indexer_ruleset(ruleset)["entrees"]]
+
+
+# ---------------- INDEX ----------------
+
+def _valeurs(droite):
+    """Opérande droite d'un match -> liste de valeurs et d'intervalles"""
+    if isinstance(droite, list):
+        # Liste de drapeaux (ex. ct state { established, related })
+        return [v for element in droite for v in _valeurs(element)]
+    if isinstance(droite, dict):
+        if "set" in droite:
+            valeurs = []
+            for v in droite["set"]:
+                valeurs.extend(_valeurs(v))
+            return valeurs
+        if "range" in droite:
+            return [tuple(droite["range"])]
+        if "prefix" in droite:
+            return [droite]
+    return [droite]
+
+
+def _correspond(valeurs, valeur):
+    for v in valeurs:
+        if isinstance(v, tuple):
+            if isinstance(valeur, int) and v[0] <= valeur <= v[1]:
+                return True
+        elif v == valeur:
+            return True
+    return False
+
+
+def _compiler_condition(expression):
+    """
+    Condition d'un match -> (genre, operateur, valeurs)
+
+    Genres compris : "port" (tcp/udp dport, th dport), "proto" (l4proto,
+    ip protocol, ip6 nexthdr), "iif" (interface d'entrée), "ct" (état de
+    connexion) ; les autres sont "inconnu".
+    """
+    match = expression["match"]
+    gauche, operateur = match.get("left"), match.get("op", "==")
+    valeurs = _valeurs(match.get("right"))
+    if isinstance(gauche, dict):
+        payload = gauche.get("payload")
+        if payload and payload.get("field") == "dport":
+            protocole = payload.get("protocol")
+            return ("port", operateur, valeurs, protocole if protocole in ("tcp", "udp") else None)
+        if payload and payload.get("field") in ("protocol", "nexthdr"):
+            return ("proto", operateur, valeurs, None)
+        meta = gauche.get("meta")
+        if meta and meta.get("key") == "l4proto":
+            return ("proto", operateur, valeurs, None)
+        if meta and meta.get("key") in ("iifname", "iif"):
+            return ("iif", operateur, valeurs, None)
+        ct = gauche.get("ct")
+        if ct and ct.get("key") == "state":
+            return ("ct", operateur, valeurs, None)
+    return ("inconnu", operateur, valeurs, None)
+
+
+def _compiler_regle(regle):
+    """Règle -> {"conditions", "verdict", "cible", "handle"} (None sans verdict)"""
+    conditions, verdict, cible = [], None, None
+    for expression in regle.get("expr", []):
+        if "match" in expression:
+            conditions.append(_compiler_condition(expression))
+        elif "accept" in expression:
+            verdict = "accept"
+        elif "drop" in expression or "reject" in expression:
+            verdict = "drop"
+        elif "return" in expression:
+            verdict = "return"
+        elif "jump" in expression or "goto" in expression:
+            verdict = "jump" if "jump" in expression else "goto"
+            cible = (expression.get("jump") or expression.get("goto") or {}).get("target")
+        elif "counter" in expression or "log" in expression or "limit" in expression or "comment" in expression:
+            continue
+        else:
+            # Expression non comprise (set dynamique, nat...) : considérée comme une condition
+            conditions.append(("inconnu", "==", [], None))
+    if verdict is None:
+        return None
+    return {"conditions": conditions, "verdict": verdict, "cible": cible, "handle": regle.get("handle")}
+
+
+def indexer_ruleset(ruleset):
+    """
+    Index des chaînes : règles compilées par (famille, table, chaîne) et
+    liste des chaînes de base "input"
+
+    Returns:
+        dict: {"chaines": {...}, "entrees": [{"cle", "politique", "priorite"}]}
+    """
+    chaines, entrees = {}, []
+    for objet in ruleset or []:
+        if "chain" in objet:
+            c = objet["chain"]
+            cle = (c.get("family"), c.get("table"), c.get("name"))
+            chaines.setdefault(cle, [])
+            if c.get("hook") == "input" and c.get("family") in ("ip", "ip6", "inet"):
+                entrees.append({"cle": cle, "politique": c.get("policy", "accept"), "priorite": c.get("prio", 0)})
+        elif "rule" in objet:
+            r = objet["rule"]
+            compilee = _compiler_regle(r)
+            if compilee is not None:
+                chaines.setdefault((r.get("family"), r.get("table"), r.get("chain")), []).append(compilee)
+    entrees.sort(key=lambda e: e["priorite"] if isinstance(e["priorite"], int) else 0)
+    return {"chaines": chaines, "entrees": entrees}
+
+
+# ---------------- ÉVALUATION ----------------
+
+def _evaluer_conditions(conditions, proto, port):
+    """
+    Une nouvelle connexion externe (proto, port) satisfait-elle les conditions ?
+
+    Returns:
+        str | None: "oui", "peut-etre" (condition non comprise) ou None (non)
+    """
+    resultat = "oui"
+    for genre, operateur, valeurs, protocole_port in conditions:
+        if operateur not in ("==", "!=", "in"):
+            resultat = "peut-etre"
+            continue
+        if genre == "iif":
+            # Connexion externe : jamais par l'interface de bouclage, peut-être par une autre
+            if any(v in ("lo", 1) for v in valeurs):
+                if operateur == "!=":
+                    continue
+                return None
+            resultat = "peut-etre"
+            continue
+        if genre == "port":
+            if protocole_port is not None and protocole_port != proto:
+                return None
+            correspond = _correspond(valeurs, port)
+        elif genre == "proto":
+            correspond = _correspond(valeurs, proto)
+        elif genre == "ct":
+            correspond = _correspond(valeurs, "new")
+        else:
+            resultat = "peut-etre"
+            continue
+        if correspond == (operateur == "!="):
+            return None
+    return resultat
+
+
+def _evaluer_chaine(index, cle, proto, port, profondeur=0):
+    """
+    Verdict d'une chaîne pour (proto, port)
+
+    Returns:
+        tuple: (verdict ou None, règle, decisif) - decisif=False si le paquet
+        peut sortir de la chaîne sans verdict (politique ou chaîne appelante)
+    """
+    if profondeur > PROFONDEUR_SAUT_MAX:
+        return None, None, False
+    # Acceptation conditionnelle déjà rencontrée (condition non comprise)
+    conditionnel = None
+    for regle in index["chaines"].get(cle, []):
+        correspond = _evaluer_conditions(regle["conditions"], proto, port)
+        if correspond is None:
+            continue
+        source = f"{cle[0]} {cle[1]} {cle[2]} handle {regle['handle']}"
+        verdict = regle["verdict"]
+
+        if verdict in ("jump", "goto"):
+            sous_verdict, sous_source, decisif = _evaluer_chaine(
+                index, (cle[0], cle[1], regle["cible"]), proto, port, profondeur + 1)
+            if correspond == "oui" and decisif and sous_verdict != RESTREINT:
+                return (RESTREINT, conditionnel, True) if conditionnel and sous_verdict == BLOQUE \
+                    else (sous_verdict, sous_source, True)
+            if sous_verdict in (ACCEPTE, RESTREINT):
+                conditionnel = conditionnel or sous_source
+            if verdict == "goto" and correspond == "oui":
+                # goto ne revient pas : fin de la chaîne appelante
+                return (RESTREINT if conditionnel else None), conditionnel, False
+        elif verdict == "return":
+            if correspond == "oui":
+                return (RESTREINT if conditionnel else None), conditionnel, False
+        elif verdict == "accept":
+            if correspond == "oui":
+                return (RESTREINT, conditionnel, True) if conditionnel else (ACCEPTE, source, True)
+            conditionnel = conditionnel or source
+        elif verdict == "drop" and correspond == "oui":
+            return (RESTREINT, conditionnel, True) if conditionnel else (BLOQUE, source, True)
+    return (RESTREINT if conditionnel else None), conditionnel, False
+
+
+def exposition(index, proto, port, version=4):
+    """
+    Verdict combiné des chaînes input (le paquet doit être accepté par toutes)
+
+    Returns:
+        tuple: (verdict, règle ou politique décisive)
+    """
+    familles = FAMILLES[version]
+    verdict, source = ACCEPTE, "aucune chaîne input"
+    for entree in index["entrees"]:
+        cle = entree["cle"]
+        if cle[0] not in familles:
+            continue
+        resultat, regle, decisif = _evaluer_chaine(index, cle, proto, port)
+        if not decisif:
+            # Fin de chaîne : la politique s'applique aux paquets restants
+            politique = entree["politique"]
+            if politique == "accept":
+                resultat, regle = ACCEPTE, f"{cle[0]} {cle[1]} {cle[2]} policy accept"
+            elif resultat is None:
+                resultat, regle = BLOQUE, f"{cle[0]} {cle[1]} {cle[2]} policy {politique}"
+        if ORDRE[resultat] < ORDRE[verdict] or source == "aucune chaîne input":
+            verdict, source = resultat, regle
+    return verdict, source
+
+
+def analyser_exposition(ruleset, ecoutes):
+    """
+    Croise les sockets en écoute avec le jeu de règles
+
+    Args:
+        ruleset: Objets nftables (lire_ruleset)
+        ecoutes: [{"proto", "adresse", "port", "locale", "users"}] (sondes.sockets_en_ecoute)
+
+    Returns:
+        dict: {"ecoutes": [... + "acces", "regle"], "accessibles", "restreintes", "bloquees", "chainesInput"}
+    """
+    index = indexer_ruleset(ruleset)
+    resultats = []
+    for e in ecoutes:
+        if e.get("locale"):
+            continue
+        proto = "udp" if e["proto"].startswith("udp") else "tcp"
+        adresse = e["adresse"]
+        if adresse in ("::", "*"):
+            # Socket double pile : la famille la plus ouverte l'emporte
+            verdicts = [exposition(index, proto, e["port"], 4), exposition(index, proto, e["port"], 6)]
+            acces, regle = max(verdicts, key=lambda v: ORDRE[v[0]])
+        else:
+            acces, regle = exposition(index, proto, e["port"], 6 if ":" in adresse else 4)
+        resultats.append(dict(e, acces=acces, regle=regle))
+
+    return {
+        "ecoutes": resultats,
+        "accessibles": sum(1 for r in resultats if r["acces"] == ACCEPTE),
+        "restreintes": sum(1 for r in resultats if r["acces"] == RESTREINT),
+        "bloquees": sum(1 for r in resultats if r["acces"] == BLOQUE),
+        "chainesInput": [f"{e['cle'][0]} {e['cle'][1]} {e['cle'][2]} (policy {e['politique']})"
+                         for e in index["entrees"]]
+    }
+
+
+if __name__ == "__main__":
+    """Point d'entrée du script : exposition actuelle, ou d'un jeu de règles JSON enregistré"""
+    try:
+        fichier = sys.argv[1] if len(sys.argv) >= 2 else None
+        ruleset = lire_ruleset(fichier)
+        if ruleset is None:
+            print(json.dumps({"erreur": "Jeu de règles nftables illisible (nft absent ou droits insuffisants)"}),
+                  file=sys.stderr)
+            sys.exit(1)
+        ecoutes = sondes.sockets_en_ecoute() or []
+        print(json.dumps(analyser_exposition(ruleset, ecoutes), indent=2, ensure_ascii=False))
+        sys.exit(0)
+    except Exception as e:
+        print(json.dumps({"erreur": str(e)}), file=sys.stderr)
+        sys.exit(1)
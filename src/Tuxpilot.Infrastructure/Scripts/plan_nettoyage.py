@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Tuxpilot - Planificateur de nettoyage (dry-run)
+Évalue exactement les règles de cleanup_root.sh en un seul parcours et
+produit un plan (fichiers candidats + taille totale). Le script root consomme
+ce plan au lieu de relancer find, et ignore les fichiers modifiés depuis.
+"""
+
+import json
+import os
+import stat
+import sys
+import time
+from datetime import datetime
+
+import mode_impact
+
+VERSION_PLAN = 1
+
+# find /tmp -type f -atime +7
+RACINE_TMP = "/tmp"
+AGE_TMP_JOURS = 7
+
+# journalctl --vacuum-time=30d
+RACINES_JOURNAL = ["/var/log/journal", "/run/log/journal"]
+AGE_JOURNAL_JOURS = 30
+
+
+def correspond_tmp(nom, st, maintenant):
+    """
+    Règle de find -atime +7 : l'âge en jours entiers (tronqué) doit être > 7
+    """
+    if not stat.S_ISREG(st.st_mode):
+        return False
+    return int((maintenant - st.st_atime) // 86400) > AGE_TMP_JOURS
+
+
+def correspond_journal(nom, st, maintenant):
+    """
+    Règle de journalctl --vacuum-time=30d : seuls les journaux archivés
+    (system@….journal, ….journal~) sont supprimés, jamais le fichier actif.
+    journald se base sur la dernière entrée du fichier ; le mtime en est
+    une approximation fidèle puisqu'un journal archivé n'est plus écrit.
+    """
+    if not stat.S_ISREG(st.st_mode):
+        return False
+    archive = nom.endswith(".journal~") or ("@" in nom and nom.endswith(".journal"))
+    return archive and (maintenant - st.st_mtime) > AGE_JOURNAL_JOURS * 86400
+
+
+# Règles de cleanup_root.sh, par nom d'étape
+REGLES = {
+    "fichiers_temporaires": {
+        "categorie": "fichiers_temporaires",
+        "racines": [RACINE_TMP],
+        "predicat": correspond_tmp,
+        "description": f"find {RACINE_TMP} -type f -atime +{AGE_TMP_JOURS}"
+    },
+    "journald": {
+        "categorie": "logs_anciens",
+        "racines": RACINES_JOURNAL,
+        "predicat": correspond_journal,
+        "description": f"journalctl --vacuum-time={AGE_JOURNAL_JOURS}d"
+    },
+}
+
+
+def evaluer_regle(nom, echeance=None, maintenant=None):
+    """
+    Évalue une règle en un seul parcours de ses racines
+
+    Comme mesurer_dossier de cleanup.py, le parcours s'arrête à l'échéance et
+    extrapole les totaux ; les candidats listés sont alors incomplets.
+
+    Les dossiers illisibles pour l'utilisateur courant (systemd-private-*
+    d'un service, par exemple) sont listés dans "illisibles" : l'étape root
+    les parcourt elle-même (voir nettoyer_sous_arbre).
+
+    Returns:
+        dict: {"regle", "categorie", "description", "candidats", "nombre",
+               "tailleBytes", "partiel", "illisibles"}
+    """
+    regle = REGLES[nom]
+    predicat = regle["predicat"]
+    maintenant = time.time() if maintenant is None else maintenant
+
+    candidats = []
+    illisibles = []
+    taille = 0
+    partiel = False
+    a_visiter = [r for r in regle["racines"] if os.path.isdir(r)]
+    visites = 0
+
+    while a_visiter:
+        if visites and echeance is not None and time.monotonic() >= echeance:
+            partiel = True
+            break
+
+        mode_impact.ralentir(echeance)
+        dossier = a_visiter.pop()
+        visites += 1
+        try:
+            with os.scandir(dossier) as entrees:
+                for entree in entrees:
+                    try:
+                        if entree.is_dir(follow_symlinks=False):
+                            a_visiter.append(entree.path)
+                            continue
+                        st = entree.stat(follow_symlinks=False)
+                        if predicat(entree.name, st, maintenant):
+                            candidats.append({
+                                "chemin": entree.path,
+                                "taille": st.st_size,
+                                "dev": st.st_dev,
+                                "inode": st.st_ino,
+                                "mtimeNs": st.st_mtime_ns
+                            })
+                            taille += st.st_size
+                    except OSError:
+                        pass
+        except PermissionError:
+            illisibles.append(dossier)
+        except OSError:
+            pass
+
+    nombre = len(candidats)
+    if partiel:
+        # Extrapolation : les dossiers restants ressemblent aux dossiers vus
+        facteur = (visites + len(a_visiter)) / visites
+        taille = int(taille * facteur)
+        nombre = int(nombre * facteur)
+
+    return {
+        "regle": nom,
+        "categorie": regle["categorie"],
+        "description": regle["description"],
+        "candidats": candidats,
+        "nombre": nombre,
+        "tailleBytes": taille,
+        "partiel": partiel,
+        "illisibles": illisibles
+    }
+
+
+def construire_plan():
+    """
+    Construit le plan complet (sans échéance) pour toutes les règles
+
+    Returns:
+        dict: Plan sérialisable consommé par cleanup_root.sh
+    """
+    maintenant = time.time()
+    regles = {nom: evaluer_regle(nom, maintenant=maintenant) for nom in REGLES}
+    return {
+        "version": VERSION_PLAN,
+        "cree": datetime.now().isoformat(),
+        "regles": regles,
+        "tailleTotaleBytes": sum(r["tailleBytes"] for r in regles.values())
+    }
+
+
+def _composants(racine, chemin):
+    """Composants de chemin sous la racine (None si le chemin en sort)"""
+    chemin = os.path.normpath(chemin or "")
+    if not chemin.startswith(racine.rstrip("/") + "/"):
+        return None
+    composants = os.path.relpath(chemin, racine).split(os.sep)
+    if any(c in ("", ".", "..") for c in composants):
+        return None
+    return composants
+
+
+def _ouvrir_dossier(racine, composants):
+    """
+    Descripteur du dossier racine/composants..., ouvert composant par
+    composant avec O_NOFOLLOW (aucun lien symbolique suivi)
+    """
+    flags = os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW
+    fd = os.open(racine, flags)
+    try:
+        for composant in composants:
+            suivant = os.open(composant, flags, dir_fd=fd)
+            os.close(fd)
+            fd = suivant
+    except OSError:
+        os.close(fd)
+        raise
+    return fd
+
+
+def supprimer_si_inchange(racine, candidat, predicat, maintenant):
+    """
+    Supprime un candidat du plan s'il n'a pas changé depuis la planification
+
+    Le chemin est parcouru composant par composant depuis la racine avec
+    O_NOFOLLOW : un lien symbolique substitué entre-temps ne peut pas faire
+    sortir de la racine (le plan vient d'un utilisateur non privilégié).
+
+    Returns:
+        str: "supprime", "modifie" ou "introuvable"
+    """
+    composants = _composants(racine, candidat.get("chemin"))
+    if composants is None:
+        return "introuvable"
+
+    try:
+        fd = _ouvrir_dossier(racine, composants[:-1])
+    except FileNotFoundError:
+        return "introuvable"
+    except OSError:
+        return "modifie"
+    try:
+        nom = composants[-1]
+        st = os.stat(nom, dir_fd=fd, follow_symlinks=False)
+        inchange = (
+            st.st_dev == candidat.get("dev")
+            and st.st_ino == candidat.get("inode")
+            and st.st_size == candidat.get("taille")
+            and st.st_mtime_ns == candidat.get("mtimeNs")
+            and predicat(nom, st, maintenant)
+        )
+        if not inchange:
+            return "modifie"
+
+        os.unlink(nom, dir_fd=fd)
+        return "supprime"
+    except FileNotFoundError:
+        return "introuvable"
+    except OSError:
+        return "modifie"
+    finally:
+        os.close(fd)
+
+
+def nettoyer_sous_arbre(racine, chemin, predicat, maintenant):
+    """
+    Supprime (en root) les fichiers d'un dossier que le plan n'a pas pu lire
+
+    Équivalent de find <chemin> -type f <règle> -delete, mais parcouru par
+    descripteurs ouverts avec O_NOFOLLOW : le chemin vient du plan d'un
+    utilisateur non privilégié et ne doit pas permettre de sortir de la racine.
+
+    La pile contient (dossier parent, nom) : un sous-dossier n'est ouvert qu'au
+    moment d'être parcouru, et un parent est fermé dès que son dernier enfant
+    est ouvert. Le nombre de descripteurs ouverts reste borné par la
+    profondeur, pas par la largeur de l'arbre.
+
+    Returns:
+        tuple: (fichiers supprimés, octets libérés, sous-dossiers ignorés)
+    """
+    composants = _composants(racine, chemin) if chemin != racine else []
+    if composants is None:
+        return 0, 0, 1
+    try:
+        premier = _ouvrir_dossier(racine, composants)
+    except OSError:
+        return 0, 0, 1
+
+    supprimes = libere = ignores = 0
+    flags = os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW
+    # Dossier parent partagé par ses enfants : [fd, enfants restant à ouvrir]
+    pile = [(None, premier)]
+    while pile:
+        parent, nom = pile.pop()
+        if parent is None:
+            fd = nom
+        else:
+            try:
+                fd = os.open(nom, flags, dir_fd=parent[0])
+            except OSError:
+                fd = None
+                ignores += 1
+            parent[1] -= 1
+            if parent[1] == 0:
+                os.close(parent[0])
+            if fd is None:
+                continue
+
+        dossier = [fd, 0]
+        try:
+            with os.scandir(fd) as entrees:
+                for entree in entrees:
+                    try:
+                        if entree.is_dir(follow_symlinks=False):
+                            pile.append((dossier, entree.name))
+                            dossier[1] += 1
+                            continue
+                        st = entree.stat(follow_symlinks=False)
+                        if predicat(entree.name, st, maintenant):
+                            os.unlink(entree.name, dir_fd=fd)
+                            supprimes += 1
+                            libere += st.st_size
+                    except OSError:
+                        pass
+        except OSError:
+            ignores += 1
+        if dossier[1] == 0:
+            os.close(fd)
+    return supprimes, libere, ignores
+
+
+def appliquer_plan(chemin_plan, regle="fichiers_temporaires"):
+    """
+    Applique (en root) la partie "fichiers" d'un plan pour une règle
+
+    Returns:
+        dict: {"prevuBytes", "libereBytes", "supprimes", "modifies", "introuvables",
+               "sousArbresIllisibles", "sousArbresIgnores"}
+    """
+    with open(chemin_plan, encoding="utf-8") as f:
+        plan = json.load(f)
+
+    if plan.get("version") != VERSION_PLAN:
+        raise ValueError(f"Version de plan non supportée : {plan.get('version')}")
+
+    definition = REGLES[regle]
+    racine = definition["racines"][0]
+    evaluation = plan.get("regles", {}).get(regle, {})
+    candidats = evaluation.get("candidats", [])
+    maintenant = time.time()
+
+    resultat = {"prevuBytes": 0, "libereBytes": 0, "supprimes": 0, "modifies": 0, "introuvables": 0,
+                "sousArbresIllisibles": 0, "sousArbresIgnores": 0}
+    for candidat in candidats:
+        resultat["prevuBytes"] += candidat.get("taille", 0)
+        etat = supprimer_si_inchange(racine, candidat, definition["predicat"], maintenant)
+        if etat == "supprime":
+            resultat["supprimes"] += 1
+            resultat["libereBytes"] += candidat.get("taille", 0)
+        elif etat == "modifie":
+            resultat["modifies"] += 1
+        else:
+            resultat["introuvables"] += 1
+
+    # Dossiers que l'utilisateur n'a pas pu lire : l'ancien find root les nettoyait
+    for dossier in evaluation.get("illisibles", []):
+        supprimes, libere, ignores = nettoyer_sous_arbre(racine, dossier, definition["predicat"], maintenant)
+        resultat["sousArbresIllisibles"] += 1
+        resultat["sousArbresIgnores"] += ignores
+        resultat["supprimes"] += supprimes
+        resultat["prevuBytes"] += libere
+        resultat["libereBytes"] += libere
+
+    return resultat
+
+
+if __name__ == "__main__":
+    """Point d'entrée du script"""
+    try:
+        mode_impact.appliquer(mode_impact.lire_mode())
+        if len(sys.argv) >= 3 and sys.argv[1] == "appliquer":
+            # Appelé par cleanup_root.sh (root) avec le plan pré-calculé
+            resultat = appliquer_plan(sys.argv[2])
+            print(json.dumps(resultat))
+        else:
+            # Dry-run : affiche le plan sans rien supprimer
+            resultat = construire_plan()
+            print(json.dumps(resultat, indent=2, ensure_ascii=False))
+        sys.exit(0)
+    except Exception as e:
+        print(json.dumps({"erreur": str(e)}), file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Tuxpilot - Sondes natives pour l'audit de sécurité
+Lecture directe de /etc, /proc et /sys à la place des commandes (stat,
+getenforce, ss, getent, timedatectl, mokutil, lsblk, passwd -S, rpm -q).
+Chaque sonde prend une racine (défaut "/") pour pouvoir être exercée sur
+une arborescence factice, et renvoie None quand elle ne peut pas répondre :
+l'audit se rabat alors sur la commande.
+"""
+
+import ctypes
+import ipaddress
+import json
+import os
+import pwd
+import grp
+import socket
+import sqlite3
+import sys
+
+RACINE = "/"
+
+# Variable EFI SecureBoot (GUID EFI_GLOBAL_VARIABLE)
+VARIABLE_SECURE_BOOT = "sys/firmware/efi/efivars/SecureBoot-8be4df61-93ca-11d2-aa0d-00e098032b8c"
+
+# Erreur maximale (µs) en dessous de laquelle l'horloge est synchronisée
+# (même critère que timedatectl / systemd ntp_synced)
+ERREUR_MAX_SYNCHRO_US = 16000000
+
+# États /proc/net : TCP LISTEN, UDP non connecté (équivalent de ss -l)
+ETATS_ECOUTE = {"tcp": "0A", "tcp6": "0A", "udp": "07", "udp6": "07"}
+
+
+def chemin(relatif, racine=RACINE):
+    """Chemin absolu sous la racine (relatif peut commencer par /)"""
+    return os.path.join(racine, relatif.lstrip("/"))
+
+
+def lire_fichier(relatif, racine=RACINE, limite=1024 * 1024):
+    """Contenu texte d'un fichier (None si illisible)"""
+    try:
+        with open(chemin(relatif, racine), encoding="utf-8", errors="replace") as f:
+            return f.read(limite)
+    except OSError:
+        return None
+
+
+# ---------------- FICHIERS ----------------
+
+def mode_fichier(relatif, racine=RACINE):
+    """Permissions octales comme "stat -c %a" (ex. "644", "0") ou None"""
+    try:
+        return format(os.stat(chemin(relatif, racine)).st_mode & 0o7777, "o")
+    except OSError:
+        return None
+
+
+def proprietaire_fichier(relatif, racine=RACINE):
+    """"mode user:group" comme "stat -c '%a %U:%G'" ou None"""
+    try:
+        st = os.stat(chemin(relatif, racine))
+    except OSError:
+        return None
+    try:
+        utilisateur = pwd.getpwuid(st.st_uid).pw_name
+    except KeyError:
+        utilisateur = str(st.st_uid)
+    try:
+        groupe = grp.getgrgid(st.st_gid).gr_name
+    except KeyError:
+        groupe = str(st.st_gid)
+    return f"{format(st.st_mode & 0o7777, 'o')} {utilisateur}:{groupe}"
+
+
+# ---------------- COMPTES ----------------
+
+def _sources_nss(base, racine=RACINE):
+    """Sources déclarées dans nsswitch.conf pour une base (ex. "group")"""
+    contenu = lire_fichier("/etc/nsswitch.conf", racine) or ""
+    for ligne in contenu.splitlines():
+        ligne = ligne.split("#", 1)[0].strip()
+        if ligne.startswith(base + ":"):
+            return [s for s in ligne.split(":", 1)[1].split() if not s.startswith("[")]
+    return ["files"]
+
+
+def ligne_groupe(nom, racine=RACINE):
+    """
+    Ligne "nom:x:gid:membres" comme "getent group nom"
+
+    Returns:
+        str | None: "" si le groupe n'existe pas, None si la réponse dépend
+        d'une source réseau (sss, ldap...) que seul getent sait interroger
+    """
+    contenu = lire_fichier("/etc/group", racine)
+    if contenu is not None:
+        for ligne in contenu.splitlines():
+            if ligne.split(":", 1)[0] == nom:
+                return ligne.strip()
+    # "systemd" ne fournit que des groupes dynamiques, pas wheel/sudo
+    if set(_sources_nss("group", racine)) - {"files", "systemd", "compat"}:
+        return None
+    return "" if contenu is not None else None
+
+
+def etat_compte(nom, racine=RACINE):
+    """
+    Statut court du mot de passe comme "passwd -S" : L (verrouillé),
+    NP (sans mot de passe) ou P (utilisable). None si /etc/shadow illisible.
+    """
+    contenu = lire_fichier("/etc/shadow", racine)
+    if contenu is None:
+        return None
+    for ligne in contenu.splitlines():
+        champs = ligne.split(":")
+        if champs[0] == nom and len(champs) >= 2:
+            mot_de_passe = champs[1]
+            if mot_de_passe.startswith(("!", "*")):
+                return "L"
+            if mot_de_passe == "":
+                return "NP"
+            return "P"
+    return None
+
+
+# ---------------- SELINUX ----------------
+
+def mode_selinux(racine=RACINE):
+    """
+    "Enforcing" / "Permissive" d'après selinuxfs, "Disabled" si SELinux est
+    configuré mais non monté. None si rien ne permet de conclure.
+    """
+    enforce = lire_fichier("/sys/fs/selinux/enforce", racine)
+    if enforce is not None:
+        return "Enforcing" if enforce.strip() == "1" else "Permissive"
+    configuration = lire_fichier("/etc/selinux/config", racine)
+    if configuration is None:
+        return None
+    if racine != "/":
+        # Arborescence hors ligne : mode configuré pour le prochain démarrage
+        for ligne in configuration.splitlines():
+            cle, _, valeur = ligne.partition("=")
+            if cle.strip() == "SELINUX":
+                return {"enforcing": "Enforcing", "permissive": "Permissive"}.get(valeur.strip().lower(), "Disabled")
+    return "Disabled"
+
+
+# ---------------- UNITÉS ----------------
+
+def etat_unite_fichiers(unite, racine=RACINE):
+    """
+    Activation d'une unité d'après les fichiers (sans systemctl, pour une
+    arborescence hors ligne) : "enabled" (lien dans un *.wants/*.requires),
+    "masked", "disabled", ou "" si l'unité n'existe pas
+    """
+    dossiers = ["/etc/systemd/system", "/usr/lib/systemd/system", "/lib/systemd/system"]
+    if os.path.realpath(chemin(f"/etc/systemd/system/{unite}", racine)) in ("/dev/null", chemin("/dev/null", racine)):
+        return "masked"
+    for dossier in dossiers:
+        try:
+            sous_dossiers = [e.name for e in os.scandir(chemin(dossier, racine))
+                             if e.name.endswith((".wants", ".requires")) and e.is_dir()]
+        except OSError:
+            continue
+        if any(os.path.lexists(chemin(f"{dossier}/{d}/{unite}", racine)) for d in sous_dossiers):
+            return "enabled"
+    if any(os.path.lexists(chemin(f"{d}/{unite}", racine)) for d in dossiers):
+        return "disabled"
+    return ""
+
+
+# ---------------- SOCKETS ----------------
+
+def _decoder_adresse(hexa):
+    """Adresse de /proc/net (mots 32 bits en ordre machine) -> (ip, port)"""
+    adresse, port = hexa.split(":")
+    brut = bytes.fromhex(adresse)
+    if sys.byteorder == "little":
+        brut = b"".join(brut[i:i + 4][::-1] for i in range(0, len(brut), 4))
+    famille = socket.AF_INET if len(brut) == 4 else socket.AF_INET6
+    return socket.inet_ntop(famille, brut), int(port, 16)
+
+
+def _processus_par_inode(inodes, racine=RACINE):
+    """Processus propriétaires des sockets : {inode: [(nom, pid, fd)]}"""
+    proprietaires = {}
+    if not inodes:
+        return proprietaires
+    cibles = {f"socket:[{i}]": i for i in inodes}
+    racine_proc = chemin("/proc", racine)
+    try:
+        pids = [e.name for e in os.scandir(racine_proc) if e.name.isdigit()]
+    except OSError:
+        return proprietaires
+
+    for pid in pids:
+        try:
+            entrees = os.scandir(f"{racine_proc}/{pid}/fd")
+        except OSError:
+            continue
+        nom = None
+        with entrees:
+            for entree in entrees:
+                try:
+                    inode = cibles.get(os.readlink(entree.path))
+                except OSError:
+                    continue
+                if inode is None:
+                    continue
+                if nom is None:
+                    try:
+                        with open(f"{racine_proc}/{pid}/comm", encoding="utf-8", errors="replace") as f:
+                            nom = f.read().strip()
+                    except OSError:
+                        nom = ""
+                proprietaires.setdefault(inode, []).append((nom, int(pid), int(entree.name)))
+    return proprietaires
+
+
+def sockets_en_ecoute(racine=RACINE, processus=True):
+    """
+    Sockets en écoute, comme "ss -H -tulnp"
+
+    Returns:
+        list | None: [{"proto", "adresse", "port", "inode", "locale", "users"}],
+        None si /proc/net est illisible
+    """
+    sockets = []
+    lu = False
+    for fichier, etat in ETATS_ECOUTE.items():
+        try:
+            with open(chemin(f"/proc/net/{fichier}", racine), encoding="ascii") as f:
+                lu = True
+                next(f, None)
+                for ligne in f:
+                    champs = ligne.split()
+                    if len(champs) < 10 or champs[3] != etat:
+                        continue
+                    adresse, port = _decoder_adresse(champs[1])
+                    ip = ipaddress.ip_address(adresse)
+                    if getattr(ip, "ipv4_mapped", None):
+                        ip = ip.ipv4_mapped
+                    sockets.append({
+                        "proto": fichier.rstrip("6"),
+                        "adresse": adresse,
+                        "port": port,
+                        "inode": int(champs[9]),
+                        "locale": ip.is_loopback,
+                        "users": ""
+                    })
+        except (OSError, ValueError):
+            continue
+    if not lu:
+        return None
+
+    if processus:
+        proprietaires = _processus_par_inode({s["inode"] for s in sockets if s["inode"]}, racine)
+        for s in sockets:
+            if s["inode"] in proprietaires:
+                liste = ",".join(f'("{n}",pid={p},fd={fd})' for n, p, fd in proprietaires[s["inode"]])
+                s["users"] = f"users:({liste})"
+    return sockets
+
+
+# ---------------- HORLOGE ----------------
+
+class _Timex(ctypes.Structure):
+    """struct timex (linux/timex.h)"""
+    _fields_ = [
+        ("modes", ctypes.c_uint),
+        ("offset", ctypes.c_long),
+        ("freq", ctypes.c_long),
+        ("maxerror", ctypes.c_long),
+        ("esterror", ctypes.c_long),
+        ("status", ctypes.c_int),
+        ("constant", ctypes.c_long),
+        ("precision", ctypes.c_long),
+        ("tolerance", ctypes.c_long),
+        ("time_sec", ctypes.c_long),
+        ("time_usec", ctypes.c_long),
+        ("tick", ctypes.c_long),
+        ("ppsfreq", ctypes.c_long),
+        ("jitter", ctypes.c_long),
+        ("shift", ctypes.c_int),
+        ("stabil", ctypes.c_long),
+        ("jitcnt", ctypes.c_long),
+        ("calcnt", ctypes.c_long),
+        ("errcnt", ctypes.c_long),
+        ("stbcnt", ctypes.c_long),
+        ("tai", ctypes.c_int),
+        ("reserve", ctypes.c_int * 11),
+    ]
+
+
+def horloge_synchronisee(racine=RACINE):
+    """
+    True/False comme "timedatectl show -p NTPSynchronized" (adjtimex en
+    lecture seule : erreur maximale < 16 s). Sur une racine factice, seul
+    le marqueur de systemd-timesyncd est consulté. None si indéterminé.
+    """
+    if racine != "/":
+        if os.path.exists(chemin("/run/systemd/timesync/synchronized", racine)):
+            return True
+        return None
+    try:
+        timex = _Timex()
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.adjtimex(ctypes.byref(timex)) < 0:
+            return None
+        return timex.maxerror < ERREUR_MAX_SYNCHRO_US
+    except (OSError, AttributeError):
+        return None
+
+
+# ---------------- DÉMARRAGE ----------------
+
+def etat_secure_boot(racine=RACINE):
+    """
+    "enabled" / "disabled" d'après la variable EFI SecureBoot,
+    "non_efi" sur un démarrage BIOS, None si la variable est illisible
+    """
+    if not os.path.isdir(chemin("/sys/firmware/efi", racine)):
+        return "non_efi"
+    try:
+        with open(chemin(VARIABLE_SECURE_BOOT, racine), "rb") as f:
+            # 4 octets d'attributs, puis la valeur (1 octet)
+            donnees = f.read()
+    except OSError:
+        return None
+    if len(donnees) < 5:
+        return None
+    return "enabled" if donnees[4] == 1 else "disabled"
+
+
+# ---------------- DISQUES ----------------
+
+def volumes_chiffres(racine=RACINE):
+    """
+    Volumes chiffrés au format de lsblk -r : mappings device-mapper ouverts
+    (uuid "CRYPT-...") et conteneurs LUKS connus d'udev (ID_FS_TYPE)
+
+    Returns:
+        list | None: ["nom crypt" | "nom crypto_LUKS", ...], None si /sys/block est illisible
+    """
+    try:
+        peripheriques = [e.name for e in os.scandir(chemin("/sys/block", racine)) if e.name.startswith("dm-")]
+    except OSError:
+        return None
+    chiffres = []
+    for dm in sorted(peripheriques):
+        uuid = lire_fichier(f"/sys/block/{dm}/dm/uuid", racine) or ""
+        if uuid.startswith("CRYPT-"):
+            nom = (lire_fichier(f"/sys/block/{dm}/dm/name", racine) or dm).strip()
+            chiffres.append(f"{nom} crypt")
+
+    # Base udev : "E:ID_FS_TYPE=crypto_LUKS" pour les partitions LUKS (même fermées)
+    try:
+        entrees = [e.name for e in os.scandir(chemin("/run/udev/data", racine)) if e.name.startswith("b")]
+    except OSError:
+        entrees = []
+    for entree in sorted(entrees):
+        donnees = lire_fichier(f"/run/udev/data/{entree}", racine, limite=64 * 1024) or ""
+        if "E:ID_FS_TYPE=crypto_LUKS" not in donnees.splitlines():
+            continue
+        nom = entree[1:]
+        uevent = lire_fichier(f"/sys/dev/block/{entree[1:]}/uevent", racine) or ""
+        for ligne in uevent.splitlines():
+            if ligne.startswith("DEVNAME="):
+                nom = ligne.split("=", 1)[1]
+        chiffres.append(f"{nom} crypto_LUKS")
+    return chiffres
+
+
+# ---------------- PAQUETS ----------------
+
+def paquet_installe(nom, racine=RACINE):
+    """
+    True/False d'après la base rpm (sqlite) ou dpkg, None si aucune base
+    lisible (base rpm BerkeleyDB/ndb : seule la commande rpm sait la lire)
+    """
+    base_rpm = chemin("/var/lib/rpm/rpmdb.sqlite", racine)
+    if os.path.exists(base_rpm):
+        try:
+            conn = sqlite3.connect(f"file:{base_rpm}?mode=ro", uri=True)
+            try:
+                return conn.execute("SELECT 1 FROM Name WHERE key = ? LIMIT 1", (nom,)).fetchone() is not None
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+
+    statut = lire_fichier("/var/lib/dpkg/status", racine, limite=64 * 1024 * 1024)
+    if statut is None:
+        return None
+    for bloc in statut.split("\n\n"):
+        lignes = bloc.splitlines()
+        if f"Package: {nom}" in lignes:
+            return any(l.startswith("Status:") and l.endswith(" installed") for l in lignes)
+    return False
+
+
+if __name__ == "__main__":
+    """Point d'entrée du script : état de toutes les sondes (racine en argument)"""
+    try:
+        racine = sys.argv[1] if len(sys.argv) >= 2 else RACINE
+        resultat = {
+            "racine": racine,
+            "modes": {f: mode_fichier(f, racine) for f in ("/etc/passwd", "/etc/shadow")},
+            "journal": proprietaire_fichier("/var/log/journal", racine),
+            "groupes": {g: ligne_groupe(g, racine) for g in ("wheel", "sudo")},
+            "root": etat_compte("root", racine),
+            "selinux": mode_selinux(racine),
+            "sockets": sockets_en_ecoute(racine),
+            "horlogeSynchronisee": horloge_synchronisee(racine),
+            "secureBoot": etat_secure_boot(racine),
+            "volumesChiffres": volumes_chiffres(racine),
+            "fail2ban": paquet_installe("fail2ban", racine)
+        }
+        print(json.dumps(resultat, indent=2, ensure_ascii=False))
+        sys.exit(0)
+    except Exception as e:
+        print(json.dumps({"erreur": str(e)}), file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Tuxpilot - Configuration effective de sshd (sans lancer sshd -T)
+Résout les Include (ex. /etc/ssh/sshd_config.d/*.conf, défaut sur Fedora et
+Ubuntu), applique les règles de priorité de sshd (première valeur obtenue
+gagnante, sauf options cumulatives comme Port/ListenAddress) et les blocs
+Match. Le résultat est mis en cache d'après les mtimes des fichiers lus.
+"""
+
+import fnmatch
+import glob
+import ipaddress
+import json
+import os
+import re
+import shlex
+import sys
+from pathlib import Path
+
+import sondes
+
+CONFIG_PRINCIPALE = "/etc/ssh/sshd_config"
+DOSSIER_SSH = "/etc/ssh"
+PROFONDEUR_INCLUDE_MAX = 16
+
+CACHE_CONFIG = Path.home() / ".tuxpilot" / "cache" / "sshd_config.json"
+
+# Options dont chaque occurrence s'ajoute aux précédentes
+CUMULATIVES = {
+    "port", "listenaddress", "hostkey", "hostcertificate", "acceptenv",
+    "allowusers", "denyusers", "allowgroups", "denygroups", "subsystem"
+}
+
+# Valeurs par défaut (OpenSSH >= 7.0) des options utiles à l'audit
+DEFAUTS = {
+    "port": ["22"],
+    "listenaddress": ["0.0.0.0", "::"],
+    "permitrootlogin": "prohibit-password",
+    "passwordauthentication": "yes",
+    "kbdinteractiveauthentication": "yes",
+    "pubkeyauthentication": "yes",
+    "permitemptypasswords": "no",
+    "x11forwarding": "no",
+    "maxauthtries": "6"
+}
+
+
+# ---------------- LECTURE ----------------
+
+def _decouper(ligne):
+    """Ligne -> (mot-clé en minuscules, arguments) ; None si vide/commentaire"""
+    # "Mot-clé valeur" ou "Mot-clé=valeur"
+    m = re.match(r"\s*([^\s=#]+)\s*(?:=\s*|\s)?(.*)$", ligne)
+    if not m:
+        return None
+    try:
+        arguments = shlex.split(m.group(2), comments=True)
+    except ValueError:
+        arguments = m.group(2).split()
+    return m.group(1).lower(), arguments
+
+
+def lire_directives(chemin, racine=sondes.RACINE, fichiers=None, profondeur=0, match=None):
+    """
+    Aplatit la configuration en une liste de directives, Include résolus
+
+    Args:
+        fichiers: Liste complétée avec (chemin, mtime_ns, taille) de chaque fichier
+                  ou dossier consulté (signature du cache)
+        match: Critères du bloc Match englobant (None = section globale)
+
+    Returns:
+        list: [(cle, arguments, match, fichier, numero_ligne)]
+    """
+    fichiers = [] if fichiers is None else fichiers
+    directives = []
+    reel = sondes.chemin(chemin, racine)
+    try:
+        st = os.stat(reel)
+        with open(reel, encoding="utf-8", errors="replace") as f:
+            lignes = f.read().splitlines()
+    except OSError:
+        return directives
+    fichiers.append((chemin, st.st_mtime_ns, st.st_size))
+
+    # Un bloc Match ouvert dans un fichier inclus se termine avec ce fichier
+    courant = match
+    for numero, ligne in enumerate(lignes, 1):
+        decoupe = _decouper(ligne)
+        if decoupe is None:
+            continue
+        cle, arguments = decoupe
+
+        if cle == "match":
+            courant = None if [a.lower() for a in arguments] == ["all"] else arguments
+            continue
+
+        if cle == "include":
+            if profondeur >= PROFONDEUR_INCLUDE_MAX:
+                continue
+            for motif in arguments:
+                if not motif.startswith("/"):
+                    motif = f"{DOSSIER_SSH}/{motif}"
+                dossier = os.path.dirname(motif)
+                try:
+                    st_dossier = os.stat(sondes.chemin(dossier, racine))
+                    fichiers.append((dossier, st_dossier.st_mtime_ns, 0))
+                except OSError:
+                    pass
+                # Ordre lexical, comme glob(3) dans sshd
+                for inclus in sorted(glob.glob(sondes.chemin(motif, racine))):
+                    relatif = "/" + os.path.relpath(inclus, racine) if racine != "/" else inclus
+                    directives.extend(lire_directives(relatif, racine, fichiers, profondeur + 1, courant))
+            continue
+
+        directives.append((cle, arguments, courant, chemin, numero))
+
+    return directives
+
+
+# ---------------- MATCH ----------------
+
+def _motif_correspond(liste, valeur, adresse=False):
+    """Liste de motifs "a,b,!c" (wildcards, CIDR pour les adresses)"""
+    if valeur is None:
+        return False
+    resultat = False
+    for motif in liste.split(","):
+        negation = motif.startswith("!")
+        motif = motif[1:] if negation else motif
+        correspond = fnmatch.fnmatchcase(valeur, motif)
+        if adresse and not correspond and "/" in motif:
+            try:
+                correspond = ipaddress.ip_address(valeur) in ipaddress.ip_network(motif, strict=False)
+            except ValueError:
+                correspond = False
+        if correspond:
+            if negation:
+                return False
+            resultat = True
+    return resultat
+
+
+def bloc_correspond(criteres_match, connexion):
+    """
+    Les critères d'une ligne Match s'appliquent-ils à une connexion ?
+
+    Args:
+        criteres_match: Arguments de la ligne Match (ex. ["User", "alice", "Address", "10.0.0.0/8"])
+        connexion: {"user", "groups", "host", "address", "localaddress", "localport", "rdomain"}
+    """
+    if connexion is None:
+        return False
+    i = 0
+    while i + 1 < len(criteres_match):
+        critere, motifs = criteres_match[i].lower(), criteres_match[i + 1]
+        i += 2
+        if critere == "group":
+            if not any(_motif_correspond(motifs, g) for g in connexion.get("groups", [])):
+                return False
+        elif critere in ("address", "localaddress"):
+            if not _motif_correspond(motifs, connexion.get(critere), adresse=True):
+                return False
+        elif critere in ("user", "host", "localport", "rdomain"):
+            if not _motif_correspond(motifs, str(connexion.get(critere)) if connexion.get(critere) is not None else None):
+                return False
+        else:
+            # Critère non géré : sshd le refuserait, on ne suppose pas de correspondance
+            return False
+    return True
+
+
+# ---------------- ÉVALUATION ----------------
+
+def _appliquer(valeurs, cle, arguments):
+    """Première valeur obtenue gagnante, sauf options cumulatives"""
+    if cle in CUMULATIVES:
+        valeurs.setdefault(cle, []).extend(arguments)
+    elif cle not in valeurs:
+        valeurs[cle] = " ".join(arguments)
+
+
+def evaluer_directives(directives, connexion=None):
+    """
+    Valeurs effectives
+
+    Sans connexion, seule la section globale s'applique (comme "sshd -T").
+    Avec une connexion, les blocs Match correspondants l'emportent sur la
+    section globale : c'est leur première valeur qui est retenue.
+    """
+    globales = {}
+    conditionnelles = {}
+    for cle, arguments, match, _, _ in directives:
+        if match is None:
+            _appliquer(globales, cle, arguments)
+        elif bloc_correspond(match, connexion):
+            _appliquer(conditionnelles, cle, arguments)
+
+    valeurs = {}
+    for cle in sorted(set(DEFAUTS) | set(globales) | set(conditionnelles)):
+        if cle in conditionnelles:
+            valeurs[cle] = conditionnelles[cle]
+        elif cle in globales:
+            valeurs[cle] = globales[cle]
+        else:
+            valeurs[cle] = DEFAUTS[cle]
+    return valeurs
+
+
+def surcharges_match(directives, cles):
+    """Blocs Match qui redéfinissent des options sensibles (par connexion)"""
+    surcharges = []
+    for cle, arguments, match, fichier, numero in directives:
+        if match is not None and cle in cles:
+            surcharges.append({
+                "match": " ".join(match),
+                "cle": cle,
+                "valeur": " ".join(arguments),
+                "source": f"{fichier}:{numero}"
+            })
+    return surcharges
+
+
+def ecoutes_configurees(valeurs):
+    """
+    Couples (adresse, port) d'écoute : ListenAddress "hôte[:port]" utilise
+    son port s'il en précise un, sinon chaque Port
+    """
+    ports = [int(p) for p in valeurs.get("port", DEFAUTS["port"]) if p.isdigit()] or [22]
+    couples = []
+    for adresse in valeurs.get("listenaddress", DEFAUTS["listenaddress"]):
+        adresse = adresse.split()[0]
+        if adresse.startswith("["):
+            hote, _, port = adresse[1:].partition("]:")
+            hote = hote.rstrip("]")
+        elif adresse.count(":") == 1:
+            hote, _, port = adresse.partition(":")
+        else:
+            hote, port = adresse, ""
+        if port.isdigit():
+            couples.append((hote, int(port)))
+        else:
+            couples.extend((hote, p) for p in ports)
+    return couples
+
+
+# ---------------- CACHE ----------------
+
+def _signature_valide(fichiers, racine):
+    for chemin, mtime, taille in fichiers:
+        try:
+            st = os.stat(sondes.chemin(chemin, racine))
+        except OSError:
+            return False
+        if st.st_mtime_ns != mtime or (taille and st.st_size != taille):
+            return False
+    return True
+
+
+def configuration_effective(racine=sondes.RACINE, chemin=CONFIG_PRINCIPALE, cache=CACHE_CONFIG):
+    """
+    Configuration effective (section globale) et surcharges Match
+
+    Le résultat est réutilisé tant qu'aucun fichier lu (ni dossier d'Include)
+    n'a changé de mtime. Seul le système courant est mis en cache : une racine
+    hors ligne (image montée, rootfs) est auditée une fois et ses entrées
+    s'accumuleraient.
+
+    Returns:
+        dict | None: {"valeurs", "ecoutes", "surcharges", "fichiers", "depuisCache"},
+        None si le fichier principal est illisible
+    """
+    if racine != "/":
+        cache = None
+    cle_cache = f"{racine}:{chemin}"
+    entrees = {}
+    if cache is not None:
+        try:
+            with open(cache, encoding="utf-8") as f:
+                entrees = json.load(f)
+            precedent = entrees.get(cle_cache)
+            if precedent and _signature_valide(precedent["fichiers"], racine):
+                return dict(precedent["resultat"], depuisCache=True)
+        except (OSError, ValueError, KeyError, TypeError):
+            entrees = {}
+
+    fichiers = []
+    directives = lire_directives(chemin, racine, fichiers)
+    if not fichiers:
+        return None
+
+    valeurs = evaluer_directives(directives)
+    resultat = {
+        "valeurs": valeurs,
+        "ecoutes": ecoutes_configurees(valeurs),
+        "surcharges": surcharges_match(directives, {"permitrootlogin", "passwordauthentication",
+                                                     "permitemptypasswords", "kbdinteractiveauthentication"}),
+        "fichiers": [f[0] for f in fichiers if f[2] or os.path.isfile(sondes.chemin(f[0], racine))]
+    }
+
+    if cache is not None:
+        try:
+            # Entrées d'autres racines laissées par une version précédente : purgées
+            entrees = {cle: e for cle, e in entrees.items() if cle.startswith("/:")}
+            entrees[cle_cache] = {"fichiers": fichiers, "resultat": resultat}
+            Path(cache).parent.mkdir(parents=True, exist_ok=True)
+            # Nom propre au processus : audits parallèles sans collision
+            temporaire = Path(cache).with_suffix(f".{os.getpid()}.tmp")
+            with open(temporaire, "w", encoding="utf-8") as f:
+                json.dump(entrees, f)
+            os.replace(temporaire, cache)
+        except OSError:
+            pass
+
+    return dict(resultat, depuisCache=False)
+
+
+if __name__ == "__main__":
+    """Point d'entrée du script : configuration effective (racine en argument)"""
+    try:
+        racine = sys.argv[1] if len(sys.argv) >= 2 else sondes.RACINE
+        resultat = configuration_effective(racine)
+        if resultat is None:
+            print(json.dumps({"erreur": "sshd_config illisible"}), file=sys.stderr)
+            sys.exit(1)
+        print(json.dumps(resultat, indent=2, ensure_ascii=False))
+        sys.exit(0)
+    except Exception as e:
+        print(json.dumps({"erreur": str(e)}), file=sys.stderr)
+        sys.exit(1)
@@ -60,6 +60,15 @@ public class ServiceAssistantIASetup : IServiceAssistantIASetup
         return await _commandes.ExecuterCommandeAsync(cmd, needsSudo: action.NeedsSudo);
     }
 
+    public async Task TelechargerModeleAsync(string model, Action<string> onEvenement)
+    {
+        // Une ligne NDJSON par événement : status, progress (throttlé), retry, result
+        await _python.ExecuterAvecStreamingAsync(ScriptName, onEvenement, $"pull \"{EscapeArg(model)}\"");
+
+        // Le modèle vient d'arriver : le prochain statut doit le voir
+        _cache = null;
+    }
+
     private static string EscapeArg(string s)
         => s.Replace("\\", "\\\\").Replace("\"", "\\\"");
 
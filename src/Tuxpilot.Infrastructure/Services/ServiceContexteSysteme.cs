@@ -1,30 +1,30 @@
 using System;
 using System.Collections.Generic;
-using System.Diagnostics;
 using System.Linq;
-using System.Text;
 using System.Text.Json;
 using System.Threading;
 using System.Threading.Tasks;
 using Tuxpilot.Core.Entities;
-using Tuxpilot.Core.Enums;
 using Tuxpilot.Core.Interfaces.Services;
 
 namespace Tuxpilot.Infrastructure.Services;
 
 public class ServiceContexteSysteme : IServiceContexteSysteme
 {
-    private readonly IServiceSecurite _serviceSecurite;
+    private const string ScriptName = "contexte_systeme.py";
 
-    // Cache (évite de relancer un audit/commandes à chaque message)
+    // Sections utilisées par le snapshot ; chacune a sa durée de validité côté script
+    // (audit 20 min, configuration 6 h, réseau 1 min), relue depuis ~/.tuxpilot/cache/contexte.json
+    private const string Sections = "audit_securite,system_config,network";
+
+    private readonly ExecuteurScriptPython _executeur;
+
+    // Un seul rafraîchissement à la fois (deux messages rapprochés partagent le cache du script)
     private readonly SemaphoreSlim _lock = new(1, 1);
-    private SystemContextSnapshot? _cache;
-    private DateTimeOffset _cacheAt;
-    private readonly TimeSpan _ttl = TimeSpan.FromMinutes(20);
 
-    public ServiceContexteSysteme(IServiceSecurite serviceSecurite)
+    public ServiceContexteSysteme(ExecuteurScriptPython executeur)
     {
-        _serviceSecurite = serviceSecurite;
+        _executeur = executeur;
     }
 
     public async Task<SystemContextSnapshot> GetSnapshotAsync(bool forceRefresh = false)
@@ -32,8 +32,11 @@ public class ServiceContexteSysteme : IServiceContexteSysteme
         await _lock.WaitAsync();
         try
         {
-            if (!forceRefresh && _cache != null && (DateTimeOffset.UtcNow - _cacheAt) < _ttl)
-                return _cache;
+            var args = $"--sections {Sections}" + (forceRefresh ? " --rafraichir" : "");
+            var json = await _executeur.ExecuterAsync(ScriptName, args);
+
+            using var doc = JsonDocument.Parse(json);
+            var sections = doc.RootElement.GetProperty("sections");
 
             var snap = new SystemContextSnapshot
             {
@@ -41,138 +44,79 @@ public class ServiceContexteSysteme : IServiceContexteSysteme
             };
 
             // Système
-            snap.OsPrettyName = await ReadOsPrettyNameAsync();
-            snap.Kernel = (await RunAsync("uname -r")).Trim();
-            snap.Hostname = (await RunAsync("hostname")).Trim();
-            snap.Desktop = Environment.GetEnvironmentVariable("XDG_CURRENT_DESKTOP") ?? "";
-
-            // Réseau / firewall (rapide)
-            snap.FirewallStatus = await DetectFirewallAsync();
-            snap.ExposedPorts = await GetExposedPortsAsync();
-
-            // Reboot required
-            snap.RebootRequired = await DetectRebootRequiredAsync();
-
-            // Audit sécurité (ta source de vérité)
-            var rapport = await _serviceSecurite.ExecuterAuditAsync(); // réutilise ton pipeline 
-            snap.SecurityScore = rapport.Score;
-
-            // Top issues : prendre les plus graves + avec preuves
-            var ordered = rapport.Verifications
-                .OrderByDescending(v => v.Niveau == NiveauRisque.Critique)
-                .ThenByDescending(v => v.Niveau == NiveauRisque.Eleve)
-                .ThenByDescending(v => v.Niveau == NiveauRisque.Moyen)
-                .ThenByDescending(v => v.Niveau == NiveauRisque.Faible)
-                .ThenBy(v => v.Nom)
-                .ToList();
-
-            snap.TopIssues = ordered
-                .Where(v => !v.Reussie || v.Niveau != NiveauRisque.Aucun)
-                .Take(8)
-                .Select(v => new SecurityIssue
-                {
-                    Id = v.Id ?? "",
-                    Name = v.Nom,
-                    Level = v.Niveau.ToString(),
-                    Details = v.Details,
-                    Proof = v.Preuve ?? "",
-                    Impact = v.Impact ?? "",
-                    Recommendation = v.Recommandation
-                })
-                .ToList();
-
-            _cache = snap;
-            _cacheAt = DateTimeOffset.UtcNow;
-            return snap;
-        }
-        finally
-        {
-            _lock.Release();
-        }
-    }
-
-    private static async Task<string> ReadOsPrettyNameAsync()
-    {
-        try
-        {
-            var txt = await System.IO.File.ReadAllTextAsync("/etc/os-release");
-            foreach (var line in txt.Split('\n'))
+            if (Donnees(sections, "system_config", snap.Notes) is { } config)
             {
-                if (line.StartsWith("PRETTY_NAME="))
-                    return line.Split('=', 2)[1].Trim().Trim('"');
+                snap.OsPrettyName = Texte(config, "distribution");
+                snap.Kernel = Texte(config, "noyau");
+                snap.Hostname = Texte(config, "machine");
+                snap.Desktop = Texte(config, "bureau");
+                if (config.TryGetProperty("redemarrageNecessaire", out var reboot) && reboot.ValueKind != JsonValueKind.Null)
+                    snap.RebootRequired = reboot.GetBoolean();
             }
-        }
-        catch { }
-        return "";
-    }
 
-    private static async Task<string> DetectFirewallAsync()
-    {
-        var ufw = (await RunAsync("systemctl is-active ufw 2>/dev/null || true")).Trim();
-        if (ufw == "active") return "ufw active";
-
-        var fw = (await RunAsync("systemctl is-active firewalld 2>/dev/null || true")).Trim();
-        if (fw == "active") return "firewalld active";
+            // Réseau / firewall
+            if (Donnees(sections, "network", snap.Notes) is { } reseau)
+            {
+                snap.FirewallStatus = Texte(reseau, "pareFeu");
+                if (reseau.TryGetProperty("portsExposes", out var ports))
+                    snap.ExposedPorts = ports.EnumerateArray().Select(p => p.GetString() ?? "").Take(12).ToList();
+            }
 
-        return "none";
-    }
+            // Audit sécurité (incrémental côté script, problèmes déjà triés par gravité)
+            if (Donnees(sections, "audit_securite", snap.Notes) is { } audit)
+            {
+                if (audit.TryGetProperty("score", out var score))
+                    snap.SecurityScore = score.GetInt32();
 
-    private static async Task<List<string>> GetExposedPortsAsync()
-    {
-        // Exposés = écoute sur 0.0.0.0 / :: / IP non loopback
-        var output = await RunAsync("ss -H -tulnp 2>/dev/null || true");
-        var res = new List<string>();
+                if (audit.TryGetProperty("problemes", out var problemes))
+                {
+                    snap.TopIssues = problemes.EnumerateArray()
+                        .Take(8)
+                        .Select(p => new SecurityIssue
+                        {
+                            Id = Texte(p, "id"),
+                            Name = Texte(p, "nom"),
+                            Level = Texte(p, "niveau"),
+                            Details = Texte(p, "details"),
+                            Proof = Texte(p, "preuve"),
+                            Impact = Texte(p, "impact"),
+                            Recommendation = Texte(p, "recommandation")
+                        })
+                        .ToList();
+                }
+            }
 
-        foreach (var line in output.Split('\n', StringSplitOptions.RemoveEmptyEntries))
+            return snap;
+        }
+        finally
         {
-            var parts = line.Split(' ', StringSplitOptions.RemoveEmptyEntries);
-            if (parts.Length < 5) continue;
-
-            var local = parts[4]; // addr:port
-            if (!local.Contains(':')) continue;
-
-            var addr = local[..local.LastIndexOf(':')];
-            var port = local[(local.LastIndexOf(':') + 1)..];
-
-            bool isLocal = addr.Contains("127.0.0.1") || addr.Contains("::1");
-            if (isLocal) continue;
-
-            // détecter processus (optionnel)
-            var users = parts.Length >= 7 ? string.Join(' ', parts.Skip(6)) : "";
-            res.Add($"{port} {users}".Trim());
+            _lock.Release();
         }
-
-        return res.Distinct().Take(12).ToList();
     }
 
-    private static async Task<bool?> DetectRebootRequiredAsync()
+    /// <summary>
+    /// Données d'une section ; une erreur de collecte (valeur précédente réutilisée ou absente) est notée
+    /// </summary>
+    private static JsonElement? Donnees(JsonElement sections, string nom, List<string> notes)
     {
-        // Debian/Ubuntu
-        if (System.IO.File.Exists("/var/run/reboot-required"))
-            return true;
+        if (!sections.TryGetProperty(nom, out var section))
+            return null;
 
-        // Fedora : needs-restarting (si dispo)
-        var which = await RunAsync("command -v needs-restarting >/dev/null 2>&1; echo $?");
-        if (which.Trim() == "0")
+        if (section.TryGetProperty("erreur", out var erreur))
         {
-            var r = await RunAsync("needs-restarting -r >/dev/null 2>&1; echo $?");
-            // needs-restarting -r => 1 quand reboot nécessaire
-            if (r.Trim() == "1") return true;
-            if (r.Trim() == "0") return false;
+            var age = section.TryGetProperty("ageS", out var a) && a.ValueKind == JsonValueKind.Number
+                ? $" (valeur d'il y a {a.GetInt32() / 60} min)"
+                : "";
+            notes.Add($"{nom} : {erreur.GetString()}{age}");
         }
-        return null; // inconnu
-    }
 
-    private static async Task<string> RunAsync(string cmd)
-    {
-        var psi = new ProcessStartInfo("/bin/bash", $"-lc \"{cmd}\"")
-        {
-            RedirectStandardOutput = true,
-            RedirectStandardError = true
-        };
-        using var p = Process.Start(psi)!;
-        var stdout = await p.StandardOutput.ReadToEndAsync();
-        await p.WaitForExitAsync();
-        return stdout;
+        return section.TryGetProperty("donnees", out var donnees) && donnees.ValueKind == JsonValueKind.Object
+            ? donnees
+            : null;
     }
+
+    private static string Texte(JsonElement element, string propriete)
+        => element.TryGetProperty(propriete, out var valeur) && valeur.ValueKind == JsonValueKind.String
+            ? valeur.GetString() ?? ""
+            : "";
 }
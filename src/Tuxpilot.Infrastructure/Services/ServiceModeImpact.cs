@@ -0,0 +1,79 @@
+using System.Text.Json;
+using Tuxpilot.Core.Enums;
+using Tuxpilot.Core.Interfaces.Services;
+
+namespace Tuxpilot.Infrastructure.Services;
+
+/// <summary>
+/// Service de gestion du mode d'impact (~/.tuxpilot/impact.json, lu par mode_impact.py)
+/// </summary>
+public class ServiceModeImpact : IServiceModeImpact
+{
+    private readonly string _configFile;
+    private ModeImpact _modeActuel = ModeImpact.Normal;
+    
+    public ModeImpact ModeActuel => _modeActuel;
+    
+    public ServiceModeImpact()
+    {
+        var appDataPath = Path.Combine(
+            Environment.GetFolderPath(Environment.SpecialFolder.UserProfile),
+            ".tuxpilot"
+        );
+        
+        Directory.CreateDirectory(appDataPath);
+        _configFile = Path.Combine(appDataPath, "impact.json");
+        
+        _modeActuel = ChargerMode();
+    }
+    
+    public void ChangerMode(ModeImpact mode)
+    {
+        _modeActuel = mode;
+        SauvegarderMode(mode);
+    }
+    
+    public ModeImpact ChargerMode()
+    {
+        try
+        {
+            if (!File.Exists(_configFile))
+                return ModeImpact.Normal;
+            
+            var json = File.ReadAllText(_configFile);
+            var config = JsonSerializer.Deserialize<ImpactConfig>(json);
+            
+            return Enum.TryParse<ModeImpact>(config?.Mode, ignoreCase: true, out var mode)
+                ? mode
+                : ModeImpact.Normal;
+        }
+        catch
+        {
+            return ModeImpact.Normal;
+        }
+    }
+    
+    public void SauvegarderMode(ModeImpact mode)
+    {
+        try
+        {
+            // Valeur en minuscules : c'est la forme attendue par mode_impact.py
+            var config = new ImpactConfig { Mode = mode.ToString().ToLowerInvariant() };
+            var json = JsonSerializer.Serialize(config, new JsonSerializerOptions 
+            { 
+                WriteIndented = true 
+            });
+            
+            File.WriteAllText(_configFile, json);
+        }
+        catch
+        {
+            // Ignorer les erreurs de sauvegarde
+        }
+    }
+    
+    private class ImpactConfig
+    {
+        public string? Mode { get; set; }
+    }
+}
@@ -23,14 +23,14 @@ public class ServiceSecurite : IServiceSecurite
     /// <summary>
     /// Exécuter un audit complet de sécurité
     /// </summary>
-    public async Task<RapportSecurite> ExecuterAuditAsync()
+    public async Task<RapportSecurite> ExecuterAuditAsync(bool incremental = false)
     {
         try
         {
             Console.WriteLine("[SÉCURITÉ] Début de l'audit...");
 
             // Exécuter le script Python
-            var jsonResult = await _executeur.ExecuterAsync("audit_securite.py");
+            var jsonResult = await _executeur.ExecuterAsync("audit_securite.py", incremental ? "--incremental" : "");
 
             if (string.IsNullOrEmpty(jsonResult))
             {
@@ -124,6 +124,9 @@ public class ServiceSecurite : IServiceSecurite
          if (json.TryGetProperty("commande_correction", out var cmd) && cmd.ValueKind != System.Text.Json.JsonValueKind.Null)
             verif.CommandeCorrection = cmd.GetString();
 
+        if (json.TryGetProperty("duree_ms", out var duree))
+            verif.DureeMs = duree.GetInt32();
+
         return verif;
     }
 
@@ -37,6 +37,7 @@ public partial class App : Application
         services.AddSingleton<IServiceNettoyage, ServiceNettoyage>();
         services.AddSingleton<IServiceDiagnostic, ServiceDiagnostic>();
         services.AddSingleton<IServiceTheme, ServiceTheme>(); 
+        services.AddSingleton<IServiceModeImpact, ServiceModeImpact>();
         services.AddSingleton<IServiceDetectionPlanificateur, ServiceDetectionPlanificateur>();
         services.AddSingleton<IServiceSecurite, ServiceSecurite>(); 
         services.AddSingleton<ILicenseService, LicenseService>(); 
@@ -46,7 +46,8 @@ public partial class AssistantIAViewModel : ViewModelBase
     [ObservableProperty] private bool _ollamaReady;
     [ObservableProperty] private string _ollamaStatusMessage = "IA : statut inconnu";
     [ObservableProperty] private ObservableCollection<OllamaSetupAction> _ollamaActions = new();
-    [ObservableProperty] private string _modeleChoisi = "llama3.1:8b";
+    // Vide : le script choisit le modèle recommandé pour cette machine
+    [ObservableProperty] private string _modeleChoisi = string.Empty;
 
 [ObservableProperty] private bool _ollamaNotReady = true;
 partial void OnOllamaReadyChanged(bool value) => OllamaNotReady = !value;
@@ -89,6 +90,9 @@ partial void OnOllamaReadyChanged(bool value) => OllamaNotReady = !value;
         {
             var status = await _setup.GetStatusAsync(ModeleChoisi, forceRefresh: force);
 
+            if (string.IsNullOrWhiteSpace(ModeleChoisi))
+                ModeleChoisi = status.ModelRequested;
+
             OllamaReady = status.Ready;
             OllamaStatusMessage = status.Message ?? "Statut inconnu";
 
@@ -112,16 +116,97 @@ partial void OnOllamaReadyChanged(bool value) => OllamaNotReady = !value;
         IsLoading = true;
         try
         {
-            var (ok, output) = await _setup.ExecuterActionAsync(action);
-            Messages.Add(new ChatMessageViewModel(
-                ok ? $"✅ {action.Label}\n{output}" : $"❌ {action.Label}\n{output}",
-                isUser: false));
+            if (action.Id is "pull_model" or "pull_recommended_model" && !string.IsNullOrWhiteSpace(action.Model))
+            {
+                await TelechargerModeleAsync(action);
+            }
+            else
+            {
+                var (ok, output) = await _setup.ExecuterActionAsync(action);
+                Messages.Add(new ChatMessageViewModel(
+                    ok ? $"✅ {action.Label}\n{output}" : $"❌ {action.Label}\n{output}",
+                    isUser: false));
+            }
 
             await ChargerEtatOllamaAsync(true);
         }
         finally { IsLoading = false; }
     }
 
+    /// <summary>
+    /// Télécharge un modèle via l'API Ollama (reprise après coupure) en affichant la progression
+    /// </summary>
+    private async Task TelechargerModeleAsync(OllamaSetupAction action)
+    {
+        var message = new ChatMessageViewModel($"⬇️ {action.Label}\nConnexion…", isUser: false);
+        Messages.Add(message);
+        string? erreurResultat = null;
+
+        try
+        {
+            await _setup.TelechargerModeleAsync(action.Model, ligne =>
+            {
+                var etat = DecrireEvenementTelechargement(ligne, ref erreurResultat);
+                if (etat == null) return;
+
+                Avalonia.Threading.Dispatcher.UIThread.Post(() =>
+                {
+                    message.Texte = $"⬇️ {action.Label}\n{etat}";
+                });
+            });
+        }
+        catch (Exception ex)
+        {
+            // Le script sort en erreur après l'événement "result" : son message est plus parlant
+            Avalonia.Threading.Dispatcher.UIThread.Post(() =>
+            {
+                message.Texte = $"❌ {action.Label}\n{erreurResultat ?? ex.Message}";
+            });
+        }
+    }
+
+    /// <summary>
+    /// Texte affiché pour un événement NDJSON du téléchargement (null : rien à afficher)
+    /// </summary>
+    private static string? DecrireEvenementTelechargement(string ligne, ref string? erreur)
+    {
+        try
+        {
+            using var doc = JsonDocument.Parse(ligne);
+            var e = doc.RootElement;
+            var type = e.TryGetProperty("type", out var t) ? t.GetString() : null;
+
+            switch (type)
+            {
+                case "progress":
+                    var completed = e.GetProperty("completed").GetInt64() / 1e9;
+                    var total = e.GetProperty("total").GetInt64() / 1e9;
+                    var debit = e.GetProperty("bytesPerSecond").GetInt64() / 1e6;
+                    var reste = e.TryGetProperty("etaS", out var eta) && eta.ValueKind == JsonValueKind.Number
+                        ? $", reste ~{TimeSpan.FromSeconds(eta.GetInt32()):hh\\:mm\\:ss}"
+                        : "";
+                    return $"{e.GetProperty("percent").GetDouble():0.0} % ({completed:0.00} / {total:0.00} Go, {debit:0.0} Mo/s{reste})";
+                case "status":
+                    return e.GetProperty("status").GetString();
+                case "retry":
+                    return $"🔁 Connexion perdue ({e.GetProperty("error").GetString()}), " +
+                           $"reprise {e.GetProperty("attempt").GetInt32()} dans {e.GetProperty("delayS").GetDouble():0} s";
+                case "result":
+                    if (e.GetProperty("ok").GetBoolean())
+                        return $"✅ Terminé en {e.GetProperty("durationS").GetDouble():0} s";
+                    erreur = e.GetProperty("error").GetString();
+                    return $"❌ {erreur}";
+                default:
+                    return null;
+            }
+        }
+        catch (Exception)
+        {
+            // Ligne non JSON ou champ manquant : ignorée
+            return null;
+        }
+    }
+
     [RelayCommand]
     private async Task RafraichirContexteAsync()
     {
@@ -14,6 +14,7 @@ public partial class MainWindowViewModel : ViewModelBase
 {
     private readonly IServiceProvider _serviceProvider;
     private readonly IServiceTheme _serviceTheme;
+    private readonly IServiceModeImpact _serviceModeImpact;
     private readonly ILicenseService _licenseService;
  
     [ObservableProperty]
@@ -31,13 +32,19 @@ public partial class MainWindowViewModel : ViewModelBase
     [ObservableProperty]
     private bool _estThemeSombre;
     
-    public MainWindowViewModel(IServiceProvider serviceProvider, IServiceTheme serviceTheme, ILicenseService licenseService)
+    [ObservableProperty]
+    private string _libelleModeImpact = "";
+    
+    public MainWindowViewModel(IServiceProvider serviceProvider, IServiceTheme serviceTheme,
+        IServiceModeImpact serviceModeImpact, ILicenseService licenseService)
     {
         _serviceProvider = serviceProvider;
         _serviceTheme = serviceTheme;
+        _serviceModeImpact = serviceModeImpact;
         _licenseService = licenseService; 
         
         EstThemeSombre = _serviceTheme.ThemeActuel == Theme.Dark;
+        LibelleModeImpact = ObtenirLibelleModeImpact(_serviceModeImpact.ModeActuel);
         
         // Charger les features
         _ = LoadFeaturesAsync();
@@ -99,6 +106,30 @@ public partial class MainWindowViewModel : ViewModelBase
         OnPropertyChanged(nameof(EstThemeSombre));
     }
     
+    /// <summary>
+    /// Commande pour passer au mode d'impact suivant (Normal → Réduit → Inactif)
+    /// </summary>
+    [RelayCommand]
+    private void ChangerModeImpact()
+    {
+        var nouveauMode = _serviceModeImpact.ModeActuel switch
+        {
+            ModeImpact.Normal => ModeImpact.Reduit,
+            ModeImpact.Reduit => ModeImpact.Inactif,
+            _ => ModeImpact.Normal
+        };
+    
+        _serviceModeImpact.ChangerMode(nouveauMode);
+        LibelleModeImpact = ObtenirLibelleModeImpact(nouveauMode);
+    }
+    
+    private static string ObtenirLibelleModeImpact(ModeImpact mode) => mode switch
+    {
+        ModeImpact.Reduit => "Impact : réduit",
+        ModeImpact.Inactif => "Impact : inactif",
+        _ => "Impact : normal"
+    };
+    
     /// <summary>
     /// Commande pour naviguer vers le Dashboard
     /// </summary>
@@ -0,0 +1,14 @@
+"""
+Tests des scripts Python de Tuxpilot.Infrastructure/Scripts
+
+Les scripts s'importent entre eux comme modules voisins (ils sont copiés
+tels quels avec l'application) : le dossier est ajouté à sys.path.
+"""
+
+import sys
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parents[2] / "src" / "Tuxpilot.Infrastructure" / "Scripts"
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+sys.path.insert(0, str(SCRIPTS))
@@ -0,0 +1,168 @@
+"""
+Serveur Ollama minimal pour les tests (http.server, HTTP/1.1 keep-alive)
+
+Chaque requête est enregistrée avec la connexion qui l'a portée, pour
+vérifier qu'un client réutilise bien sa connexion.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Gestionnaire(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.verrou:
+            self.server.connexions += 1
+            self.connexion = self.server.connexions
+
+    def log_message(self, format, *args):
+        pass
+
+    def _corps(self):
+        longueur = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(longueur)) if longueur else None
+
+    def _json(self, donnees, statut=200):
+        data = json.dumps(donnees).encode()
+        self.send_response(statut)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        if self.server.fermer_apres_reponse:
+            # Délai keep-alive du serveur écoulé : fermeture sans "Connection: close"
+            self.close_connection = True
+
+    def _debut_flux(self):
+        """Réponse NDJSON en chunked, comme les réponses en streaming d'Ollama"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, donnees):
+        data = json.dumps(donnees).encode() + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _fin_flux(self):
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _enregistrer(self, corps=None):
+        with self.server.verrou:
+            self.server.requetes.append((self.connexion, self.command, self.path, corps))
+
+    def do_GET(self):
+        self._enregistrer()
+        if self.path == "/api/version":
+            self._json({"version": self.server.version})
+        elif self.path == "/api/tags":
+            self._json({"models": [{"name": nom, "model": nom, "size": 4_900_000_000} for nom in self.server.modeles]})
+        elif self.path == "/api/ps":
+            self._json({"models": [{"name": nom, "model": nom, "size_vram": 5_500_000_000,
+                                    "expires_at": "2026-10-19T18:00:00Z"} for nom in sorted(self.server.charges)]})
+        else:
+            self._json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        corps = self._corps()
+        self._enregistrer(corps)
+        if self.path == "/api/generate":
+            self._generer(corps)
+        elif self.path == "/api/pull":
+            self._tirer()
+        else:
+            self._json({"error": "not found"}, 404)
+
+    def _generer(self, corps):
+        modele = corps["model"]
+        if corps.get("keep_alive") == 0:
+            self.server.charges.discard(modele)
+            self._json({"model": modele, "response": "", "done": True, "done_reason": "unload"})
+            return
+        # Chargement depuis le disque si le modèle n'est pas résident
+        charge = modele not in self.server.charges
+        if charge:
+            time.sleep(self.server.duree_chargement)
+            self.server.charges.add(modele)
+        load_duration = int(self.server.duree_chargement * 1e9) if charge else 2_000_000
+        if not corps.get("prompt"):
+            # Préchargement : Ollama ne rapporte pas load_duration
+            self._json({"model": modele, "response": "", "done": True, "done_reason": "load"})
+            return
+        self._debut_flux()
+        for mot in ("Le", " service", " écoute."):
+            self._chunk({"model": modele, "response": mot, "done": False})
+        self._chunk({"model": modele, "response": "", "done": True, "done_reason": "stop",
+                     "load_duration": load_duration, "prompt_eval_count": 24,
+                     "eval_count": self.server.tokens, "eval_duration": int(self.server.tokens / self.server.debit * 1e9)})
+        self._fin_flux()
+
+
+    def _tirer(self):
+        """
+        Une tentative de téléchargement, d'après le scénario suivant :
+        objets envoyés tels quels, COUPURE (connexion fermée en plein flux)
+        ou (code HTTP, message) pour une réponse en erreur
+        """
+        with self.server.verrou:
+            scenario = self.server.tirages.pop(0)
+        if isinstance(scenario, tuple):
+            self._json({"error": scenario[1]}, scenario[0])
+            return
+        self._debut_flux()
+        for etape in scenario:
+            if etape is COUPURE:
+                # Pas de chunk final : le client voit un flux incomplet
+                self.close_connection = True
+                return
+            self._chunk(etape)
+        self._fin_flux()
+
+
+# Coupure réseau au milieu d'un flux /api/pull
+COUPURE = object()
+
+
+def couche(digest, completed, total):
+    return {"status": f"pulling {digest[7:19]}", "digest": digest, "completed": completed, "total": total}
+
+
+class ServeurOllama(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, gestionnaire=Gestionnaire):
+        super().__init__(("127.0.0.1", 0), gestionnaire)
+        self.verrou = threading.Lock()
+        self.connexions = 0
+        self.requetes = []
+        self.version = "0.12.6"
+        self.modeles = ["llama3.1:8b"]
+        self.charges = set()
+        self.fermer_apres_reponse = False
+        # Génération : durée de chargement (s), tokens par réponse, débit (tokens/s)
+        self.duree_chargement = 0.05
+        self.tokens = 64
+        self.debit = 32.0
+        # Scénarios des tentatives /api/pull successives
+        self.tirages = []
+        self._thread = None
+
+    @property
+    def endpoint(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def demarrer(self):
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.02,), daemon=True)
+        self._thread.start()
+        return self
+
+    def arreter(self):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
@@ -0,0 +1,328 @@
+"""
+Assistant IA : client HTTP de l'API Ollama, contre un serveur de test
+"""
+
+import pytest
+
+from conftest import FIXTURES
+from ollama_stub import COUPURE, ServeurOllama, couche
+
+import assistant_ia_setup as ia
+
+
+@pytest.fixture
+def serveur():
+    s = ServeurOllama().demarrer()
+    yield s
+    s.arreter()
+
+
+# ---------------- SONDE HTTP ----------------
+
+def test_sonde_une_seule_connexion(serveur):
+    r = ia.status(endpoint=serveur.endpoint)
+
+    assert r["probe"] == "http"
+    assert r["ollama"]["listening11434"]
+    assert r["ollama"]["version"] == "0.12.6"
+    assert r["ollama"]["models"] == ["llama3.1:8b"]
+    # version, tags et ps sur la même connexion keep-alive
+    assert [(c, m, p) for c, m, p, _ in serveur.requetes] == [
+        (1, "GET", "/api/version"), (1, "GET", "/api/tags"), (1, "GET", "/api/ps")]
+    assert serveur.connexions == 1
+
+
+def test_action_telechargement_porte_le_modele(serveur):
+    serveur.modeles = []
+
+    r = ia.status(model="mistral:7b", endpoint=serveur.endpoint)
+
+    action = next(a for a in r["actions"] if a["id"] == "pull_model")
+    assert action["model"] == "mistral:7b"
+
+
+def test_repli_cli_serveur_arrete(monkeypatch):
+    serveur = ServeurOllama().demarrer()
+    endpoint = serveur.endpoint
+    assert ia.status(endpoint=endpoint)["probe"] == "http"
+    serveur.arreter()
+
+    # Ollama installé mais arrêté : la CLI prend le relais
+    monkeypatch.setattr(ia, "exists", lambda nom: nom == "ollama")
+    commandes = []
+
+    def run(argv, timeout=20):
+        commandes.append(argv)
+        if argv[:2] == ["ollama", "list"]:
+            return {"ok": True, "code": 0, "out": "NAME ID SIZE MODIFIED\nmistral:7b abc 4.1 GB 2 days ago", "err": ""}
+        return {"ok": True, "code": 0, "out": "ollama version is 0.12.6", "err": ""}
+
+    monkeypatch.setattr(ia, "run", run)
+
+    r = ia.status(endpoint=endpoint)
+
+    assert r["probe"] == "cli"
+    assert not r["ollama"]["listening11434"]
+    assert r["ollama"]["models"] == ["mistral:7b"]
+    assert ["ollama", "list"] in commandes
+    assert "start_ollama_user_service" in [a["id"] for a in r["actions"]]
+
+
+def test_connexion_fermee_par_le_serveur_rouverte(serveur):
+    serveur.fermer_apres_reponse = True
+    api = ia.OllamaApi(serveur.endpoint)
+    try:
+        assert api.get("/api/version")["version"] == "0.12.6"
+        # Connexion fermée par le serveur entre deux requêtes : rouverte une fois
+        assert api.get("/api/tags")["models"][0]["name"] == "llama3.1:8b"
+    finally:
+        api.close()
+    assert serveur.connexions == 2
+
+
+def test_erreur_http_conserve_le_code(serveur):
+    api = ia.OllamaApi(serveur.endpoint)
+    try:
+        with pytest.raises(ia.OllamaHttpError) as erreur:
+            api.get("/api/inconnu")
+    finally:
+        api.close()
+    assert erreur.value.status == 404
+
+
+# ---------------- RECOMMANDATION ----------------
+
+def materiel(meminfo, cpuinfo):
+    return ia.read_hardware(str(FIXTURES / "proc" / meminfo), str(FIXTURES / "proc" / cpuinfo))
+
+
+def test_read_hardware_avx2_hyperthreading():
+    h = materiel("meminfo_16g", "cpuinfo_avx2_4c8t")
+
+    assert (h["ramTotalGb"], h["ramAvailableGb"]) == (16.7, 11.8)
+    # Cœurs physiques d'après (physical id, core id), pas les threads
+    assert (h["cores"], h["threads"]) == (4, 8)
+    assert h["simd"] == "avx2"
+    assert h["avx"] == {"avx": True, "avx2": True, "avx512": False}
+
+
+def test_read_hardware_sans_topologie_ni_avx():
+    h = materiel("meminfo_4g", "cpuinfo_sans_avx_2c")
+
+    assert (h["ramTotalGb"], h["ramAvailableGb"]) == (4.0, 2.1)
+    # Pas de core id : un cœur par processeur
+    assert (h["cores"], h["threads"]) == (2, 2)
+    assert h["simd"] == "none"
+
+
+def test_estimations():
+    h = materiel("meminfo_16g", "cpuinfo_avx2_4c8t")
+
+    # 8 milliards en Q4_K_M : 4,85 Go de poids + cache KV + runtime
+    assert ia.estimate_footprint_gb(8.0, "Q4_K_M") == 5.57
+    assert ia.estimate_footprint_gb(8.0, "Q8_0") == 9.22
+    # Borné par le calcul (4 cœurs AVX2) avant la bande passante (35 / 4,85)
+    assert ia.estimate_tokens_per_second(8.0, "Q4_K_M", h) == 6.0
+    # Petit modèle : borné par la bande passante mémoire
+    assert ia.estimate_tokens_per_second(1.2, "Q4_K_M", h) == 40.0
+
+
+def test_recommande_le_plus_gros_confortable():
+    r = ia.recommend(materiel("meminfo_16g", "cpuinfo_avx2_4c8t"), installed=[])
+
+    # Marge : 15 % de 16,7 Go
+    assert (r["headroomGb"], r["memoryBudgetGb"]) == (2.5, 9.3)
+    assert r["recommended"] == "gemma2:9b"
+    assert all(c["comfortable"] for c in r["candidates"][:5])
+    assert not next(c for c in r["candidates"] if c["name"] == "qwen2.5:14b")["fits"]
+
+
+def test_modele_installe_avantage():
+    installes = [{"name": "llama3.1:8b", "size": 4_920_000_000,
+                  "details": {"parameter_size": "8.0B", "quantization_level": "Q4_K_M"}}]
+
+    r = ia.recommend(materiel("meminfo_16g", "cpuinfo_avx2_4c8t"), installed=installes)
+
+    assert r["recommended"] == "llama3.1:8b"
+    assert r["candidates"][0]["installed"]
+
+
+def test_petite_machine_plus_rapide_qui_tient():
+    h = materiel("meminfo_4g", "cpuinfo_sans_avx_2c")
+
+    assert ia.recommend(h, installed=[])["recommended"] is None
+    # Un modèle résident libère sa mémoire : rien de confortable sans AVX, le plus rapide qui tient
+    r = ia.recommend(h, installed=[], loaded_gb=1.0)
+    assert r["memoryBudgetGb"] == 1.6
+    assert r["recommended"] == "llama3.2:1b"
+    assert not r["candidates"][0]["comfortable"]
+
+
+# ---------------- RÉSIDENCE ----------------
+
+def test_warmup_mesure_le_chargement(serveur):
+    api = ia.OllamaApi(serveur.endpoint)
+    try:
+        r = ia.warmup(api, "llama3.1:8b", "1h")
+        resident = ia.warmup(api, "llama3.1:8b", "1h")
+    finally:
+        api.close()
+
+    # done_reason "load" sans load_duration : durée mesurée de l'appel
+    assert r["doneReason"] == "load"
+    assert r["loadMs"] >= 50
+    assert [m["name"] for m in r["loaded"]] == ["llama3.1:8b"]
+    assert resident["loadMs"] < 50
+    _, _, _, corps = serveur.requetes[0]
+    assert corps == {"model": "llama3.1:8b", "prompt": "", "keep_alive": "1h"}
+
+
+def test_unload(serveur):
+    serveur.charges.add("llama3.1:8b")
+    api = ia.OllamaApi(serveur.endpoint)
+    try:
+        ia.unload(api, "llama3.1:8b")
+        assert ia.keep_alive_status(api) == []
+    finally:
+        api.close()
+
+
+# ---------------- BENCHMARK ----------------
+
+def test_benchmark(serveur):
+    serveur.charges.add("llama3.1:8b")
+    serveur.duree_chargement = 0.1
+    api = ia.OllamaApi(serveur.endpoint)
+    try:
+        r = ia.benchmark(api, "llama3.1:8b")
+    finally:
+        api.close()
+
+    assert r["ollamaVersion"] == "0.12.6"
+    assert len(r["measures"]) == len(ia.BENCH_PROMPTS)
+    # Modèle déchargé d'abord : la première génération mesure le chargement à froid
+    assert r["coldLoadMs"] == 100
+    assert r["coldTtftMs"] >= 100
+    assert all(m["loadMs"] == 2 for m in r["measures"][1:])
+    assert r["tokensPerSecond"] == 32.0
+    assert r["measures"][0]["tokens"] == 64
+    generations = [c for _, m, p, c in serveur.requetes if p == "/api/generate"]
+    assert generations[0]["keep_alive"] == 0
+    assert all(c["options"] == ia.BENCH_OPTIONS for c in generations[1:])
+    # Tout le benchmark sur une seule connexion (réponses en streaming lues jusqu'au bout)
+    assert serveur.connexions == 1
+
+
+def test_historique_benchmark(serveur, tmp_path):
+    base = str(tmp_path / "benchmarks_ia.db")
+    api = ia.OllamaApi(serveur.endpoint)
+    try:
+        premier = ia.benchmark(api, "llama3.1:8b")
+        serveur.debit = 20.0
+        second = ia.benchmark(api, "llama3.1:8b")
+    finally:
+        api.close()
+    ia.save_benchmark(premier, base)
+    ia.save_benchmark(second, base)
+
+    r = ia.benchmark_history(path=base)
+
+    assert len(r["models"]) == 1
+    entree = r["models"][0]
+    assert [run["tokensPerSecond"] for run in entree["runs"]] == [20.0, 32.0]
+    assert entree["bestTokensPerSecond"] == 32.0
+    assert entree["deltaTokensPerSecond"] == -12.0
+    assert entree["regression"]
+    assert ia.benchmark_history("mistral:7b", path=base) == {"models": []}
+
+
+# ---------------- TÉLÉCHARGEMENT ----------------
+
+COUCHE = "sha256:6a0746a1ec1aef3e7ec53868f220ff6e389f6f8ef87a01d77c96807de94ca2aa"
+MANIFESTE = {"status": "pulling manifest"}
+FIN = [{"status": "verifying sha256 digest"}, {"status": "writing manifest"}, {"status": "success"}]
+
+
+def tirer(serveur, max_attempts=ia.PULL_MAX_ATTEMPTS):
+    evenements, pauses = [], []
+    api = ia.OllamaApi(serveur.endpoint)
+    try:
+        r = ia.pull_model(api, "llama3.1:8b", emit=lambda type, **d: evenements.append((type, d)),
+                          max_attempts=max_attempts, sleep=pauses.append)
+    finally:
+        api.close()
+    return r, evenements, pauses
+
+
+def test_reprise_apres_coupure_en_pleine_couche(serveur):
+    serveur.tirages = [
+        [MANIFESTE, couche(COUCHE, 0, 1000), couche(COUCHE, 400, 1000), COUPURE],
+        # Ollama reprend la couche là où elle s'était arrêtée
+        [MANIFESTE, couche(COUCHE, 400, 1000), couche(COUCHE, 1000, 1000), *FIN],
+    ]
+
+    r, evenements, pauses = tirer(serveur)
+
+    assert r["ok"]
+    assert r["retries"] == 1
+    assert r["bytes"] == 1000
+    assert pauses == [ia.PULL_BACKOFF_BASE]
+    reprises = [d for t, d in evenements if t == "retry"]
+    assert len(reprises) == 1 and reprises[0]["completed"] == 400
+    assert [d["completed"] for t, d in evenements if t == "progress"][-1] == 1000
+    assert evenements[-1] == ("result", r)
+    assert len([1 for _, _, p, _ in serveur.requetes if p == "/api/pull"]) == 2
+
+
+@pytest.mark.parametrize("reponse", [
+    [MANIFESTE, {"error": "pull model manifest: file does not exist"}],
+    (404, "model 'llama3.1:8b' not found"),
+    (400, "invalid model name"),
+])
+def test_erreur_definitive_sans_nouvelle_tentative(serveur, reponse):
+    serveur.tirages = [reponse]
+
+    r, evenements, pauses = tirer(serveur)
+
+    assert not r["ok"]
+    assert r["retries"] == 0
+    assert pauses == []
+    assert [t for t, _ in evenements if t == "retry"] == []
+    assert evenements[-1] == ("result", r)
+
+
+def test_erreur_serveur_reessayee(serveur):
+    serveur.tirages = [(500, "internal error"), [MANIFESTE, couche(COUCHE, 1000, 1000), *FIN]]
+
+    r, _, pauses = tirer(serveur)
+
+    assert r["ok"]
+    assert pauses == [ia.PULL_BACKOFF_BASE]
+
+
+def test_delai_reinitialise_apres_progres(serveur):
+    serveur.tirages = [
+        [MANIFESTE, couche(COUCHE, 100, 1000), COUPURE],
+        [MANIFESTE, COUPURE],
+        [MANIFESTE, COUPURE],
+        # Progrès : le délai repart de la base
+        [MANIFESTE, couche(COUCHE, 600, 1000), COUPURE],
+        [MANIFESTE, couche(COUCHE, 1000, 1000), *FIN],
+    ]
+
+    r, _, pauses = tirer(serveur)
+
+    assert r["ok"]
+    assert r["retries"] == 4
+    assert pauses == [1.0, 2.0, 4.0, 1.0]
+
+
+def test_abandon_apres_tentatives_sans_progres(serveur):
+    serveur.tirages = [[MANIFESTE, COUPURE]] * 3
+
+    r, evenements, pauses = tirer(serveur, max_attempts=3)
+
+    assert not r["ok"]
+    assert r["retries"] == 2
+    assert pauses == [1.0, 2.0]
+    assert evenements[-1] == ("result", r)
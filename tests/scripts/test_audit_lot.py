@@ -0,0 +1,45 @@
+"""
+Audit par lot de racines hors ligne (un processus par racine)
+"""
+
+import json
+
+import audit_securite
+
+
+def fausse_racine(dossier, nom_hote):
+    (dossier / "etc").mkdir(parents=True)
+    (dossier / "etc" / "hostname").write_text(f"{nom_hote}\n")
+    (dossier / "etc" / "passwd").write_text("root:x:0:0:root:/root:/bin/bash\n")
+    (dossier / "etc" / "group").write_text("root:x:0:\nsudo:x:27:\n")
+    (dossier / "etc" / "shadow").write_text("root:!:19000:0:99999:7:::\n")
+    return str(dossier)
+
+
+def test_un_rapport_par_racine(tmp_path, monkeypatch):
+    # Historique des audits dans le dossier de test (processus enfants compris)
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    racines = [fausse_racine(tmp_path / "images" / "a", "a"), fausse_racine(tmp_path / "images" / "b", "b")]
+    sortie = tmp_path / "rapports"
+
+    r = audit_securite.auditer_lot(racines, str(sortie), mode="quick", processus=2)
+
+    assert r["echecs"] == 0
+    assert [resume["racine"] for resume in r["rapports"]] == racines
+    fichiers = sorted(p.name for p in sortie.iterdir())
+    assert fichiers == sorted(audit_securite._nom_rapport(racine) for racine in racines)
+    for resume in r["rapports"]:
+        with open(resume["rapport"], encoding="utf-8") as f:
+            rapport = json.load(f)
+        # Chaque processus n'a vu que sa propre racine
+        assert rapport["racine"] == resume["racine"]
+        assert rapport["score"] == resume["score"]
+
+
+def test_racine_introuvable(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+
+    r = audit_securite.auditer_lot([str(tmp_path / "absente")], str(tmp_path / "rapports"), mode="quick")
+
+    assert r["echecs"] == 1
+    assert "Racine introuvable" in r["rapports"][0]["erreur"]
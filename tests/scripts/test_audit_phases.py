@@ -0,0 +1,45 @@
+"""
+Audit en deux phases : vérifications rapides hors budget relancées en phase 2
+"""
+
+import time
+
+import audit_securite as audit
+
+
+def test_verification_rapide_expiree_relancee(monkeypatch):
+    appels = []
+
+    def verifier_instantanee():
+        return audit.ok(audit.make_verif("instantanee", "Instantanée", "", "Système", ""), "ok", "")
+
+    def verifier_retardee():
+        # Premier appel bloqué (budget de la phase 1 épuisé), le second répond
+        appels.append(time.monotonic())
+        if len(appels) == 1:
+            time.sleep(2)
+        return audit.ok(audit.make_verif("retardee", "Retardée", "", "Système", ""), "ok", "")
+
+    lectures = []
+
+    def charger_etats_unites(unites=None, echeance=None):
+        lectures.append(echeance)
+        # Première lecture : systemctl lent, interrompu à l'échéance
+        return len(lectures) > 1
+
+    rapides = [verifier_instantanee, verifier_retardee]
+    monkeypatch.setattr(audit, "VERIFICATIONS", rapides)
+    monkeypatch.setattr(audit, "selectionner_verifications", lambda mode: (rapides, []))
+    monkeypatch.setattr(audit, "charger_etats_unites", charger_etats_unites)
+    phases, emises = [], []
+
+    rapport = audit.executer_audit(budget_ms=100, on_phase=phases.append, on_verification=emises.append)
+
+    assert len(appels) == 2
+    # États des unités relus avant de relancer
+    assert len(lectures) == 2
+    assert [v["id"] for v in phases[0]["verifications"]] == ["instantanee"]
+    assert phases[0]["non_evaluees"] == ["retardee"]
+    assert [v["id"] for v in emises] == ["retardee"]
+    assert [v["id"] for v in rapport["verifications"]] == ["instantanee", "retardee"]
+    assert rapport["verifications_expirees"] == 0
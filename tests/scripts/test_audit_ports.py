@@ -0,0 +1,63 @@
+"""
+Vérification des ports exposés : verdict du pare-feu pris en compte
+"""
+
+from conftest import FIXTURES
+
+import audit_securite
+import pare_feu_nft
+
+ECOUTES = [
+    {"proto": "tcp", "adresse": "0.0.0.0", "port": 22, "locale": False, "users": "sshd"},
+    {"proto": "tcp", "adresse": "0.0.0.0", "port": 631, "locale": False, "users": "cupsd"},
+    {"proto": "udp", "adresse": "0.0.0.0", "port": 5353, "locale": False, "users": "avahi"},
+    {"proto": "tcp", "adresse": "127.0.0.1", "port": 5432, "locale": True, "users": "postgres"},
+]
+
+
+def test_ports_bloques_non_penalises(monkeypatch):
+    ruleset = pare_feu_nft.lire_ruleset(FIXTURES / "nft" / "politique_drop.json")
+    monkeypatch.setattr(audit_securite, "lister_ecoutes", lambda: ECOUTES)
+    monkeypatch.setattr(audit_securite, "lire_ruleset_nft", lambda: ruleset)
+
+    v = audit_securite.verifier_ports_exposes()
+
+    # Seul ssh passe la politique drop
+    assert v["details"] == "1 port(s) exposé(s)"
+    assert "Bloqués par le pare-feu:\n631 (cupsd)\n5353 (avahi)" in v["preuve"]
+
+
+def test_tous_bloques(monkeypatch):
+    ruleset = [{"chain": {"family": "inet", "table": "t", "name": "in", "hook": "input", "prio": 0, "policy": "drop"}}]
+    monkeypatch.setattr(audit_securite, "lister_ecoutes", lambda: ECOUTES)
+    monkeypatch.setattr(audit_securite, "lire_ruleset_nft", lambda: ruleset)
+
+    v = audit_securite.verifier_ports_exposes()
+
+    assert v["reussie"]
+    assert v["points"] == v["points_max"]
+
+
+def test_sans_regles_lisibles(monkeypatch):
+    # nft indisponible : toutes les écoutes non locales restent exposées
+    monkeypatch.setattr(audit_securite, "lister_ecoutes", lambda: ECOUTES)
+    monkeypatch.setattr(audit_securite, "lire_ruleset_nft", lambda: None)
+
+    v = audit_securite.verifier_ports_exposes()
+
+    assert v["details"] == "3 port(s) exposé(s)"
+
+
+def test_exposition_sans_double_penalite(monkeypatch):
+    # Les écoutes accessibles ne sont notées qu'une fois, par "ports"
+    ruleset = pare_feu_nft.lire_ruleset(FIXTURES / "nft" / "politique_drop.json")
+    monkeypatch.setattr(audit_securite, "lister_ecoutes", lambda: ECOUTES)
+    monkeypatch.setattr(audit_securite, "lire_ruleset_nft", lambda: ruleset)
+
+    ports = audit_securite.verifier_ports_exposes()
+    exposition = audit_securite.verifier_exposition()
+
+    assert ports["points"] < ports["points_max"]
+    assert exposition["details"] == "1 service(s) accessible(s) depuis l'extérieur"
+    assert exposition["points"] == exposition["points_max"]
+    assert "tcp 0.0.0.0:631 cupsd -> bloque" in exposition["preuve"]
@@ -0,0 +1,17 @@
+"""
+Analyse de nettoyage : description des catégories
+"""
+
+import cleanup
+import plan_nettoyage
+
+
+def test_logs_anciens_signale_dossiers_proteges(monkeypatch):
+    regle = {"nombre": 4, "tailleBytes": 96 << 20, "illisibles": ["/var/log/journal/abc"], "partiel": False}
+    monkeypatch.setattr(plan_nettoyage, "evaluer_regle", lambda nom, echeance: regle)
+
+    r = cleanup.analyser_logs_anciens()
+
+    assert r["tailleMB"] == 96
+    assert r["description"] == ("4 journal(aux) archivé(s) de plus de 30 jours"
+                                " (+ 1 dossier(s) protégé(s) vérifié(s) au nettoyage)")
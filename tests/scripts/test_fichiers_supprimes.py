@@ -0,0 +1,53 @@
+"""
+Fichiers supprimés encore ouverts : unité à redémarrer d'après le cgroup
+"""
+
+import pytest
+
+import fichiers_supprimes
+
+SESSION = "/user.slice/user-1000.slice/user@1000.service"
+
+
+@pytest.mark.parametrize("chemin, attendu", [
+    ("/system.slice/nginx.service", ("nginx.service", None)),
+    (f"{SESSION}/session.slice/pipewire.service", ("pipewire.service", "user@1000.service")),
+    # Application de bureau : scope sous le gestionnaire de session, rien à redémarrer
+    (f"{SESSION}/app.slice/app-gnome-firefox-4242.scope", (None, None)),
+    (f"{SESSION}/init.scope", (None, None)),
+    ("/user.slice/user-1000.slice/session-2.scope", (None, None)),
+])
+def test_unite_cgroup(chemin, attendu):
+    assert fichiers_supprimes.unite_cgroup(chemin) == attendu
+
+
+def proc(tmp_path, pid, nom, cgroup):
+    dossier = tmp_path / str(pid)
+    dossier.mkdir()
+    (dossier / "comm").write_text(nom + "\n")
+    (dossier / "cgroup").write_text(f"0::{cgroup}\n")
+
+
+def test_redemarrages(tmp_path, monkeypatch):
+    proc(tmp_path, 10, "nginx", "/system.slice/nginx.service")
+    proc(tmp_path, 20, "pipewire", f"{SESSION}/session.slice/pipewire.service")
+    proc(tmp_path, 30, "firefox", f"{SESSION}/app.slice/app-gnome-firefox-4242.scope")
+    processus = {pid: fichiers_supprimes.infos_processus(str(tmp_path), pid) for pid in (10, 20, 30)}
+    fichiers = {
+        (1, 1): {"chemin": "/var/log/nginx/access.log.1", "taille": 3 << 20, "pids": {10}},
+        (1, 2): {"chemin": "/home/u/.cache/pw.shm", "taille": 2 << 20, "pids": {20}},
+        (1, 3): {"chemin": "/home/u/.cache/mozilla/cache2", "taille": 1 << 20, "pids": {30}},
+    }
+    monkeypatch.setattr(fichiers_supprimes, "scanner_fd", lambda echeance, racine: {
+        "fichiers": fichiers, "processus": processus, "analyses": 3, "inaccessibles": 0, "partiel": False})
+
+    r = fichiers_supprimes.analyser_fichiers_supprimes(racine_proc=str(tmp_path))
+
+    assert [(x["unite"], x["commande"]) for x in r["redemarrages"]] == [
+        ("nginx.service", "systemctl restart nginx.service"),
+        ("pipewire.service", "systemctl --user restart pipewire.service"),
+        # Jamais "systemctl restart user@1000.service"
+        (None, None),
+    ]
+    assert r["redemarrages"][1]["gestionnaire"] == "user@1000.service"
+    assert r["redemarrages"][2]["pids"] == [30]
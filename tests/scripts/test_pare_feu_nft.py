@@ -0,0 +1,148 @@
+"""
+Exposition d'après des jeux de règles enregistrés ("nft -j list ruleset")
+"""
+
+import pytest
+
+from conftest import FIXTURES
+
+import pare_feu_nft
+from pare_feu_nft import ACCEPTE, BLOQUE, RESTREINT
+
+
+def charger(nom):
+    ruleset = pare_feu_nft.lire_ruleset(FIXTURES / "nft" / f"{nom}.json")
+    assert ruleset is not None
+    return pare_feu_nft.indexer_ruleset(ruleset)
+
+
+def ecoute(port, proto="tcp", adresse="0.0.0.0", locale=False):
+    return {"proto": proto, "adresse": adresse, "port": port, "locale": locale, "users": ""}
+
+
+# ---------------- POLITIQUE DROP ----------------
+
+@pytest.mark.parametrize("proto, port, attendu", [
+    ("tcp", 22, ACCEPTE),
+    ("tcp", 443, ACCEPTE),
+    ("udp", 60500, ACCEPTE),
+    # ct state established,related et iif lo n'ouvrent rien aux nouvelles connexions externes
+    ("tcp", 631, BLOQUE),
+    ("udp", 5353, BLOQUE),
+    ("udp", 22, BLOQUE),
+])
+def test_politique_drop(proto, port, attendu):
+    index = charger("politique_drop")
+    verdict, regle = pare_feu_nft.exposition(index, proto, port)
+    assert verdict == attendu
+    if attendu == BLOQUE:
+        assert regle == "inet filter input policy drop"
+
+
+def test_politique_drop_ipv6():
+    # Table inet : mêmes règles pour IPv6
+    index = charger("politique_drop")
+    assert pare_feu_nft.exposition(index, "tcp", 22, 6)[0] == ACCEPTE
+    assert pare_feu_nft.exposition(index, "tcp", 631, 6)[0] == BLOQUE
+
+
+def test_chaines_input_indexees():
+    index = charger("politique_drop")
+    assert [e["cle"] for e in index["entrees"]] == [("inet", "filter", "input")]
+    assert index["entrees"][0]["politique"] == "drop"
+
+
+# ---------------- FIREWALLD ----------------
+
+def test_firewalld_zone_goto_service_autorise():
+    index = charger("firewalld_public")
+    verdict, regle = pare_feu_nft.exposition(index, "tcp", 22)
+    assert verdict == ACCEPTE
+    assert regle == "inet firewalld filter_IN_public_allow handle 50"
+
+
+def test_firewalld_zone_goto_port_ferme_rejete():
+    # La zone ne décide pas : retour dans filter_INPUT, puis reject final
+    index = charger("firewalld_public")
+    verdict, regle = pare_feu_nft.exposition(index, "tcp", 631)
+    assert verdict == BLOQUE
+    assert regle == "inet firewalld filter_INPUT handle 24"
+
+
+def test_firewalld_condition_non_comprise_restreint():
+    # dhcpv6-client : restreint à fe80::/64 (adresse destination non évaluée)
+    index = charger("firewalld_public")
+    assert pare_feu_nft.exposition(index, "udp", 546, 6)[0] == RESTREINT
+
+
+# ---------------- CT STATE ----------------
+
+def test_ct_state_new_drop():
+    index = charger("politique_accept")
+    verdict, regle = pare_feu_nft.exposition(index, "tcp", 25)
+    assert verdict == BLOQUE
+    assert regle == "ip filter INPUT handle 2"
+
+
+def test_ct_state_politique_accept():
+    index = charger("politique_accept")
+    assert pare_feu_nft.exposition(index, "tcp", 8080) == (ACCEPTE, "ip filter INPUT policy accept")
+    # Table ip : le trafic IPv6 ne la traverse pas
+    assert pare_feu_nft.exposition(index, "tcp", 25, 6) == (ACCEPTE, "aucune chaîne input")
+
+
+def test_ct_state_invalid_ne_bloque_pas():
+    index = charger("firewalld_public")
+    assert pare_feu_nft.exposition(index, "tcp", 22)[0] == ACCEPTE
+
+
+# ---------------- IIF LO ----------------
+
+def test_iif_lo_seul_n_ouvre_rien():
+    ruleset = [
+        {"chain": {"family": "inet", "table": "t", "name": "in", "hook": "input", "prio": 0, "policy": "drop"}},
+        {"rule": {"family": "inet", "table": "t", "chain": "in", "handle": 2, "expr": [
+            {"match": {"op": "==", "left": {"meta": {"key": "iifname"}}, "right": "lo"}}, {"accept": None}]}},
+    ]
+    index = pare_feu_nft.indexer_ruleset(ruleset)
+    assert pare_feu_nft.exposition(index, "tcp", 5432)[0] == BLOQUE
+
+
+def test_iif_different_de_lo_s_applique():
+    ruleset = [
+        {"chain": {"family": "inet", "table": "t", "name": "in", "hook": "input", "prio": 0, "policy": "accept"}},
+        {"rule": {"family": "inet", "table": "t", "chain": "in", "handle": 2, "expr": [
+            {"match": {"op": "!=", "left": {"meta": {"key": "iif"}}, "right": "lo"}},
+            {"match": {"op": "==", "left": {"payload": {"protocol": "tcp", "field": "dport"}}, "right": 5432}},
+            {"drop": None}]}},
+    ]
+    index = pare_feu_nft.indexer_ruleset(ruleset)
+    assert pare_feu_nft.exposition(index, "tcp", 5432)[0] == BLOQUE
+    assert pare_feu_nft.exposition(index, "tcp", 5433)[0] == ACCEPTE
+
+
+# ---------------- ANALYSE DES ÉCOUTES ----------------
+
+def test_analyser_exposition_ports_acceptes():
+    ruleset = pare_feu_nft.lire_ruleset(FIXTURES / "nft" / "politique_drop.json")
+    ecoutes = [
+        ecoute(22, adresse="::"),
+        ecoute(631),
+        ecoute(5432, adresse="127.0.0.1", locale=True),
+        ecoute(60100, proto="udp"),
+    ]
+    r = pare_feu_nft.analyser_exposition(ruleset, ecoutes)
+
+    assert [(e["port"], e["acces"]) for e in r["ecoutes"]] == [(22, ACCEPTE), (631, BLOQUE), (60100, ACCEPTE)]
+    assert (r["accessibles"], r["restreintes"], r["bloquees"]) == (2, 0, 1)
+    assert r["chainesInput"] == ["inet filter input (policy drop)"]
+
+
+def test_ruleset_vide_tout_accessible():
+    r = pare_feu_nft.analyser_exposition(pare_feu_nft.decoder_ruleset(""), [ecoute(22)])
+    assert r["accessibles"] == 1
+    assert r["ecoutes"][0]["regle"] == "aucune chaîne input"
+
+
+def test_ruleset_invalide():
+    assert pare_feu_nft.decoder_ruleset("nft: command not found") is None
@@ -0,0 +1,63 @@
+"""
+Nettoyage root des sous-arbres illisibles : descripteurs bornés par la profondeur
+"""
+
+import os
+
+import plan_nettoyage
+
+
+def tout(nom, st, maintenant):
+    return True
+
+
+def arbre_large(racine, largeur):
+    for i in range(largeur):
+        sous = racine / "large" / f"d{i:03}" / "profond"
+        sous.mkdir(parents=True)
+        (sous / "f.tmp").write_bytes(b"x" * 10)
+
+
+def test_descripteurs_bornes_par_la_profondeur(tmp_path, monkeypatch):
+    arbre_large(tmp_path, 200)
+    ouverts = set()
+    maximum = 0
+    ouvrir, fermer = os.open, os.close
+
+    def suivre_open(*args, **kwargs):
+        nonlocal maximum
+        fd = ouvrir(*args, **kwargs)
+        ouverts.add(fd)
+        maximum = max(maximum, len(ouverts))
+        return fd
+
+    def suivre_close(fd):
+        ouverts.discard(fd)
+        fermer(fd)
+
+    monkeypatch.setattr(os, "open", suivre_open)
+    monkeypatch.setattr(os, "close", suivre_close)
+
+    r = plan_nettoyage.nettoyer_sous_arbre(str(tmp_path), str(tmp_path / "large"), tout, 0)
+
+    assert r == (200, 2000, 0)
+    assert ouverts == set()
+    # large, dXXX, profond (+ les dossiers de la racine ouverts un à un)
+    assert maximum <= 4
+
+
+def test_sous_dossier_impossible_a_ouvrir_compte(tmp_path, monkeypatch):
+    arbre_large(tmp_path, 3)
+    ouvrir = os.open
+
+    def refuser_d001(chemin, *args, **kwargs):
+        if chemin == "d001":
+            raise PermissionError(13, "Permission denied", chemin)
+        return ouvrir(chemin, *args, **kwargs)
+
+    monkeypatch.setattr(os, "open", refuser_d001)
+
+    r = plan_nettoyage.nettoyer_sous_arbre(str(tmp_path), str(tmp_path / "large"), tout, 0)
+
+    assert r == (2, 20, 1)
+    assert (tmp_path / "large" / "d001" / "profond" / "f.tmp").exists()
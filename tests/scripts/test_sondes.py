@@ -0,0 +1,202 @@
+"""
+Sondes natives sur une arborescence factice (racine tmp_path)
+"""
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+import sondes
+
+
+def ecrire(racine, relatif, contenu):
+    chemin = racine / relatif
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(contenu, bytes):
+        chemin.write_bytes(contenu)
+    else:
+        chemin.write_text(contenu)
+    return chemin
+
+
+@pytest.fixture
+def racine(tmp_path):
+    ecrire(tmp_path, "etc/passwd", "root:x:0:0:root:/root:/bin/bash\nalice:x:1000:1000::/home/alice:/bin/bash\n")
+    ecrire(tmp_path, "etc/shadow", "root:!:19700:0:99999:7:::\nalice:$y$j9T$abc:19700:0:99999:7:::\nbob::19700::::::\n")
+    ecrire(tmp_path, "etc/group", "root:x:0:\nwheel:x:10:alice\nalice:x:1000:\n")
+    os.chmod(tmp_path / "etc/passwd", 0o644)
+    os.chmod(tmp_path / "etc/shadow", 0o000)
+    return tmp_path
+
+
+# ---------------- FICHIERS ET COMPTES ----------------
+
+def test_mode_fichier(racine):
+    assert sondes.mode_fichier("/etc/passwd", str(racine)) == "644"
+    assert sondes.mode_fichier("/etc/shadow", str(racine)) == "0"
+    assert sondes.mode_fichier("/etc/absent", str(racine)) is None
+
+
+@pytest.mark.skipif(os.geteuid() != 0, reason="/etc/shadow factice en mode 000")
+def test_etat_compte(racine):
+    assert sondes.etat_compte("root", str(racine)) == "L"
+    assert sondes.etat_compte("alice", str(racine)) == "P"
+    assert sondes.etat_compte("bob", str(racine)) == "NP"
+    assert sondes.etat_compte("inconnu", str(racine)) is None
+
+
+def test_ligne_groupe_fichiers(racine):
+    assert sondes.ligne_groupe("wheel", str(racine)) == "wheel:x:10:alice"
+    # Sans nsswitch.conf : "files" seul, le groupe n'existe pas
+    assert sondes.ligne_groupe("sudo", str(racine)) == ""
+
+
+@pytest.mark.parametrize("nsswitch, attendu", [
+    ("group:     files systemd\n", ""),
+    ("group: compat\n", ""),
+    # Source réseau : seul getent peut répondre
+    ("passwd: files sss\ngroup:  files [SUCCESS=merge] sss\n", None),
+    ("# group: files ldap\ngroup: files\n", ""),
+])
+def test_ligne_groupe_repli_nsswitch(racine, nsswitch, attendu):
+    ecrire(racine, "etc/nsswitch.conf", nsswitch)
+    assert sondes.ligne_groupe("sudo", str(racine)) == attendu
+    # Un groupe présent dans /etc/group est trouvé quelles que soient les sources
+    assert sondes.ligne_groupe("wheel", str(racine)) == "wheel:x:10:alice"
+
+
+def test_ligne_groupe_sans_fichier(tmp_path):
+    assert sondes.ligne_groupe("wheel", str(tmp_path)) is None
+
+
+# ---------------- SELINUX ET UNITÉS ----------------
+
+def test_mode_selinux(racine):
+    assert sondes.mode_selinux(str(racine)) is None
+    ecrire(racine, "etc/selinux/config", "# commentaire\nSELINUX=enforcing\nSELINUXTYPE=targeted\n")
+    # Hors ligne : mode configuré
+    assert sondes.mode_selinux(str(racine)) == "Enforcing"
+    ecrire(racine, "sys/fs/selinux/enforce", "0")
+    assert sondes.mode_selinux(str(racine)) == "Permissive"
+
+
+def test_etat_unite_fichiers(racine):
+    ecrire(racine, "usr/lib/systemd/system/sshd.service", "[Unit]\n")
+    ecrire(racine, "usr/lib/systemd/system/cups.service", "[Unit]\n")
+    (racine / "etc/systemd/system/multi-user.target.wants").mkdir(parents=True)
+    os.symlink("/usr/lib/systemd/system/sshd.service", racine / "etc/systemd/system/multi-user.target.wants/sshd.service")
+    os.symlink("/dev/null", racine / "etc/systemd/system/cups.service")
+
+    assert sondes.etat_unite_fichiers("sshd.service", str(racine)) == "enabled"
+    assert sondes.etat_unite_fichiers("cups.service", str(racine)) == "masked"
+    assert sondes.etat_unite_fichiers("fail2ban.service", str(racine)) == ""
+
+
+# ---------------- SOCKETS ----------------
+
+ENTETE_TCP = "  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n"
+
+
+@pytest.mark.skipif(sys.byteorder != "little", reason="adresses /proc/net enregistrées sur x86")
+def test_sockets_en_ecoute(racine):
+    ecrire(racine, "proc/net/tcp", ENTETE_TCP +
+           "   0: 00000000:0016 00000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 21001 1\n"
+           "   1: 0100007F:1538 00000000:0000 0A 00000000:00000000 00:00000000 00000000   110        0 21002 1\n"
+           # Connexion établie : pas une écoute
+           "   2: 0200A8C0:0016 0500A8C0:D431 01 00000000:00000000 02:00000000 00000000     0        0 21003 1\n")
+    ecrire(racine, "proc/net/tcp6", ENTETE_TCP +
+           "   0: 0000000000000000FFFF00000100007F:0277 00000000000000000000000000000000:0000 0A "
+           "00000000:00000000 00:00000000 00000000     0        0 21004 1\n")
+    ecrire(racine, "proc/net/udp", ENTETE_TCP +
+           "  10: 00000000:14E9 00000000:0000 07 00000000:00000000 00:00000000 00000000    70        0 21005 2\n")
+    # Processus propriétaire du socket ssh
+    ecrire(racine, "proc/812/comm", "sshd\n")
+    (racine / "proc/812/fd").mkdir()
+    os.symlink("socket:[21001]", racine / "proc/812/fd/3")
+
+    sockets = sondes.sockets_en_ecoute(str(racine))
+
+    assert [(s["proto"], s["adresse"], s["port"], s["locale"]) for s in sockets] == [
+        ("tcp", "0.0.0.0", 22, False),
+        ("tcp", "127.0.0.1", 5432, True),
+        ("tcp", "::ffff:127.0.0.1", 631, True),
+        ("udp", "0.0.0.0", 5353, False),
+    ]
+    assert sockets[0]["users"] == 'users:(("sshd",pid=812,fd=3))'
+    assert sockets[1]["users"] == ""
+
+
+def test_sockets_proc_net_illisible(racine):
+    assert sondes.sockets_en_ecoute(str(racine)) is None
+
+
+# ---------------- DÉMARRAGE, DISQUES, HORLOGE ----------------
+
+@pytest.mark.parametrize("valeur, attendu", [
+    (b"\x06\x00\x00\x00\x01", "enabled"),
+    (b"\x06\x00\x00\x00\x00", "disabled"),
+    (b"\x06\x00", None),
+])
+def test_etat_secure_boot(racine, valeur, attendu):
+    ecrire(racine, sondes.VARIABLE_SECURE_BOOT, valeur)
+    assert sondes.etat_secure_boot(str(racine)) == attendu
+
+
+def test_secure_boot_bios(racine):
+    assert sondes.etat_secure_boot(str(racine)) == "non_efi"
+
+
+def test_volumes_chiffres(racine):
+    ecrire(racine, "sys/block/dm-0/dm/uuid", "CRYPT-LUKS2-0f5c1e0a-luks-0f5c1e0a\n")
+    ecrire(racine, "sys/block/dm-0/dm/name", "luks-0f5c1e0a\n")
+    ecrire(racine, "sys/block/dm-1/dm/uuid", "LVM-abc\n")
+    ecrire(racine, "run/udev/data/b259:2", "S:disk/by-uuid/0f5c1e0a\nE:ID_FS_TYPE=crypto_LUKS\n")
+    ecrire(racine, "run/udev/data/b259:1", "E:ID_FS_TYPE=vfat\n")
+    ecrire(racine, "sys/dev/block/259:2/uevent", "MAJOR=259\nMINOR=2\nDEVNAME=nvme0n1p2\n")
+
+    assert sondes.volumes_chiffres(str(racine)) == ["luks-0f5c1e0a crypt", "nvme0n1p2 crypto_LUKS"]
+
+
+def test_horloge_racine_factice(racine):
+    assert sondes.horloge_synchronisee(str(racine)) is None
+    ecrire(racine, "run/systemd/timesync/synchronized", "")
+    assert sondes.horloge_synchronisee(str(racine)) is True
+
+
+# ---------------- PAQUETS ----------------
+
+STATUT_DPKG = """Package: fail2ban
+Status: install ok installed
+Version: 1.0.2-2
+
+Package: telnet
+Status: deinstall ok config-files
+Version: 0.17+2.4-2
+"""
+
+
+def test_paquet_installe_dpkg(racine):
+    assert sondes.paquet_installe("fail2ban", str(racine)) is None
+    ecrire(racine, "var/lib/dpkg/status", STATUT_DPKG)
+
+    assert sondes.paquet_installe("fail2ban", str(racine)) is True
+    # Configuration restante seulement
+    assert sondes.paquet_installe("telnet", str(racine)) is False
+    assert sondes.paquet_installe("nginx", str(racine)) is False
+
+
+def test_paquet_installe_rpm_sqlite(racine):
+    base = racine / "var/lib/rpm/rpmdb.sqlite"
+    base.parent.mkdir(parents=True)
+    conn = sqlite3.connect(base)
+    conn.execute("CREATE TABLE Name (key TEXT, hnum INTEGER, idx INTEGER)")
+    conn.execute("INSERT INTO Name VALUES ('fail2ban', 412, 0)")
+    conn.commit()
+    conn.close()
+    # La base rpm prime sur un éventuel statut dpkg
+    ecrire(racine, "var/lib/dpkg/status", "Package: nginx\nStatus: install ok installed\n")
+
+    assert sondes.paquet_installe("fail2ban", str(racine)) is True
+    assert sondes.paquet_installe("nginx", str(racine)) is False
@@ -0,0 +1,53 @@
+"""
+Configuration effective de sshd : cache du système courant
+"""
+
+import json
+
+import sshd_config
+
+
+def configuration(tmp_path, contenu="PermitRootLogin no\nPort 2222\n"):
+    chemin = tmp_path / "sshd_config"
+    chemin.write_text(contenu)
+    return str(chemin)
+
+
+def test_cache_reutilise_puis_invalide(tmp_path):
+    chemin = configuration(tmp_path)
+    cache = tmp_path / "cache" / "sshd_config.json"
+
+    premier = sshd_config.configuration_effective("/", chemin, cache)
+    second = sshd_config.configuration_effective("/", chemin, cache)
+
+    assert not premier["depuisCache"] and second["depuisCache"]
+    assert second["valeurs"]["permitrootlogin"] == "no"
+    # Écriture atomique par un fichier temporaire propre au processus
+    assert [p.name for p in cache.parent.iterdir()] == ["sshd_config.json"]
+
+    configuration(tmp_path, "PermitRootLogin yes\nPort 22\n# modifié\n")
+    troisieme = sshd_config.configuration_effective("/", chemin, cache)
+    assert not troisieme["depuisCache"]
+    assert troisieme["valeurs"]["permitrootlogin"] == "yes"
+
+
+def test_racine_hors_ligne_sans_cache(tmp_path):
+    (tmp_path / "etc" / "ssh").mkdir(parents=True)
+    (tmp_path / "etc" / "ssh" / "sshd_config").write_text("PasswordAuthentication no\n")
+    cache = tmp_path / "sshd_config.json"
+
+    for _ in range(2):
+        r = sshd_config.configuration_effective(str(tmp_path), cache=cache)
+        assert not r["depuisCache"]
+        assert r["valeurs"]["passwordauthentication"] == "no"
+    assert not cache.exists()
+
+
+def test_entrees_d_autres_racines_purgees(tmp_path):
+    chemin = configuration(tmp_path)
+    cache = tmp_path / "sshd_config.json"
+    cache.write_text(json.dumps({"/mnt/image:/etc/ssh/sshd_config": {"fichiers": [], "resultat": {}}}))
+
+    sshd_config.configuration_effective("/", chemin, cache)
+
+    assert list(json.loads(cache.read_text())) == [f"/:{chemin}"]